@@ -0,0 +1,302 @@
+"""
+Benchmark de RSACrypto: geração de chaves, criptografia e descriptografia (MB/s
+e latência por operação) e pico de memória (RSS), nos modos legado (RSA em
+blocos), híbrido em memória e streaming de arquivo para arquivo, com chaves
+RSA de 2048, 3072 e 4096 bits.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_crypto [tamanho ...] [--salvar base.json] [--comparar base.json]
+
+Tamanhos em bytes, com sufixo K, M ou G (padrão: 1K 1M 64M 1G). Cada caso roda
+em um processo novo, para que o pico de RSS seja só dele. O modo legado faz
+uma operação RSA a cada ~190 bytes e só é medido até LEGACY_MAX_SIZE; o
+híbrido em memória, até IN_MEMORY_MAX_SIZE (entrada e saída ficam em
+memória). O streaming cobre todos os tamanhos; o de 1 GB usa cerca de 3 GB
+no diretório temporário.
+
+Com --salvar, os resultados são gravados em JSON como base de comparação,
+junto com os limites de regressão (THRESHOLDS). Com --comparar, cada métrica é
+comparada com a base, usando os limites gravados nela (que podem ser ajustados
+no arquivo conforme o ruído da máquina), e o processo termina com código 1 se
+alguma piorou além deles. A base deve ser gravada na mesma máquina, ociosa.
+"""
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows: sem pico de RSS
+    resource = None
+
+import cryptography
+
+from crypto_utils import KEY_TYPES, RSA_KEY_SIZES, RSACrypto
+
+DEFAULT_SIZES = ['1K', '1M', '64M', '1G']
+SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+# Modo -> cifra de RSACrypto ('rsa' = formato legado)
+MODES = {
+    'legado': 'rsa',
+    'hibrido-aes-gcm': 'aes-gcm',
+    'hibrido-chacha20': 'chacha20-poly1305',
+    'streaming-aes-gcm': 'aes-gcm',
+}
+LEGACY_MAX_SIZE = 1024 ** 2
+IN_MEMORY_MAX_SIZE = 64 * 1024 ** 2
+
+# Repetições de cada operação: até somar REPEAT_BYTES (LEGACY_REPEAT_BYTES no
+# modo legado, uma operação RSA a cada ~190 bytes), entre 1 e MAX_REPEATS
+REPEAT_BYTES = 16 * 1024 ** 2
+LEGACY_REPEAT_BYTES = 64 * 1024
+MAX_REPEATS = 20
+KEYGEN_REPEATS = {'rsa-2048': 5, 'rsa-3072': 3, 'rsa-4096': 2, 'x25519': 50, 'ed25519': 50}
+
+# Métricas comparadas com a base: (piora relativa, piora absoluta mínima); só
+# há regressão se as duas forem ultrapassadas. Os tempos comparados são os
+# melhores de cada caso, menos sujeitos a ruído que as medianas; os MB/s
+# derivam dos mesmos tempos (+25% no tempo = -20% em MB/s)
+THRESHOLDS = {
+    'keygen_ms': (1.00, 5.0),  # a geração RSA varia muito (busca de primos)
+    'best_encrypt_ms': (0.25, 0.5),
+    'best_decrypt_ms': (0.25, 0.5),
+    'peak_rss_mb': (0.25, 8.0),
+}
+
+WRITE_BLOCK = 1024 ** 2
+SAMPLE_UNIT = "Cláusula contratual de exemplo, repetida até o tamanho pedido. ".encode('utf-8')
+
+
+def parse_size(text):
+    """'64M' -> 67108864."""
+    text = text.strip().upper()
+    if text[-1:] in SIZE_UNITS:
+        return int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+    return int(text)
+
+
+def format_size(size):
+    for suffix, unit in sorted(SIZE_UNITS.items(), key=lambda item: -item[1]):
+        if size >= unit and size % unit == 0:
+            return f"{size // unit}{suffix}"
+    return str(size)
+
+
+def sample_bytes(size):
+    return (SAMPLE_UNIT * (size // len(SAMPLE_UNIT) + 1))[:size]
+
+
+def write_sample_file(path, size):
+    """Grava o arquivo de entrada do streaming em blocos, sem montá-lo em memória."""
+    block = sample_bytes(WRITE_BLOCK)
+    with open(path, 'wb') as f:
+        for start in range(0, size, WRITE_BLOCK):
+            f.write(block[:min(WRITE_BLOCK, size - start)])
+
+
+def peak_rss_mb():
+    """Pico de RSS do processo em MB (ru_maxrss é em KiB no Linux e em bytes no macOS)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1_000_000 if sys.platform == 'darwin' else peak * 1024 / 1_000_000
+
+
+def repeats_for(mode, size):
+    budget = LEGACY_REPEAT_BYTES if mode == 'legado' else REPEAT_BYTES
+    return max(1, min(MAX_REPEATS, budget // size))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def measure_keygen():
+    """Tempo médio e mínimo (ms) de geração de cada tipo de chave."""
+    results = {}
+    for key_type in KEY_TYPES:
+        times = [timed(RSACrypto.generate_keys, key_type)[0] for _ in range(KEYGEN_REPEATS[key_type])]
+        results[key_type] = {'keygen_ms': statistics.mean(times) * 1000, 'min_keygen_ms': min(times) * 1000}
+    return results
+
+
+def warm_up(private_pem, public_pem):
+    """Carrega as chaves no cache (KeyRing) antes de medir: a latência é a de uma chave já em uso."""
+    RSACrypto.decrypt_file(RSACrypto.encrypt_bytes(b'x', public_pem), private_pem)
+
+
+def _in_memory_case(cipher, private_pem, public_pem, size, repeats):
+    content = sample_bytes(size)
+    if cipher == 'rsa':
+        encrypt = lambda: RSACrypto.encrypt_file(content, public_pem, 'rsa')
+    else:
+        encrypt = lambda: RSACrypto.encrypt_bytes(content, public_pem, cipher)
+    warm_up(private_pem, public_pem)
+
+    encrypt_times, decrypt_times = [], []
+    for _ in range(repeats):
+        elapsed, encrypted = timed(encrypt)
+        encrypt_times.append(elapsed)
+        elapsed, decrypted = timed(RSACrypto.decrypt_file, encrypted, private_pem)
+        decrypt_times.append(elapsed)
+        if len(decrypted) != size:
+            raise RuntimeError("O conteúdo descriptografado não confere.")
+        del encrypted, decrypted
+    return encrypt_times, decrypt_times
+
+
+def _streaming_case(cipher, private_pem, public_pem, size, repeats, source_path):
+    directory = os.path.dirname(source_path)
+    encrypted_path = os.path.join(directory, 'criptografado.bin')
+    decrypted_path = os.path.join(directory, 'descriptografado.bin')
+    warm_up(private_pem, public_pem)
+
+    encrypt_times, decrypt_times = [], []
+    try:
+        for _ in range(repeats):
+            with open(source_path, 'rb') as source, open(encrypted_path, 'wb') as target:
+                encrypt_times.append(timed(RSACrypto.encrypt_stream, source, target, public_pem, cipher)[0])
+            with open(encrypted_path, 'rb') as source, open(decrypted_path, 'wb') as target:
+                elapsed, total = timed(RSACrypto.decrypt_stream, source, target, private_pem)
+            decrypt_times.append(elapsed)
+            if total != size:
+                raise RuntimeError("O conteúdo descriptografado não confere.")
+    finally:
+        for path in (encrypted_path, decrypted_path):
+            if os.path.exists(path):
+                os.remove(path)
+    return encrypt_times, decrypt_times
+
+
+def run_case(mode, private_pem, public_pem, size, source_path=None):
+    """Mede um caso (executado em um processo novo). Retorna as métricas do caso."""
+    repeats = repeats_for(mode, size)
+    if mode.startswith('streaming'):
+        encrypt_times, decrypt_times = _streaming_case(MODES[mode], private_pem, public_pem, size, repeats,
+                                                       source_path)
+    else:
+        encrypt_times, decrypt_times = _in_memory_case(MODES[mode], private_pem, public_pem, size, repeats)
+    encrypt_s = statistics.median(encrypt_times)
+    decrypt_s = statistics.median(decrypt_times)
+    return {
+        'repeats': repeats,
+        'encrypt_ms': encrypt_s * 1000,
+        'decrypt_ms': decrypt_s * 1000,
+        'best_encrypt_ms': min(encrypt_times) * 1000,
+        'best_decrypt_ms': min(decrypt_times) * 1000,
+        'encrypt_mb_s': size / encrypt_s / 1_000_000,
+        'decrypt_mb_s': size / decrypt_s / 1_000_000,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_isolated(*args):
+    """Executa `run_case` em um processo novo (spawn), com pico de RSS próprio."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(run_case, *args).result()
+
+
+def run_benchmark(sizes):
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'cryptography': cryptography.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'thresholds': THRESHOLDS,
+        'keygen': measure_keygen(),
+        'cases': {},
+    }
+    print(f"{'Chave':<10} {'Geração (ms)':>14}")
+    for key_type, metrics in results['keygen'].items():
+        print(f"{key_type:<10} {metrics['keygen_ms']:>14.1f}")
+
+    keys = {key_type: RSACrypto.generate_keys(key_type) for key_type in RSA_KEY_SIZES}
+    print(f"\n{'Modo':<18} {'Chave':<9} {'Tamanho':>8} {'Cript. MB/s':>12} {'Decr. MB/s':>11} "
+          f"{'Cript. ms':>10} {'Decr. ms':>10} {'Pico RSS MB':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            source_path = os.path.join(directory, 'entrada.bin')
+            write_sample_file(source_path, size)
+            for mode in MODES:
+                if mode == 'legado' and size > LEGACY_MAX_SIZE:
+                    continue
+                if not mode.startswith('streaming') and size > IN_MEMORY_MAX_SIZE:
+                    continue
+                for key_type, (private_pem, public_pem) in keys.items():
+                    metrics = run_isolated(mode, private_pem, public_pem, size, source_path)
+                    results['cases'][f"{mode}/{key_type}/{format_size(size)}"] = metrics
+                    peak = f"{metrics['peak_rss_mb']:.1f}" if metrics['peak_rss_mb'] is not None else '-'
+                    print(f"{mode:<18} {key_type:<9} {format_size(size):>8} {metrics['encrypt_mb_s']:>12.1f} "
+                          f"{metrics['decrypt_mb_s']:>11.1f} {metrics['encrypt_ms']:>10.2f} "
+                          f"{metrics['decrypt_ms']:>10.2f} {peak:>12}")
+            os.remove(source_path)
+    return results
+
+
+def compare(results, baseline):
+    """
+    Compara os resultados com a base: tempos e memória pioram quando sobem.
+    Os limites são os gravados na base (padrão: THRESHOLDS). Casos ausentes
+    em um dos lados são ignorados.
+    :return: Lista de regressões (descrições).
+    """
+    thresholds = baseline.get('thresholds', THRESHOLDS)
+    regressions = []
+    groups = [('keygen', name) for name in results['keygen']] + [('cases', name) for name in results['cases']]
+    for group, name in groups:
+        previous = baseline.get(group, {}).get(name)
+        if previous is None:
+            continue
+        for metric, (relative, absolute) in thresholds.items():
+            value = results[group][name].get(metric)
+            old = previous.get(metric)
+            if value is None or not old:
+                continue
+            worse = value - old
+            if worse > old * relative and worse > absolute:
+                regressions.append(f"{name} {metric}: {old:.2f} -> {value:.2f} "
+                                   f"({worse / old:+.0%} pior; limite {relative:.0%})")
+    return regressions
+
+
+def main(argv):
+    save_path = compare_path = None
+    sizes = []
+    arguments = iter(argv)
+    for argument in arguments:
+        if argument == '--salvar':
+            save_path = next(arguments)
+        elif argument == '--comparar':
+            compare_path = next(arguments)
+        else:
+            sizes.append(parse_size(argument))
+
+    results = run_benchmark(sizes or [parse_size(size) for size in DEFAULT_SIZES])
+
+    if save_path:
+        with open(save_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBase gravada em {save_path}")
+    if compare_path:
+        with open(compare_path, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f))
+        print(f"\n{len(regressions)} regressão(ões) em relação a {compare_path}")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
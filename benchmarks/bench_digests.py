@@ -0,0 +1,54 @@
+"""
+Benchmark dos algoritmos de digest: MB/s de cada algoritmo e de todos juntos
+em uma única passada (MultiHasher) x uma passada por algoritmo.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_digests [tamanho_em_MB ...]
+"""
+import io
+import sys
+import time
+
+from contract_manager import ContractManager
+from digest_utils import DIGEST_ALGORITHMS, MultiHasher
+
+
+def measure(func, *args):
+    """Executa `func` e retorna o tempo em segundos."""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def hash_single(data, algorithm):
+    return ContractManager.hash_stream(io.BytesIO(data), algorithm=algorithm)
+
+
+def hash_separate_passes(data):
+    return {algorithm: hash_single(data, algorithm) for algorithm in DIGEST_ALGORITHMS}
+
+
+def hash_single_pass(data):
+    hasher = MultiHasher(DIGEST_ALGORITHMS)
+    stream = io.BytesIO(data)
+    for chunk in iter(lambda: stream.read(1024 * 1024), b''):
+        hasher.update(chunk)
+    return hasher.hexdigests()
+
+
+def main(sizes_mb):
+    print(f"{'Tamanho':>10} {'Algoritmo':<28} {'MB/s':>10}")
+    for size_mb in sizes_mb:
+        unit = "Cláusula contratual de exemplo. ".encode('utf-8')
+        data = unit * (size_mb * 1_000_000 // len(unit))
+        for algorithm in DIGEST_ALGORITHMS:
+            elapsed = measure(hash_single, data, algorithm)
+            print(f"{size_mb:>8} MB {algorithm:<28} {size_mb / elapsed:>10.1f}")
+        for name, func in (("todos (passadas separadas)", hash_separate_passes),
+                           ("todos (passada única)", hash_single_pass)):
+            elapsed = measure(func, data)
+            print(f"{size_mb:>8} MB {name:<28} {size_mb / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1, 16, 128])
@@ -0,0 +1,56 @@
+"""
+Benchmark do hashing de contratos: texto inteiro em memória x streaming em
+blocos, e o registro completo feito pela página (hash, spool e gravação no
+store, pelo registro compartilhado com os índices da página ligados).
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_hashing [tamanho_em_MB ...]
+"""
+import io
+import sys
+import time
+import tracemalloc
+
+from contract_manager import ContractManager
+from contract_registry import SharedContractRegistry
+
+
+def measure(func, *args):
+    """Executa `func` e retorna (segundos, pico de memória alocada em bytes)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def hash_whole_text(data):
+    # Caminho antigo da página: decodifica o upload inteiro e faz o hash do texto
+    text = io.StringIO(data.decode('utf-8')).read()
+    return ContractManager.hash_text(text)
+
+
+def hash_streaming(data):
+    return ContractManager.hash_stream(io.BytesIO(data))
+
+
+def register(data):
+    # Caminho da página: add_contract_stream em um registro novo (sem duplicata)
+    manager = SharedContractRegistry(ContractManager(similarity=True, chunking=True, search=True))
+    return manager.add_contract_stream(io.BytesIO(data))
+
+
+def main(sizes_mb):
+    print(f"{'Tamanho':>10} {'Método':<12} {'MB/s':>10} {'Pico (MB)':>10}")
+    for size_mb in sizes_mb:
+        unit = "Cláusula contratual de exemplo. ".encode('utf-8')
+        data = unit * (size_mb * 1_000_000 // len(unit))
+        for name, func in (("texto", hash_whole_text), ("streaming", hash_streaming), ("registro", register)):
+            elapsed, peak = measure(func, data)
+            print(f"{size_mb:>8} MB {name:<12} {size_mb / elapsed:>10.1f} {peak / 1_000_000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1, 16, 128])
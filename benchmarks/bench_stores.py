@@ -0,0 +1,93 @@
+"""
+Benchmark dos armazenamentos de contratos: registro (contratos/s, em lotes),
+reabertura (leitura dos metadados sem os textos) e consultas por hash e por
+texto.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_stores [quantidade]
+
+Mede memória e SQLite; o MongoDB entra se MONGO_URI estiver definida (ex.:
+mongodb://localhost:27017/bench — a coleção 'contracts' do banco é apagada).
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from contract_db_store import DEFAULT_INSERT_BATCH, SQLiteContractStore, open_database_store
+from contract_manager import ContractManager
+from contract_store import MemoryContractStore
+
+LOOKUPS = 10_000
+TEXT_READS = 1_000
+
+
+def contract_text(i):
+    return f"Contrato de prestação de serviços nº {i}. Cláusula 1: objeto. Cláusula 2: prazo de {i % 36 + 1} meses."
+
+
+def new_manager(store):
+    # Só os índices de hash: o benchmark mede o armazenamento, não os índices derivados
+    return ContractManager(store, similarity=False, chunking=False, search=False)
+
+
+def register(manager, count):
+    start = time.perf_counter()
+    for first in range(0, count, DEFAULT_INSERT_BATCH):
+        with manager.store.batch():
+            for i in range(first, min(count, first + DEFAULT_INSERT_BATCH)):
+                manager.add_contract(contract_text(i))
+    return time.perf_counter() - start
+
+
+def lookups(manager, count):
+    sample = random.Random(1).sample(range(count), min(LOOKUPS, count))
+    hashes = [ContractManager.hash_text(contract_text(i)) for i in sample]
+    start = time.perf_counter()
+    for contract_hash in hashes:
+        manager.get_contract_info(manager.find_number_by_hash(contract_hash))
+    hash_elapsed = time.perf_counter() - start
+
+    numbers = [i + 1 for i in sample[:TEXT_READS]]
+    start = time.perf_counter()
+    for number in numbers:
+        manager.store.read_text(number)
+    return hash_elapsed / len(hashes), (time.perf_counter() - start) / len(numbers)
+
+
+def run(name, open_store, count):
+    manager = new_manager(open_store())
+    register_elapsed = register(manager, count)
+
+    start = time.perf_counter()
+    manager = new_manager(open_store())
+    reopen_elapsed = time.perf_counter() - start
+    assert manager.total_contracts == count
+
+    hash_latency, text_latency = lookups(manager, count)
+    print(f"{name:<10} {count / register_elapsed:>14,.0f} {reopen_elapsed:>11.2f} "
+          f"{hash_latency * 1e6:>13.1f} {text_latency * 1e6:>13.1f}")
+
+
+def main(count):
+    print(f"{'Store':<10} {'Registro (/s)':>14} {'Reabrir (s)':>11} "
+          f"{'Hash (µs)':>13} {'Texto (µs)':>13}")
+
+    memory_store = MemoryContractStore()
+    run("memória", lambda: memory_store, count)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "contratos.db")
+        run("SQLite", lambda: SQLiteContractStore(path), count)
+
+    mongo_uri = os.environ.get("MONGO_URI")
+    if mongo_uri:
+        store = open_database_store(mongo_uri)
+        store.collection.drop()
+        store.config_collection.drop()
+        run("MongoDB", lambda: open_database_store(mongo_uri), count)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,143 @@
+"""
+Estruturas de blockchain (bloco e cadeia) usadas pelas páginas educacionais.
+
+Uma `Blockchain` criada com `path` é gravada em JSON Lines (um bloco por
+linha, acrescentado a cada `add_block`) e recarregada ao ser reaberta, como a
+que ancora as raízes de Merkle do registro de contratos.
+"""
+import datetime
+import json
+import os
+import time
+
+from digest_utils import DEFAULT_ALGORITHM, digest_bytes
+
+
+class Block:
+    def __init__(self, index, timestamp, data, previous_hash, difficulty=0, algorithm=DEFAULT_ALGORITHM):
+        self.index = index
+        self.timestamp = timestamp
+        self.data = data
+        self.previous_hash = previous_hash
+        self.difficulty = difficulty
+        self.algorithm = algorithm
+        self.nonce = 0
+        self.hash = self.calculate_hash()
+    
+    def calculate_hash(self):
+        hash_string = str(self.index) + str(self.timestamp) + str(self.data) + str(self.previous_hash) + str(self.nonce)
+        return digest_bytes(hash_string.encode(), self.algorithm)
+    
+    def mine_block(self, difficulty):
+        """Minera o bloco encontrando um hash com o número especificado de zeros à esquerda."""
+        target = "0" * difficulty
+        start_time = time.time()
+        
+        while self.hash[:difficulty] != target:
+            self.nonce += 1
+            self.hash = self.calculate_hash()
+        
+        end_time = time.time()
+        mining_time = end_time - start_time
+        
+        return mining_time, self.nonce
+    
+    def to_dict(self):
+        return {
+            'index': self.index,
+            'timestamp': str(self.timestamp),
+            'data': self.data,
+            'previous_hash': self.previous_hash,
+            'hash': self.hash,
+            'nonce': self.nonce,
+            'difficulty': self.difficulty,
+            'algorithm': self.algorithm
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstrói um bloco gravado com `to_dict` (o hash gravado é mantido, para que `is_valid` o confira)."""
+        block = cls(data['index'], data['timestamp'], data['data'], data['previous_hash'],
+                    data['difficulty'], data.get('algorithm', DEFAULT_ALGORITHM))
+        block.nonce = data['nonce']
+        block.hash = data['hash']
+        return block
+
+
+class Blockchain:
+    def __init__(self, difficulty=0, algorithm=DEFAULT_ALGORITHM, path=None):
+        self.difficulty = difficulty
+        # Algoritmo de digest dos novos blocos ('sha256', 'blake2b' ou 'sha3_256')
+        self.algorithm = algorithm
+        # Arquivo JSON Lines onde os blocos são gravados (None = só em memória)
+        self.path = path
+        self.chain = self._load() if path and os.path.exists(path) else []
+        if not self.chain:
+            self.chain = [self.create_genesis_block()]
+            self._save_block(self.chain[0])
+
+    def _load(self):
+        """Lê os blocos gravados, descartando uma última linha incompleta (gravação interrompida)."""
+        chain = []
+        valid_length = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                chain.append(Block.from_dict(json.loads(line)))
+                valid_length += len(line)
+        if os.path.getsize(self.path) > valid_length:
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_length)
+        return chain
+
+    def _save_block(self, block):
+        if self.path:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(block.to_dict()) + '\n')
+    
+    def create_genesis_block(self):
+        return Block(0, datetime.datetime.now(), "Genesis Block", "0", self.difficulty, self.algorithm)
+    
+    def get_latest_block(self):
+        return self.chain[-1]
+    
+    def add_block(self, data, mine=False):
+        index = len(self.chain)
+        timestamp = datetime.datetime.now()
+        previous_hash = self.get_latest_block().hash
+        new_block = Block(index, timestamp, data, previous_hash, self.difficulty, self.algorithm)
+        
+        mining_time = 0
+        nonce = 0
+        
+        if mine and self.difficulty > 0:
+            mining_time, nonce = new_block.mine_block(self.difficulty)
+        
+        self._save_block(new_block)
+        self.chain.append(new_block)
+        return mining_time, nonce
+    
+    def is_valid(self):
+        if self.chain[0].previous_hash != "0":
+            return False
+        
+        for i in range(1, len(self.chain)):
+            current_block = self.chain[i]
+            previous_block = self.chain[i-1]
+            
+            if current_block.hash != current_block.calculate_hash():
+                return False
+            if current_block.previous_hash != previous_block.hash:
+                return False
+            
+            # Verifica se o bloco foi minerado corretamente (se tiver dificuldade)
+            if current_block.difficulty > 0:
+                target = "0" * current_block.difficulty
+                if current_block.hash[:current_block.difficulty] != target:
+                    return False
+        
+        return True
+    
+    def to_json(self):
+        return json.dumps([block.to_dict() for block in self.chain], indent=4)
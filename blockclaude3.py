@@ -1,100 +1,9 @@
 import streamlit as st
-import hashlib
 import datetime
-import json
 import pandas as pd
 import time
 
-
-class Block:
-    def __init__(self, index, timestamp, data, previous_hash, difficulty=0):
-        self.index = index
-        self.timestamp = timestamp
-        self.data = data
-        self.previous_hash = previous_hash
-        self.difficulty = difficulty
-        self.nonce = 0
-        self.hash = self.calculate_hash()
-    
-    def calculate_hash(self):
-        hash_string = str(self.index) + str(self.timestamp) + str(self.data) + str(self.previous_hash) + str(self.nonce)
-        return hashlib.sha256(hash_string.encode()).hexdigest()
-    
-    def mine_block(self, difficulty):
-        """Minera o bloco encontrando um hash com o número especificado de zeros à esquerda."""
-        target = "0" * difficulty
-        start_time = time.time()
-        
-        while self.hash[:difficulty] != target:
-            self.nonce += 1
-            self.hash = self.calculate_hash()
-        
-        end_time = time.time()
-        mining_time = end_time - start_time
-        
-        return mining_time, self.nonce
-    
-    def to_dict(self):
-        return {
-            'index': self.index,
-            'timestamp': str(self.timestamp),
-            'data': self.data,
-            'previous_hash': self.previous_hash,
-            'hash': self.hash,
-            'nonce': self.nonce,
-            'difficulty': self.difficulty
-        }
-
-
-class Blockchain:
-    def __init__(self, difficulty=0):
-        self.difficulty = difficulty
-        self.chain = [self.create_genesis_block()]
-    
-    def create_genesis_block(self):
-        return Block(0, datetime.datetime.now(), "Genesis Block", "0", self.difficulty)
-    
-    def get_latest_block(self):
-        return self.chain[-1]
-    
-    def add_block(self, data, mine=False):
-        index = len(self.chain)
-        timestamp = datetime.datetime.now()
-        previous_hash = self.get_latest_block().hash
-        new_block = Block(index, timestamp, data, previous_hash, self.difficulty)
-        
-        mining_time = 0
-        nonce = 0
-        
-        if mine and self.difficulty > 0:
-            mining_time, nonce = new_block.mine_block(self.difficulty)
-        
-        self.chain.append(new_block)
-        return mining_time, nonce
-    
-    def is_valid(self):
-        if self.chain[0].previous_hash != "0":
-            return False
-        
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i-1]
-            
-            if current_block.hash != current_block.calculate_hash():
-                return False
-            if current_block.previous_hash != previous_block.hash:
-                return False
-            
-            # Verifica se o bloco foi minerado corretamente (se tiver dificuldade)
-            if current_block.difficulty > 0:
-                target = "0" * current_block.difficulty
-                if current_block.hash[:current_block.difficulty] != target:
-                    return False
-        
-        return True
-    
-    def to_json(self):
-        return json.dumps([block.to_dict() for block in self.chain], indent=4)
+from blockchain import Blockchain
 
 
 # Configuração da página
@@ -0,0 +1,328 @@
+"""
+Operações em lote sobre contratos: registro e verificação de muitos arquivos a
+partir de um arquivo ZIP, de um diretório do servidor ou de vários uploads,
+com hashing paralelo.
+"""
+import codecs
+import contextlib
+import csv
+import io
+import lzma
+import os
+import time
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from contract_manager import ContentIndexer, ContractManager, iter_chunks
+from digest_utils import DEFAULT_ALGORITHM, MultiHasher
+
+# Número de arquivos hashados e inseridos por lote
+DEFAULT_BATCH_SIZE = 256
+
+# Arquivo ZIP aberto uma única vez em cada processo worker
+_worker_zip: Optional[zipfile.ZipFile] = None
+
+# Erros ao ler um arquivo, relatados para aquele arquivo sem interromper o lote: membros do ZIP
+# criptografados (RuntimeError), com compressão não suportada (NotImplementedError) ou corrompidos
+MEMBER_ERRORS = (OSError, EOFError, RuntimeError, NotImplementedError, UnicodeDecodeError,
+                 zipfile.BadZipFile, zlib.error, lzma.LZMAError)
+
+
+def list_directory(directory: str, extension: str = '.txt') -> List[str]:
+    """
+    Lista recursivamente os arquivos de um diretório, em ordem determinística.
+    :param directory: Caminho do diretório no servidor.
+    :param extension: Extensão dos arquivos considerados.
+    :return: Lista de caminhos relativos ao diretório.
+    """
+    names = []
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if filename.lower().endswith(extension):
+                names.append(os.path.relpath(os.path.join(dirpath, filename), directory))
+    return sorted(names)
+
+
+def list_zip(zip_path: str, extension: str = '.txt') -> List[str]:
+    """
+    Lista os arquivos de um ZIP, na ordem em que aparecem no arquivo.
+    :param zip_path: Caminho do arquivo ZIP.
+    :param extension: Extensão dos arquivos considerados.
+    :return: Lista de nomes dos membros.
+    """
+    with zipfile.ZipFile(zip_path) as archive:
+        return [info.filename for info in archive.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(extension)]
+
+
+def _list_source(directory: Optional[str], zip_path: Optional[str]) -> List[str]:
+    """Lista os arquivos da origem informada (diretório ou ZIP, exatamente um)."""
+    if (directory is None) == (zip_path is None):
+        raise ValueError("Informe exatamente um entre 'directory' e 'zip_path'.")
+    return list_zip(zip_path) if zip_path else list_directory(directory)
+
+
+def _init_worker(zip_path: Optional[str]) -> None:
+    global _worker_zip
+    _worker_zip = zipfile.ZipFile(zip_path) if zip_path else None
+
+
+def _open_member(root: Optional[str], name: str, archive: Optional[zipfile.ZipFile] = None):
+    """Abre um arquivo do diretório `root` ou do ZIP (`archive` ou o aberto no processo worker)."""
+    archive = archive if archive is not None else _worker_zip
+    if archive is not None:
+        return archive.open(name)
+    return open(os.path.join(root, name), 'rb')
+
+
+# Resultado do hashing de um arquivo: (nome, digests por algoritmo ou None, tamanho, erro ou None,
+# dados dos índices derivados do texto ou None)
+HashedFile = Tuple[str, Optional[Dict[str, str]], int, Optional[str], Optional[Dict]]
+
+
+def _hash_member(task: Tuple[Optional[str], str, Tuple[str, ...], Optional[Dict]],
+                 archive: Optional[zipfile.ZipFile] = None) -> HashedFile:
+    """
+    Calcula os hashes de um arquivo (um por algoritmo, em uma única passada),
+    validando o UTF-8 em streaming e, com opções de indexação, os dados dos
+    índices derivados do texto na mesma passada. Executado nos processos
+    worker ou, sem pool, no próprio processo com o ZIP em `archive`.
+    :return: (nome, digests ou None, tamanho, mensagem de erro ou None, dados dos índices ou None)
+    """
+    root, name, algorithms, indexing = task
+    hasher = MultiHasher(algorithms)
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    indexer = ContentIndexer(**indexing) if indexing is not None else None
+    size = 0
+    try:
+        with _open_member(root, name, archive) as f:
+            for chunk in iter_chunks(f):
+                decoder.decode(chunk)
+                hasher.update(chunk)
+                if indexer is not None:
+                    indexer.update(chunk)
+                size += len(chunk)
+        decoder.decode(b'', final=True)
+    except MEMBER_ERRORS as e:
+        return name, None, size, str(e), None
+    return name, hasher.hexdigests(), size, None, indexer.finish() if indexer is not None else None
+
+
+def hash_files(names: List[str], root: Optional[str] = None, zip_path: Optional[str] = None,
+               workers: Optional[int] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+               algorithms: Iterable[str] = (DEFAULT_ALGORITHM,),
+               indexing: Optional[Dict] = None) -> Iterator[List[HashedFile]]:
+    """
+    Calcula os hashes de muitos arquivos em um pool de processos.
+    Os resultados são entregues em lotes, na mesma ordem de `names`.
+    :param names: Nomes dos arquivos (relativos a `root` ou membros de `zip_path`).
+    :param root: Diretório base dos arquivos (quando não for ZIP).
+    :param zip_path: Caminho do arquivo ZIP (quando não for diretório).
+    :param workers: Número de processos (padrão: número de CPUs). 1 = sem pool.
+    :param batch_size: Quantidade de arquivos por lote entregue.
+    :param algorithms: Algoritmos de digest calculados para cada arquivo.
+    :param indexing: Opções do `ContentIndexer` (ver `ContractManager.indexer_options`),
+                     para calcular também os dados dos índices derivados do texto.
+    """
+    algorithms = tuple(algorithms)
+    tasks = [(root, name, algorithms, indexing) for name in names]
+    batches = (tasks[i:i + batch_size] for i in range(0, len(tasks), batch_size))
+
+    if workers == 1:
+        # Sem pool, o ZIP é aberto só para esta chamada: o global é exclusivo dos workers,
+        # e outras sessões podem estar registrando ou verificando ao mesmo tempo
+        with (zipfile.ZipFile(zip_path) if zip_path else contextlib.nullcontext()) as archive:
+            for batch in batches:
+                yield [_hash_member(task, archive) for task in batch]
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(zip_path,)) as executor:
+        chunksize = max(1, batch_size // (4 * (workers or os.cpu_count() or 1)))
+        for batch in batches:
+            yield list(executor.map(_hash_member, batch, chunksize=chunksize))
+
+
+def bulk_register(manager: ContractManager, directory: Optional[str] = None,
+                  zip_path: Optional[str] = None, workers: Optional[int] = None,
+                  batch_size: int = DEFAULT_BATCH_SIZE,
+                  progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """
+    Registra todos os arquivos .txt de um diretório ou de um ZIP.
+
+    O hashing é feito em paralelo, junto com os dados dos índices derivados do
+    texto (se o `manager` os mantiver); a inserção no `manager` acontece no
+    processo principal, lote a lote e na ordem dos arquivos, de modo que a
+    numeração dos contratos é determinística. Arquivos cujo hash já está
+    registrado (no registro ou no próprio lote) não são lidos novamente.
+
+    :param manager: O ContractManager que receberá os contratos.
+    :param directory: Diretório no servidor com os arquivos.
+    :param zip_path: Arquivo ZIP com os arquivos.
+    :param workers: Número de processos de hashing (padrão: número de CPUs).
+    :param batch_size: Quantidade de arquivos por lote.
+    :param progress: Função chamada com (processados, total) após cada lote.
+    :return: Relatório com 'registered', 'duplicates', 'errors' (listas de
+             dicionários), 'total', 'bytes', 'elapsed' e 'files_per_second'.
+    """
+    names = _list_source(directory, zip_path)
+    report = {'registered': [], 'duplicates': [], 'errors': [],
+              'total': len(names), 'bytes': 0}
+    start_time = time.perf_counter()
+    done = 0
+
+    archive = zipfile.ZipFile(zip_path) if zip_path else None
+    try:
+        for batch in hash_files(names, root=directory, zip_path=zip_path, workers=workers,
+                                batch_size=batch_size, algorithms=manager.digest_algorithms,
+                                indexing=manager.indexer_options):
+            # Em bancos de dados, os contratos do lote são gravados em um único envio
+            with manager.store.batch():
+                for name, digests, size, error, content in batch:
+                    if error is not None:
+                        report['errors'].append({'file': name, 'error': error})
+                        continue
+
+                    report['bytes'] += size
+                    existing_number = manager.find_number_by_digests(digests)
+                    if existing_number is not None:
+                        report['duplicates'].append({'file': name, 'number': existing_number,
+                                                     'hash': manager.store.hash_at(existing_number)})
+                        continue
+
+                    contract_hash = digests[manager.algorithm]
+
+                    try:
+                        with _open_member(directory, name, archive) as source:
+                            number = manager.add_hashed_contract_stream(contract_hash, source, content=content)
+                    except MEMBER_ERRORS as e:
+                        # Ex.: o arquivo mudou no diretório depois do hashing
+                        report['errors'].append({'file': name, 'error': str(e)})
+                        continue
+                    report['registered'].append({'file': name, 'number': number, 'hash': contract_hash})
+
+            done += len(batch)
+            if progress is not None:
+                progress(done, len(names))
+    finally:
+        if archive is not None:
+            archive.close()
+
+    report['elapsed'] = time.perf_counter() - start_time
+    report['files_per_second'] = len(names) / report['elapsed'] if report['elapsed'] > 0 else 0.0
+    return report
+
+
+def _verify_hashed(manager: ContractManager, hashed: Iterable[List[HashedFile]],
+                   total: int, progress: Optional[Callable[[int, int], None]]) -> Dict:
+    """Confere lotes de (nome, digests, tamanho, erro, _) contra o índice de hashes."""
+    report = {'results': [], 'matched': 0, 'not_found': 0, 'errors': 0,
+              'total': total, 'bytes': 0}
+    start_time = time.perf_counter()
+    done = 0
+
+    for batch in hashed:
+        for name, digests, size, error, _ in batch:
+            algorithm, contract_hash = manager.algorithm, None
+            if error is not None:
+                status, number = 'erro', None
+                report['errors'] += 1
+            else:
+                report['bytes'] += size
+                number = manager.find_number_by_digests(digests)
+                if number is not None:
+                    status = 'confere'
+                    algorithm = manager.store.algorithm_at(number)
+                    report['matched'] += 1
+                else:
+                    status = 'nao_encontrado'
+                    report['not_found'] += 1
+                contract_hash = digests[algorithm]
+            report['results'].append({'file': name, 'status': status, 'number': number,
+                                      'hash': contract_hash, 'algorithm': algorithm, 'error': error})
+        done += len(batch)
+        if progress is not None:
+            progress(done, total)
+
+    report['elapsed'] = time.perf_counter() - start_time
+    report['files_per_second'] = total / report['elapsed'] if report['elapsed'] > 0 else 0.0
+    return report
+
+
+def batch_verify(manager: ContractManager, directory: Optional[str] = None,
+                 zip_path: Optional[str] = None, workers: Optional[int] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """
+    Verifica todos os arquivos .txt de um diretório ou de um ZIP contra o registro,
+    em uma única passada, com hashing paralelo em processos.
+    :param manager: O ContractManager com os contratos registrados.
+    :param directory: Diretório no servidor com os arquivos.
+    :param zip_path: Arquivo ZIP com os arquivos.
+    :param workers: Número de processos de hashing (padrão: número de CPUs).
+    :param batch_size: Quantidade de arquivos por lote.
+    :param progress: Função chamada com (processados, total) após cada lote.
+    :return: Relatório com 'results' (um dicionário por arquivo com 'file',
+             'status', 'number', 'hash', 'algorithm', 'error'), as contagens 'matched',
+             'not_found', 'errors', e 'total', 'bytes', 'elapsed', 'files_per_second'.
+    """
+    names = _list_source(directory, zip_path)
+    hashed = hash_files(names, root=directory, zip_path=zip_path, workers=workers,
+                        batch_size=batch_size, algorithms=manager.digest_algorithms)
+    return _verify_hashed(manager, hashed, len(names), progress)
+
+
+def _hash_buffer(item: Tuple[str, BinaryIO, Tuple[str, ...]]) -> HashedFile:
+    name, f, algorithms = item
+    try:
+        f.seek(0)
+        hasher = MultiHasher(algorithms)
+        size = 0
+        for chunk in iter_chunks(f):
+            hasher.update(chunk)
+            size += len(chunk)
+    except OSError as e:
+        return name, None, 0, str(e), None
+    return name, hasher.hexdigests(), size, None, None
+
+
+def batch_verify_files(manager: ContractManager, files: List[Tuple[str, BinaryIO]],
+                       workers: Optional[int] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                       progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """
+    Verifica vários arquivos já abertos (ex.: uploads do Streamlit) contra o registro.
+    Os arquivos já estão na memória do processo, então o hashing usa threads
+    (o hashlib libera o GIL em blocos grandes) em vez de processos.
+    :param manager: O ContractManager com os contratos registrados.
+    :param files: Lista de (nome, arquivo binário).
+    :param workers: Número de threads de hashing.
+    :param batch_size: Quantidade de arquivos por lote.
+    :param progress: Função chamada com (processados, total) após cada lote.
+    :return: Relatório no mesmo formato de `batch_verify`.
+    """
+    algorithms = tuple(manager.digest_algorithms)
+
+    def hashed():
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for i in range(0, len(files), batch_size):
+                batch = [(name, f, algorithms) for name, f in files[i:i + batch_size]]
+                yield list(executor.map(_hash_buffer, batch))
+
+    return _verify_hashed(manager, hashed(), len(files), progress)
+
+
+def verification_report_csv(report: Dict) -> str:
+    """
+    Gera o relatório de verificação em CSV (uma linha por arquivo).
+    :param report: Relatório retornado por `batch_verify` ou `batch_verify_files`.
+    :return: Conteúdo CSV com as colunas arquivo, status, contrato, hash, algoritmo, erro.
+    """
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['arquivo', 'status', 'contrato', 'hash', 'algoritmo', 'erro'])
+    for row in report['results']:
+        writer.writerow([row['file'], row['status'], row['number'] or '',
+                         row['hash'] or '', row['algorithm'] if row['hash'] else '', row['error'] or ''])
+    return output.getvalue()
@@ -0,0 +1,166 @@
+"""
+Divisão de contratos em blocos definidos pelo conteúdo (content-defined chunking).
+
+As fronteiras são escolhidas por um hash rolante do tipo "gear" (como no
+FastCDC): o hash depende apenas dos últimos ~64 bytes, então uma alteração em
+um trecho do contrato muda só os blocos vizinhos, e os demais continuam com o
+mesmo digest. Comparar as listas de digests localiza as regiões alteradas sem
+um diff do texto completo.
+"""
+import hashlib
+import random
+from array import array
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+MIN_CHUNK_SIZE = 256
+AVG_CHUNK_BITS = 10          # tamanho médio ~ MIN_CHUNK_SIZE + 2^10 bytes
+MAX_CHUNK_SIZE = 8 * 1024
+DIGEST_SIZE = 16
+
+_HASH_BITS = 64
+_HASH_MASK = (1 << _HASH_BITS) - 1
+# Os bits altos do hash gear dependem da janela inteira de 64 bytes
+_BOUNDARY_SHIFT = _HASH_BITS - AVG_CHUNK_BITS
+
+_rng = random.Random(20240602)
+_GEAR = [_rng.getrandbits(_HASH_BITS) for _ in range(256)]
+
+# Um bloco: (deslocamento, tamanho, digest hex)
+Chunk = Tuple[int, int, str]
+
+
+def chunk_digest(data: bytes) -> str:
+    """Digest de um bloco (BLAKE2b de 128 bits)."""
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).hexdigest()
+
+
+def _find_boundary(data: bytes, start: int, end: int) -> int:
+    """Posição (exclusiva) do fim do bloco que começa em `start` dentro de data[:end]."""
+    limit = min(end, start + MAX_CHUNK_SIZE)
+    position = start + MIN_CHUNK_SIZE
+    if position >= limit:
+        return limit
+    gear, mask, shift = _GEAR, _HASH_MASK, _BOUNDARY_SHIFT
+    h = 0
+    for byte in data[position:limit]:
+        h = ((h << 1) + gear[byte]) & mask
+        position += 1
+        if not h >> shift:
+            return position
+    return limit
+
+
+class ContentDefinedChunker:
+    """
+    Divide um fluxo de bytes recebido em partes nos mesmos blocos que
+    `chunk_bytes` produziria para os dados completos.
+    """
+
+    def __init__(self):
+        self._buffer = b''
+        self._offset = 0
+
+    def update(self, data: bytes) -> Iterator[Tuple[int, bytes]]:
+        """Recebe mais dados e retorna os blocos completos: (deslocamento, bytes)."""
+        buffer = self._buffer + data
+        start = 0
+        # Só corta quando há bytes suficientes para um bloco máximo: a fronteira
+        # de um bloco ainda incompleto poderia mudar com os próximos dados
+        while len(buffer) - start >= MAX_CHUNK_SIZE:
+            end = _find_boundary(buffer, start, len(buffer))
+            yield self._offset, buffer[start:end]
+            self._offset += end - start
+            start = end
+        self._buffer = buffer[start:]
+
+    def finish(self) -> Iterator[Tuple[int, bytes]]:
+        """Retorna os blocos restantes no fim do fluxo."""
+        buffer, start = self._buffer, 0
+        while start < len(buffer):
+            end = _find_boundary(buffer, start, len(buffer))
+            yield self._offset, buffer[start:end]
+            self._offset += end - start
+            start = end
+        self._buffer = b''
+
+
+class ChunkRecorder:
+    """Acumula (deslocamento, tamanho, digest) dos blocos de um fluxo."""
+
+    def __init__(self):
+        self._chunker = ContentDefinedChunker()
+        self.chunks: List[Chunk] = []
+
+    def update(self, data: bytes) -> None:
+        for offset, chunk in self._chunker.update(data):
+            self.chunks.append((offset, len(chunk), chunk_digest(chunk)))
+
+    def finish(self) -> List[Chunk]:
+        for offset, chunk in self._chunker.finish():
+            self.chunks.append((offset, len(chunk), chunk_digest(chunk)))
+        return self.chunks
+
+
+def chunk_bytes(data: bytes) -> List[Chunk]:
+    """Blocos de um conteúdo completo: lista de (deslocamento, tamanho, digest)."""
+    recorder = ChunkRecorder()
+    recorder.update(data)
+    return recorder.finish()
+
+
+def chunk_stream(chunks: Iterable[bytes]) -> List[Chunk]:
+    """Blocos de um conteúdo recebido em partes."""
+    recorder = ChunkRecorder()
+    for data in chunks:
+        recorder.update(data)
+    return recorder.finish()
+
+
+def pack_chunks(chunks: List[Chunk]) -> Tuple[array, bytes]:
+    """Forma compacta de uma lista de blocos: (tamanhos, digests concatenados)."""
+    sizes = array('I', (size for _, size, _ in chunks))
+    return sizes, b''.join(bytes.fromhex(digest) for _, _, digest in chunks)
+
+
+def unpack_chunks(packed: Tuple[array, bytes]) -> List[Chunk]:
+    """Reconstrói a lista de (deslocamento, tamanho, digest) a partir de `pack_chunks`."""
+    sizes, digests = packed
+    chunks, offset = [], 0
+    for i, size in enumerate(sizes):
+        chunks.append((offset, size, digests[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE].hex()))
+        offset += size
+    return chunks
+
+
+def _merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged: List[Tuple[int, int]] = []
+    for start, end in ranges:
+        if merged and merged[-1][1] == start:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def compare_chunks(reference: List[Chunk], candidate: List[Chunk]) -> Dict:
+    """
+    Compara as listas de blocos de um contrato registrado e de um arquivo.
+    O custo é proporcional ao número de blocos (não ao tamanho do texto).
+    :return: Dicionário com 'changed' (intervalos [início, fim) de bytes do
+             arquivo sem correspondência no contrato), 'removed' (intervalos do
+             contrato que não aparecem no arquivo), 'changed_bytes' e
+             'matched_chunks'.
+    """
+    reference_digests = {digest for _, _, digest in reference}
+    candidate_digests = {digest for _, _, digest in candidate}
+
+    changed = _merge_ranges([(offset, offset + size) for offset, size, digest in candidate
+                             if digest not in reference_digests])
+    removed = _merge_ranges([(offset, offset + size) for offset, size, digest in reference
+                             if digest not in candidate_digests])
+    return {
+        'changed': changed,
+        'removed': removed,
+        'changed_bytes': sum(end - start for start, end in changed),
+        'matched_chunks': sum(1 for _, _, digest in candidate if digest in reference_digests)
+    }
@@ -0,0 +1,153 @@
+"""
+Compressão dos textos de contratos armazenados (zlib ou lzma da biblioteca padrão).
+"""
+import hashlib
+import lzma
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, Iterator, Optional
+
+# Métodos suportados; None/'none' grava os bytes originais
+COMPRESSION_METHODS = ('none', 'zlib', 'lzma')
+
+# O zlib só aproveita os últimos 32 KiB do dicionário (tamanho da janela)
+MAX_DICTIONARY_SIZE = 32 * 1024
+
+
+def train_dictionary(samples: Iterable[bytes], size: int = MAX_DICTIONARY_SIZE) -> bytes:
+    """
+    Monta um dicionário compartilhado para o zlib a partir de contratos de exemplo.
+    São escolhidas as linhas que mais se repetem entre os contratos (cláusulas
+    padrão), e as mais frequentes ficam no final, onde o zlib as alcança com
+    distâncias menores.
+    :param samples: Textos (bytes UTF-8) de contratos existentes.
+    :param size: Tamanho máximo do dicionário em bytes.
+    :return: O dicionário (pode ser vazio se não houver repetições).
+    """
+    counts = Counter()
+    for sample in samples:
+        # Conta cada linha uma vez por contrato
+        counts.update({line.strip() for line in sample.splitlines() if len(line.strip()) >= 8})
+
+    # Prioriza as linhas pelo total de bytes que economizam
+    ranked = sorted((line for line, count in counts.items() if count > 1),
+                    key=lambda line: counts[line] * len(line), reverse=True)
+    chosen, total = [], 0
+    for line in ranked:
+        if total + len(line) + 1 > size:
+            continue
+        chosen.append(line)
+        total += len(line) + 1
+    return b'\n'.join(reversed(chosen))
+
+
+class TextCompressor:
+    """
+    Comprime e descomprime os textos armazenados, em bloco único ou em streaming.
+    """
+
+    # Cifra dos textos armazenados; None = sem criptografia (ver contract_encryption)
+    encryption: Optional[str] = None
+
+    def __init__(self, method: Optional[str] = 'zlib', level: Optional[int] = None,
+                 dictionary: Optional[bytes] = None):
+        method = method or 'none'
+        if method not in COMPRESSION_METHODS:
+            raise ValueError(f"Método de compressão desconhecido: {method}")
+        if dictionary and method != 'zlib':
+            raise ValueError("O dicionário compartilhado só é suportado com zlib.")
+        self.method = method
+        self.level = level
+        self.dictionary = dictionary or None
+
+    @property
+    def dictionary_id(self) -> Optional[str]:
+        """Identificador curto (SHA-256 truncado) do dicionário em uso."""
+        if self.dictionary is None:
+            return None
+        return hashlib.sha256(self.dictionary).hexdigest()[:16]
+
+    @property
+    def settings(self) -> Dict:
+        """Configuração gravada pelos armazenamentos persistentes (o dicionário é gravado à parte)."""
+        return {'compression': self.method, 'level': self.level, 'dictionary_id': self.dictionary_id}
+
+    def restore(self, settings: Dict, dictionary: Optional[bytes]) -> 'TextCompressor':
+        """
+        Compressor de um armazenamento existente, conforme a configuração
+        gravada nele (que prevalece sobre a deste compressor).
+        :raises ValueError: Se o armazenamento for criptografado.
+        """
+        if settings.get('encryption'):
+            raise ValueError("O armazenamento é criptografado: informe a chave mestra (ver contract_encryption).")
+        return TextCompressor(settings['compression'], settings.get('level'), dictionary)
+
+    def compressobj(self):
+        """Cria um compressor incremental com `compress(data)` e `flush()`."""
+        if self.method == 'zlib':
+            level = self.level if self.level is not None else zlib.Z_DEFAULT_COMPRESSION
+            if self.dictionary:
+                return zlib.compressobj(level, zdict=self.dictionary)
+            return zlib.compressobj(level)
+        if self.method == 'lzma':
+            return lzma.LZMACompressor(preset=self.level if self.level is not None else lzma.PRESET_DEFAULT)
+        return _IdentityCodec()
+
+    def decompressobj(self):
+        """Cria um descompressor incremental com `decompress(data)`."""
+        if self.method == 'zlib':
+            if self.dictionary:
+                return zlib.decompressobj(zdict=self.dictionary)
+            return zlib.decompressobj()
+        if self.method == 'lzma':
+            return lzma.LZMADecompressor()
+        return _IdentityCodec()
+
+    def compress(self, data: bytes) -> bytes:
+        """Comprime um bloco de bytes completo."""
+        compressor = self.compressobj()
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, blob: bytes) -> bytes:
+        """Descomprime um bloco de bytes completo."""
+        return self.decompressobj().decompress(blob)
+
+    def iter_decompress(self, chunks: Iterable[bytes], max_length: Optional[int] = None) -> Iterator[bytes]:
+        """
+        Descomprime uma sequência de blocos comprimidos, em streaming.
+        :param max_length: Tamanho máximo de cada bloco produzido. Sem limite, um
+            bloco comprimido muito repetitivo pode se expandir centenas de vezes.
+        """
+        decompressor = self.decompressobj()
+        for chunk in chunks:
+            if max_length is None or self.method == 'none':
+                data = decompressor.decompress(chunk)
+                if data:
+                    yield data
+                continue
+            while True:
+                data = decompressor.decompress(chunk, max_length)
+                if data:
+                    yield data
+                # zlib guarda a entrada não consumida; lzma, a saída ainda não entregue
+                if self.method == 'zlib':
+                    chunk = decompressor.unconsumed_tail
+                    if not chunk:
+                        break
+                else:
+                    chunk = b''
+                    if decompressor.needs_input or decompressor.eof:
+                        break
+
+
+class _IdentityCodec:
+    """Codec nulo, usado quando a compressão está desligada."""
+
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b''
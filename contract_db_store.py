@@ -0,0 +1,392 @@
+"""
+Armazenamento dos contratos em banco de dados: SQLite (arquivo local, sem
+dependências) ou MongoDB (pacote `pymongo`, opcional).
+
+Em ambos, cada contrato é um registro com número, hash, algoritmo, tamanhos,
+instante do registro e o texto comprimido. Na abertura, só os metadados são lidos (a consulta não
+traz o campo do texto); os textos são buscados sob demanda. As gravações feitas
+dentro de `store.batch()` são acumuladas e enviadas de uma vez
+(`executemany` / `insert_many`), e continuam legíveis enquanto aguardam.
+
+O registro deve ter um único processo gravador (ver contract_registry); outros
+processos podem abrir o mesmo banco para leitura.
+"""
+import io
+import json
+import sqlite3
+import threading
+from array import array
+from contextlib import closing, contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+from contract_compression import TextCompressor
+from contract_store import READ_CHUNK_SIZE, CompressingSpool, ContractStore, iter_slices, registration_time
+from digest_utils import ALGORITHM_NAMES, DEFAULT_ALGORITHM, DIGEST_ALGORITHMS
+
+# Quantidade máxima de contratos acumulados antes de um envio ao banco
+DEFAULT_INSERT_BATCH = 1000
+
+# Código de erro do MongoDB para chave única duplicada
+DUPLICATE_KEY_ERROR = 11000
+
+# Registro: (número, hash, id do algoritmo, tamanho original, tamanho armazenado, instante)
+RecordInfo = Tuple[int, str, int, int, int, float]
+
+# Contrato aguardando envio: (hash, id do algoritmo, tamanho original, texto comprimido, instante)
+PendingRow = Tuple[str, int, int, bytes, float]
+
+
+class _DatabaseContractStore(ContractStore):
+    """
+    Base dos armazenamentos em banco: metadados em memória (como no
+    DiskContractStore), textos comprimidos no banco e gravações em lote.
+    As subclasses implementam o acesso ao banco propriamente dito.
+    """
+
+    backend = ''
+
+    def __init__(self, compressor: Optional[TextCompressor] = None,
+                 batch_size: int = DEFAULT_INSERT_BATCH):
+        self.batch_size = batch_size
+        self._hashes = []
+        self._sizes = array('Q')
+        self._algorithms = array('B')
+        self._timestamps = array('d')
+        self._stored_bytes = 0
+        # Contratos aguardando envio: número -> PendingRow
+        self._pending: Dict[int, PendingRow] = {}
+        self._batch_depth = 0
+        self._write_lock = threading.RLock()
+
+        self.compressor = self._init_compressor(compressor)
+        for number, contract_hash, algorithm_id, size, stored_size, timestamp in self._load_records():
+            if number != len(self._hashes) + 1:
+                raise ValueError(f"Numeração de contratos inconsistente no banco (esperado {len(self._hashes) + 1}, "
+                                 f"encontrado {number}).")
+            self._sizes.append(size)
+            self._algorithms.append(algorithm_id)
+            self._timestamps.append(timestamp or 0.0)
+            self._stored_bytes += stored_size
+            self._hashes.append(contract_hash)
+
+    # --- Acesso ao banco (subclasses) ---
+
+    def _read_config(self) -> Optional[Tuple[Dict, Optional[bytes]]]:
+        """:return: (configuração de compressão, dicionário) ou None em um banco novo."""
+        raise NotImplementedError
+
+    def _write_config(self, settings: Dict, dictionary: Optional[bytes]) -> None:
+        raise NotImplementedError
+
+    def _load_records(self) -> Iterator[RecordInfo]:
+        """Metadados de todos os contratos, em ordem de número, sem os textos."""
+        raise NotImplementedError
+
+    def _insert_many(self, rows: Dict[int, PendingRow]) -> None:
+        """
+        Grava os contratos pendentes. Se o envio falhar no meio, os contratos
+        que chegaram a ser gravados são retirados de `rows` antes da exceção,
+        para que um novo envio recomece do primeiro não gravado.
+        """
+        raise NotImplementedError
+
+    def _fetch_blob(self, number: int) -> bytes:
+        raise NotImplementedError
+
+    def _iter_blob(self, number: int, chunk_size: int) -> Iterator[bytes]:
+        """Lê o texto comprimido do banco em partes (padrão: busca inteiro e fatia)."""
+        return iter_slices(self._fetch_blob(number), chunk_size)
+
+    # --- Interface do store ---
+
+    def _init_compressor(self, compressor: Optional[TextCompressor]) -> TextCompressor:
+        """Lê a configuração de compressão do banco; em um banco novo, grava a informada."""
+        compressor = compressor if compressor is not None else TextCompressor('zlib')
+        saved = self._read_config()
+        if saved is not None:
+            settings, dictionary = saved
+            return compressor.restore(settings, dictionary)
+        self._write_config(compressor.settings, compressor.dictionary)
+        return compressor
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def open_spool(self) -> CompressingSpool:
+        """Abre um buffer para receber um contrato em partes."""
+        return CompressingSpool(io.BytesIO(), self.compressor)
+
+    def commit_spool(self, spool: CompressingSpool, contract_hash: str,
+                     algorithm: str = DEFAULT_ALGORITHM) -> int:
+        """Registra o contrato; fora de `batch()` ele é gravado no banco imediatamente."""
+        spool.finish()
+        blob = spool.target.getvalue()
+        spool.close()
+        algorithm_id = DIGEST_ALGORITHMS[algorithm]
+        with self._write_lock:
+            number = len(self._hashes) + 1
+            timestamp = registration_time(self._timestamps)
+            self._pending[number] = (contract_hash, algorithm_id, spool.original_size, blob, timestamp)
+            if not self._batch_depth or len(self._pending) >= self.batch_size:
+                try:
+                    self.flush()
+                except BaseException:
+                    # O contrato não é publicado: o ContractManager só o indexa se esta chamada retornar
+                    self._pending.pop(number, None)
+                    raise
+            self._sizes.append(spool.original_size)
+            self._algorithms.append(algorithm_id)
+            self._timestamps.append(timestamp)
+            self._stored_bytes += len(blob)
+            self._hashes.append(contract_hash)
+        return number
+
+    def discard_spool(self, spool: CompressingSpool) -> None:
+        """Descarta o buffer (ex.: contrato duplicado)."""
+        spool.close()
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Acumula as gravações do bloco e as envia ao banco em lotes de `batch_size`."""
+        with self._write_lock:
+            self._batch_depth += 1
+        try:
+            yield
+        finally:
+            with self._write_lock:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.flush()
+
+    def flush(self) -> None:
+        """Envia ao banco os contratos pendentes."""
+        with self._write_lock:
+            if not self._pending:
+                return
+            # Em caso de erro, os contratos não gravados continuam pendentes
+            # (legíveis) para um novo envio; se o envio partiu de `commit_spool`,
+            # o contrato que o disparou é retirado, pois ainda não foi publicado
+            self._insert_many(self._pending)
+            # Um novo dicionário: leitores que ainda usam o antigo continuam válidos
+            self._pending = {}
+
+    def hash_at(self, number: int) -> str:
+        """Retorna o hash do contrato de número `number` (base 1)."""
+        return self._hashes[number - 1]
+
+    def algorithm_at(self, number: int) -> str:
+        """Retorna o algoritmo de digest do hash do contrato de número `number`."""
+        return ALGORITHM_NAMES[self._algorithms[number - 1]]
+
+    def size_at(self, number: int) -> int:
+        """Retorna o tamanho original em bytes do contrato de número `number`."""
+        return self._sizes[number - 1]
+
+    def registered_at(self, number: int) -> float:
+        """Retorna o instante do registro do contrato de número `number`."""
+        return self._timestamps[number - 1]
+
+    def read_text(self, number: int) -> str:
+        """Busca no banco (ou entre os pendentes) e descomprime o texto do contrato."""
+        pending = self._pending.get(number)
+        blob = pending[3] if pending is not None else self._fetch_blob(number)
+        return self.compressor.decompress(blob).decode('utf-8')
+
+    def iter_bytes(self, number: int, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+        """Busca e descomprime o contrato aos poucos, em blocos de até `chunk_size` bytes."""
+        pending = self._pending.get(number)
+        blobs = (iter_slices(pending[3], chunk_size) if pending is not None
+                 else self._iter_blob(number, chunk_size))
+        return self.compressor.iter_decompress(blobs, chunk_size)
+
+    def iter_hashes(self) -> Iterator[str]:
+        """Percorre os hashes na ordem de registro."""
+        return iter(self._hashes)
+
+    def stats(self) -> Dict:
+        """Tamanho dos textos antes ('original_bytes') e depois ('stored_bytes') da compressão."""
+        return {
+            'backend': self.backend,
+            'compression': self.compressor.method,
+            'original_bytes': sum(self._sizes),
+            'stored_bytes': self._stored_bytes
+        }
+
+
+class SQLiteContractStore(_DatabaseContractStore):
+    """
+    Contratos em um arquivo SQLite: tabela `contracts` com o hash (32 bytes,
+    único), o algoritmo, os tamanhos e o texto comprimido.
+    """
+
+    backend = 'SQLite'
+
+    def __init__(self, path: str, compressor: Optional[TextCompressor] = None,
+                 batch_size: int = DEFAULT_INSERT_BATCH):
+        self.path = path
+        # Uma conexão compartilhada entre threads, protegida por uma trava
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection_lock = threading.Lock()
+        with self._connection:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('''
+                CREATE TABLE IF NOT EXISTS contracts (
+                    number INTEGER PRIMARY KEY,
+                    hash BLOB NOT NULL UNIQUE,
+                    algorithm INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    stored_size INTEGER NOT NULL,
+                    registered_at REAL,
+                    text BLOB NOT NULL
+                )''')
+            # Bancos criados antes do instante de registro ganham a coluna (nula)
+            columns = {row[1] for row in self._connection.execute('PRAGMA table_info(contracts)')}
+            if 'registered_at' not in columns:
+                self._connection.execute('ALTER TABLE contracts ADD COLUMN registered_at REAL')
+            self._connection.execute('''
+                CREATE TABLE IF NOT EXISTS config (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    settings TEXT NOT NULL,
+                    dictionary BLOB
+                )''')
+        super().__init__(compressor, batch_size)
+
+    def _read_config(self) -> Optional[Tuple[Dict, Optional[bytes]]]:
+        row = self._connection.execute('SELECT settings, dictionary FROM config WHERE id = 0').fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def _write_config(self, settings: Dict, dictionary: Optional[bytes]) -> None:
+        with self._connection:
+            self._connection.execute('INSERT INTO config (id, settings, dictionary) VALUES (0, ?, ?)',
+                                     (json.dumps(settings), dictionary))
+
+    def _load_records(self) -> Iterator[RecordInfo]:
+        cursor = self._connection.execute(
+            'SELECT number, hash, algorithm, size, stored_size, registered_at FROM contracts ORDER BY number')
+        for number, digest, algorithm_id, size, stored_size, timestamp in cursor:
+            yield number, digest.hex(), algorithm_id, size, stored_size, timestamp
+
+    def _insert_many(self, rows: Dict[int, PendingRow]) -> None:
+        with self._connection_lock, self._connection:
+            self._connection.executemany(
+                'INSERT INTO contracts (number, hash, algorithm, size, stored_size, registered_at, text) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                ((number, bytes.fromhex(contract_hash), algorithm_id, size, len(blob), timestamp, blob)
+                 for number, (contract_hash, algorithm_id, size, blob, timestamp) in rows.items()))
+
+    def _fetch_blob(self, number: int) -> bytes:
+        with self._connection_lock:
+            row = self._connection.execute('SELECT text FROM contracts WHERE number = ?', (number,)).fetchone()
+        return row[0]
+
+    def _iter_blob(self, number: int, chunk_size: int) -> Iterator[bytes]:
+        """
+        Lê o texto com a E/S incremental de BLOBs do SQLite, em uma conexão
+        própria somente leitura: a conexão compartilhada fica livre enquanto o
+        download avança no ritmo do cliente.
+        """
+        if self.path == ':memory:' or not hasattr(sqlite3.Connection, 'blobopen'):
+            yield from super()._iter_blob(number, chunk_size)
+            return
+        with closing(sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)) as connection:
+            with connection.blobopen('contracts', 'text', number, readonly=True) as blob:
+                yield from iter(lambda: blob.read(chunk_size), b'')
+
+    def close(self) -> None:
+        self.flush()
+        self._connection.close()
+
+
+class MongoContractStore(_DatabaseContractStore):
+    """
+    Contratos em uma coleção do MongoDB: um documento por contrato, com o
+    número em `_id` e um índice único em `hash`. A configuração de compressão
+    fica na coleção `<nome>_config`.
+
+    Recebe uma coleção do `pymongo` (ou um substituto com a mesma API, como o
+    `mongomock` em testes) — ver `open_database_store` para abrir por URL.
+    """
+
+    backend = 'MongoDB'
+
+    def __init__(self, collection, compressor: Optional[TextCompressor] = None,
+                 batch_size: int = DEFAULT_INSERT_BATCH):
+        self.collection = collection
+        self.config_collection = collection.database[collection.name + '_config']
+        collection.create_index('hash', unique=True)
+        super().__init__(compressor, batch_size)
+
+    def _read_config(self) -> Optional[Tuple[Dict, Optional[bytes]]]:
+        document = self.config_collection.find_one({'_id': 'compression'})
+        if document is None:
+            return None
+        return document['settings'], document.get('dictionary')
+
+    def _write_config(self, settings: Dict, dictionary: Optional[bytes]) -> None:
+        self.config_collection.replace_one({'_id': 'compression'},
+                                           {'settings': settings, 'dictionary': dictionary}, upsert=True)
+
+    def _load_records(self) -> Iterator[RecordInfo]:
+        # Projeção: o texto não é transferido na listagem
+        cursor = self.collection.find({}, {'hash': 1, 'algorithm': 1, 'size': 1, 'stored_size': 1,
+                                           'registered_at': 1}).sort('_id', 1)
+        for document in cursor:
+            yield (document['_id'], document['hash'], document['algorithm'],
+                   document['size'], document['stored_size'], document.get('registered_at'))
+
+    def _insert_many(self, rows: Dict[int, PendingRow]) -> None:
+        # Importado só aqui: o pymongo é opcional (o mongomock usa as mesmas exceções)
+        from pymongo.errors import BulkWriteError
+
+        documents = [
+            {'_id': number, 'hash': contract_hash, 'algorithm': algorithm_id, 'size': size,
+             'stored_size': len(blob), 'registered_at': timestamp, 'text': blob}
+            for number, (contract_hash, algorithm_id, size, blob, timestamp) in rows.items()
+        ]
+        while documents:
+            try:
+                # Em ordem: os documentos gravados são sempre um prefixo, e a numeração não tem lacunas
+                self.collection.insert_many(documents, ordered=True)
+                return
+            except BulkWriteError as e:
+                errors = e.details.get('writeErrors') or []
+                failed = errors[0]['index'] if errors else e.details.get('nInserted', 0)
+                for document in documents[:failed]:
+                    rows.pop(document['_id'], None)
+                documents = documents[failed:]
+                # O mesmo contrato já gravado (ex.: envio anterior cuja confirmação se perdeu) conta como gravado
+                if errors and errors[0].get('code') == DUPLICATE_KEY_ERROR and self._is_stored(documents[0]):
+                    rows.pop(documents[0]['_id'], None)
+                    documents = documents[1:]
+                    continue
+                raise
+
+    def _is_stored(self, document: Dict) -> bool:
+        """Indica se o contrato do documento já está no banco, com o mesmo número e hash."""
+        stored = self.collection.find_one({'_id': document['_id']}, {'hash': 1})
+        return stored is not None and stored['hash'] == document['hash']
+
+    def _fetch_blob(self, number: int) -> bytes:
+        return bytes(self.collection.find_one({'_id': number}, {'text': 1})['text'])
+
+
+def open_database_store(url: str, compressor: Optional[TextCompressor] = None) -> _DatabaseContractStore:
+    """
+    Abre o armazenamento em banco indicado pela URL.
+    :param url: 'sqlite:///caminho/contratos.db' ou uma URI do MongoDB
+                ('mongodb://host:27017/banco'; sem banco na URI, usa 'educablock').
+    :param compressor: Compressão usada se o banco for novo.
+    :raises ImportError: Se a URL for do MongoDB e o pymongo não estiver instalado.
+    """
+    if url.startswith('sqlite:///'):
+        return SQLiteContractStore(url[len('sqlite:///'):], compressor)
+    if url.startswith(('mongodb://', 'mongodb+srv://')):
+        try:
+            from pymongo import MongoClient
+        except ImportError as e:
+            raise ImportError("O armazenamento em MongoDB requer o pacote pymongo (pip install pymongo).") from e
+        database = MongoClient(url).get_default_database('educablock')
+        return MongoContractStore(database['contracts'], compressor)
+    raise ValueError(f"URL de armazenamento não suportada: {url}")
@@ -0,0 +1,314 @@
+"""
+Criptografia dos contratos armazenados (envelope), por meio do compressor.
+
+Cada texto armazenado ganha uma chave de dados AES-256-GCM aleatória, cifrada
+com a chave mestra (RSA-OAEP, ou X25519) e gravada junto do texto: o objeto
+armazenado é um contêiner de crypto_container com um único destinatário (o
+texto já comprimido, em segmentos autenticados). Assim, ler um contrato custa
+uma operação de chave privada para abrir a chave de dados, e as chaves já
+abertas ficam em um `DataKeyCache` limitado: leituras repetidas custam só o
+AES-GCM, próximo de uma leitura sem criptografia.
+
+O `EnvelopeCompressor` é um `TextCompressor` e serve para qualquer
+armazenamento de contract_store e contract_db_store:
+
+    store = open_contract_store(diretorio, EnvelopeCompressor(chave_mestra_pem))
+
+Os armazenamentos persistentes gravam na configuração que são criptografados e
+a impressão digital da chave mestra; reabri-los exige a mesma chave. O texto
+só é descriptografado quando lido (`read_text`/`iter_bytes`); hashes e demais
+metadados continuam em claro.
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, Optional
+
+from contract_compression import TextCompressor
+from contract_store import iter_slices
+from crypto_container import (
+    NONCE_PREFIX_SIZE, SEGMENT_LENGTH, SEGMENT_SIZE, SYMMETRIC_KEY_SIZE, TAG_SIZE, ContainerHeader,
+    new_symmetric_cipher, pack_header, parse_header, parse_segments, read_header, read_segments, segment_nonce
+)
+from crypto_utils import load_private_key, unwrap_key, wrap_key
+
+# Cifra dos textos armazenados
+STORAGE_CIPHER = 'aes-gcm'
+
+# Chaves de dados abertas mantidas em memória
+DEFAULT_DATA_KEY_CACHE = 4096
+
+
+class DataKeyCache:
+    """LRU limitado das chaves de dados já abertas, indexado pela chave cifrada. Seguro para várias threads."""
+
+    def __init__(self, max_keys: int = DEFAULT_DATA_KEY_CACHE):
+        self.max_keys = max_keys
+        self._keys: 'OrderedDict[bytes, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def get(self, wrapped_key: bytes) -> Optional[bytes]:
+        with self._lock:
+            data_key = self._keys.get(wrapped_key)
+            if data_key is None:
+                self.misses += 1
+                return None
+            self._keys.move_to_end(wrapped_key)
+            self.hits += 1
+            return data_key
+
+    def put(self, wrapped_key: bytes, data_key: bytes) -> None:
+        with self._lock:
+            self._keys[wrapped_key] = data_key
+            self._keys.move_to_end(wrapped_key)
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+
+
+class _EncryptingCompressObj:
+    """
+    Comprime e cifra um texto em partes: o cabeçalho e os segmentos são
+    entregues à medida que ficam prontos. Um segmento só é fechado quando há
+    bytes depois dele; o último é marcado no `flush` (como em write_segments).
+    Só então a chave de dados entra no cache: os armazenamentos finalizam o
+    texto no commit, e spools descartados (duplicados) não ocupam o cache.
+    """
+
+    def __init__(self, compressobj, data_keys: DataKeyCache, data_key: bytes, header: ContainerHeader):
+        self._compressobj = compressobj
+        self._data_keys = data_keys
+        self._data_key = data_key
+        self._aead = new_symmetric_cipher(header.cipher, data_key)
+        self._header = header
+        self._output = [header.raw]
+        self._buffer = bytearray()
+        self._counter = 0
+
+    def compress(self, data: bytes) -> bytes:
+        self._buffer += self._compressobj.compress(data)
+        return self._emit(final=False)
+
+    def flush(self) -> bytes:
+        self._buffer += self._compressobj.flush()
+        output = self._emit(final=True)
+        # O contrato recém-gravado é lido sem abrir a chave de dados
+        self._data_keys.put(self._header.slots[0][1], self._data_key)
+        return output
+
+    def _emit(self, final: bool) -> bytes:
+        segment_size = self._header.segment_size
+        start = 0
+        while len(self._buffer) - start > segment_size:
+            self._seal(self._buffer[start:start + segment_size], last=False)
+            start += segment_size
+        del self._buffer[:start]
+        if final:
+            self._seal(self._buffer, last=True)
+            self._buffer = bytearray()
+        output, self._output = b''.join(self._output), []
+        return output
+
+    def _seal(self, segment: bytearray, last: bool) -> None:
+        nonce = segment_nonce(self._header.nonce_prefix, self._counter, last)
+        encrypted = self._aead.encrypt(nonce, bytes(segment), self._header.raw)
+        self._output.append(SEGMENT_LENGTH.pack(len(encrypted)))
+        self._output.append(encrypted)
+        self._counter += 1
+
+
+class _DecryptingDecompressObj:
+    """
+    Autentica, decifra e descomprime um texto armazenado recebido em partes,
+    um segmento por vez. Os segmentos intermediários sempre têm o tamanho
+    cheio, então um segmento menor é o último (e `eof` passa a valer True); um
+    último segmento cheio só é reconhecido no `flush`, no fim dos dados.
+    """
+
+    def __init__(self, compressor: 'EnvelopeCompressor'):
+        self._compressor = compressor
+        self._decompressobj = compressor._plain.decompressobj()
+        self._buffer = bytearray()
+        self._header: Optional[ContainerHeader] = None
+        self._aead = None
+        self._counter = 0
+        self.eof = False
+
+    def decompress(self, data: bytes) -> bytes:
+        if self.eof:
+            raise ValueError("Dados após o fim do texto criptografado.")
+        self._buffer += data
+        if self._header is None and not self._parse_header(final=False):
+            return b''
+        return self._decrypt(final=False)
+
+    def flush(self) -> bytes:
+        """
+        Finaliza o texto: decifra o último segmento pendente.
+        :raises ValueError: Se os dados estiverem truncados ou malformados.
+        :raises cryptography.exceptions.InvalidTag: Se algum segmento foi alterado.
+        """
+        if self.eof:
+            return b''
+        if self._header is None:
+            self._parse_header(final=True)
+        output = self._decrypt(final=True)
+        if not self.eof:
+            raise ValueError("Arquivo criptografado truncado.")
+        return output
+
+    def _parse_header(self, final: bool) -> bool:
+        try:
+            self._header, offset = parse_header(memoryview(self._buffer))
+        except ValueError:
+            # Um cabeçalho de um único destinatário cabe com folga em um segmento
+            if final or len(self._buffer) > SEGMENT_SIZE:
+                raise
+            return False
+        del self._buffer[:offset]
+        self._aead = self._compressor._cipher_for(self._header)
+        return True
+
+    def _decrypt(self, final: bool) -> bytes:
+        full_length = self._header.segment_size + TAG_SIZE
+        output = []
+        offset = 0
+        while not self.eof and len(self._buffer) - offset >= SEGMENT_LENGTH.size:
+            (length,) = SEGMENT_LENGTH.unpack_from(self._buffer, offset)
+            if length > full_length:
+                raise ValueError("Segmento maior que o tamanho declarado no cabeçalho.")
+            end = offset + SEGMENT_LENGTH.size + length
+            if end > len(self._buffer):
+                break
+            last = length < full_length or (final and end == len(self._buffer))
+            if not last and end == len(self._buffer):
+                # Segmento cheio no fim do que chegou: o último, se nada mais vier
+                break
+            nonce = segment_nonce(self._header.nonce_prefix, self._counter, last)
+            segment = bytes(self._buffer[offset + SEGMENT_LENGTH.size:end])
+            output.append(self._decompressobj.decompress(self._aead.decrypt(nonce, segment, self._header.raw)))
+            self._counter += 1
+            self.eof = last
+            offset = end
+        del self._buffer[:offset]
+        if self.eof and self._buffer:
+            raise ValueError("Dados após o fim do texto criptografado.")
+        return b''.join(output)
+
+
+class _ChunkReader(io.RawIOBase):
+    """Arquivo somente leitura sobre uma sequência de blocos de bytes."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._current = memoryview(b'')
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, view) -> int:
+        while not self._current:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._current = memoryview(chunk)
+        count = min(len(view), len(self._current))
+        view[:count] = self._current[:count]
+        self._current = self._current[count:]
+        return count
+
+
+class EnvelopeCompressor(TextCompressor):
+    """
+    Compressor que cifra cada texto armazenado com uma chave de dados própria,
+    cifrada com a chave mestra (ver o docstring do módulo).
+    """
+
+    encryption = STORAGE_CIPHER
+
+    def __init__(self, master_key_pem: str, method: Optional[str] = 'zlib', level: Optional[int] = None,
+                 dictionary: Optional[bytes] = None, data_keys: Optional[DataKeyCache] = None):
+        """
+        :param master_key_pem: Chave privada mestra (PEM, sem senha), RSA ou X25519.
+        :param method: Compressão aplicada antes da criptografia (ver TextCompressor).
+        :param data_keys: Cache das chaves de dados abertas (padrão: um novo).
+        :raises ValueError: Se a chave for inválida ou não servir para criptografia.
+        """
+        super().__init__(method, level, dictionary)
+        self.master_key_pem = master_key_pem
+        self._master = load_private_key(master_key_pem)
+        self._master_public = self._master.key.public_key()
+        # Falha já na criação com chaves que só assinam (ex.: Ed25519)
+        wrap_key(self._master_public, bytes(SYMMETRIC_KEY_SIZE))
+        self._plain = TextCompressor(method, level, dictionary)
+        self.data_keys = data_keys if data_keys is not None else DataKeyCache()
+
+    @property
+    def master_fingerprint(self) -> str:
+        """Impressão digital (hex) da chave mestra, gravada na configuração do armazenamento."""
+        return self._master.fingerprint.hex()
+
+    @property
+    def settings(self) -> Dict:
+        settings = super().settings
+        settings.update({'encryption': self.encryption, 'master_key': self.master_fingerprint})
+        return settings
+
+    def restore(self, settings: Dict, dictionary: Optional[bytes]) -> 'EnvelopeCompressor':
+        """
+        Compressor de um armazenamento existente, com esta chave mestra.
+        :raises ValueError: Se o armazenamento não for criptografado ou usar outra chave mestra.
+        """
+        if settings.get('encryption') != self.encryption:
+            raise ValueError("O armazenamento existente não é criptografado.")
+        if settings.get('master_key') != self.master_fingerprint:
+            raise ValueError("O armazenamento foi criptografado com outra chave mestra.")
+        return EnvelopeCompressor(self.master_key_pem, settings['compression'], settings.get('level'),
+                                  dictionary, self.data_keys)
+
+    def compressobj(self) -> _EncryptingCompressObj:
+        """Compressor incremental que cifra o resultado com uma nova chave de dados."""
+        data_key = os.urandom(SYMMETRIC_KEY_SIZE)
+        wrapped_key = wrap_key(self._master_public, data_key)
+        header = pack_header(STORAGE_CIPHER, [(self._master.fingerprint, wrapped_key)], SEGMENT_SIZE,
+                             os.urandom(NONCE_PREFIX_SIZE))
+        return _EncryptingCompressObj(self._plain.compressobj(), self.data_keys, data_key, header)
+
+    def decompressobj(self) -> _DecryptingDecompressObj:
+        """Descompressor incremental: `decompress(data)` a cada parte e `flush()` no fim."""
+        return _DecryptingDecompressObj(self)
+
+    def decompress(self, blob: bytes) -> bytes:
+        """Autentica, decifra e descomprime um texto armazenado completo."""
+        view = memoryview(blob)
+        header, offset = parse_header(view)
+        compressed = b''.join(parse_segments(view, offset, self._cipher_for(header), header))
+        return self._plain.decompress(compressed)
+
+    def iter_decompress(self, chunks: Iterable[bytes], max_length: Optional[int] = None) -> Iterator[bytes]:
+        """Autentica, decifra e descomprime um texto armazenado em streaming, um segmento por vez."""
+        source = _ChunkReader(chunks)
+        header = read_header(source)
+        segments = read_segments(source, self._cipher_for(header), header)
+        if max_length is not None and self.method == 'none':
+            # Sem compressão, os segmentos (64 KiB) são entregues fatiados
+            segments = (piece for segment in segments for piece in iter_slices(segment, max_length))
+        return self._plain.iter_decompress(segments, max_length)
+
+    def _cipher_for(self, header: ContainerHeader):
+        """AEAD com a chave de dados do texto, aberta com a chave mestra ou obtida do cache."""
+        wrapped_key = header.wrapped_key_for(self._master.fingerprint)
+        data_key = self.data_keys.get(wrapped_key)
+        if data_key is None:
+            data_key = unwrap_key(self._master.key, wrapped_key)
+            self.data_keys.put(wrapped_key, data_key)
+        return new_symmetric_cipher(header.cipher, data_key)
@@ -1,71 +1,562 @@
-import hashlib
-from typing import Dict, List, Optional, Tuple
+import bisect
+import codecs
+import json
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from contract_compression import MAX_DICTIONARY_SIZE, train_dictionary
+from contract_merkle import MerkleTree
+from contract_search import InvertedIndex, TermCounter, make_snippet
+from contract_chunking import ChunkRecorder, compare_chunks, pack_chunks, unpack_chunks
+from contract_similarity import MinHasher, SimilarityIndex
+from contract_store import READ_CHUNK_SIZE, MemoryContractStore
+from digest_utils import DEFAULT_ALGORITHM, MultiHasher, digest_bytes, new_hasher
+
+# Tamanho dos blocos lidos no hashing em streaming (1 MiB)
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Fonte de dados binários: arquivo aberto em modo binário ou iterável de blocos
+ByteSource = Union[BinaryIO, Iterable[bytes]]
+
+# Tamanho padrão de uma página da listagem de contratos
+DEFAULT_PAGE_SIZE = 50
+
+# Tamanho máximo de um texto nos índices derivados (similaridade, blocos e busca)
+DEFAULT_INDEX_MAX_BYTES = 1024 * 1024
+
+
+def iter_chunks(source: ByteSource, chunk_size: int = HASH_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Percorre uma fonte binária em blocos, sem carregá-la inteira na memória.
+    :param source: Objeto com `read()` (arquivo, upload) ou iterável de bytes.
+    :param chunk_size: Tamanho dos blocos lidos de objetos com `read()`.
+    """
+    if hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        yield from source
+
+
+class ContentIndexer:
+    """
+    Calcula, em uma única passada pelos bytes de um contrato, os dados dos
+    índices derivados do texto: assinatura MinHash, blocos definidos pelo
+    conteúdo e frequência dos termos. Também valida o UTF-8 de forma incremental.
+    Textos maiores que `max_bytes` não são indexados (ver `exceeded`).
+    """
+
+    def __init__(self, similarity: bool, chunking: bool, search: bool = False,
+                 errors: str = 'strict', max_bytes: Optional[int] = None):
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors)
+        self._minhasher = MinHasher() if similarity else None
+        self._chunks = ChunkRecorder() if chunking else None
+        self._terms = TermCounter() if search else None
+        self.max_bytes = max_bytes
+        self._size = 0
+
+    @property
+    def exceeded(self) -> bool:
+        """Se o texto passou de `max_bytes` (o restante dos dados é ignorado)."""
+        return self.max_bytes is not None and self._size > self.max_bytes
+
+    def update(self, data: bytes) -> None:
+        self._size += len(data)
+        if self.exceeded:
+            return
+        text = self._decoder.decode(data)
+        if self._minhasher is not None:
+            self._minhasher.update(text)
+        if self._terms is not None:
+            self._terms.update(text)
+        if self._chunks is not None:
+            self._chunks.update(data)
+
+    def finish(self) -> Dict:
+        """
+        :return: Dicionário com 'signature', 'chunks' e 'terms' (None se
+                 desligados ou se o texto passou de `max_bytes`).
+        """
+        if self.exceeded:
+            return {'signature': None, 'chunks': None, 'terms': None}
+        text = self._decoder.decode(b'', final=True)
+        if self._minhasher is not None:
+            self._minhasher.update(text)
+        if self._terms is not None:
+            self._terms.update(text)
+        return {
+            'signature': self._minhasher.signature() if self._minhasher is not None else None,
+            'chunks': self._chunks.finish() if self._chunks is not None else None,
+            'terms': self._terms.finish() if self._terms is not None else None
+        }
+
 
 class ContractManager:
     """
-    Gerencia uma lista de contratos, armazenando o texto e seu hash SHA-256.
+    Gerencia uma lista de contratos, armazenando o texto e seu hash (SHA-256
+    por padrão; ver digest_utils). O armazenamento dos textos é delegado a um
+    store (memória ou disco), que guarda também o algoritmo de cada registro.
     """
     
-    # Estrutura: list of (hash_str, contract_text)
-    # Ex: [(hash1, text1), (hash2, text2), ...]
-    def __init__(self):
-        self.contracts: List[Tuple[str, str]] = []
+    def __init__(self, store=None, blockchain=None, anchor_every: int = 0,
+                 similarity: bool = False, chunking: bool = False, search: bool = False,
+                 algorithm: str = DEFAULT_ALGORITHM, index_max_bytes: int = DEFAULT_INDEX_MAX_BYTES):
+        """
+        :param store: Onde os textos são guardados (padrão: MemoryContractStore).
+        :param blockchain: Blockchain onde a raiz de Merkle do registro é ancorada
+                           (as âncoras que ela já contém são recuperadas).
+        :param anchor_every: Ancora a raiz automaticamente a cada N contratos (0 = só manual).
+        :param similarity: Mantém o índice MinHash/LSH de contratos parecidos.
+        :param chunking: Mantém os blocos definidos pelo conteúdo de cada contrato,
+                         usados para localizar regiões alteradas.
+        :param search: Mantém o índice invertido para busca no texto dos contratos.
+        :param algorithm: Algoritmo de digest dos novos registros ('sha256',
+                          'blake2b' ou 'sha3_256'). Registros antigos mantêm o seu.
+        :param index_max_bytes: Textos maiores ficam fora dos índices derivados
+                                (e arquivos maiores não são analisados nas consultas).
+        """
+        new_hasher(algorithm)  # valida o algoritmo
+        self.algorithm = algorithm
+        self.store = store if store is not None else MemoryContractStore()
+        # Índices auxiliares: hash -> número (busca exata em O(1)) e
+        # lista ordenada de hashes (busca por prefixo via bisect)
+        self._hash_index: Dict[str, int] = {}
+        self._sorted_hashes: List[str] = []
+        # Algoritmos presentes no registro (um arquivo é verificado com todos eles)
+        self._algorithms_in_use: Set[str] = set()
+        # Árvore de Merkle: a folha N - 1 é o hash do contrato N
+        self.merkle = MerkleTree()
+        self.blockchain = blockchain
+        self.anchor_every = anchor_every
+        # Âncoras da árvore atual (recuperadas da blockchain, se ela for persistida)
+        self.anchors: List[Dict] = []
+        # Índice de similaridade: aponta de onde um texto adulterado foi derivado
+        self.similarity = SimilarityIndex() if similarity else None
+        # Blocos de cada contrato, em forma compacta: número -> (tamanhos, digests)
+        self.chunking = chunking
+        self._chunk_index: Dict[int, Tuple] = {}
+        # Índice invertido: termo -> contratos que o contêm
+        self.search_index = InvertedIndex() if search else None
+        # Os índices derivados do texto são preenchidos sob demanda: contratos
+        # 1..N já passaram por eles (ver `index_pending_content`)
+        self.index_max_bytes = index_max_bytes
+        self._content_indexed = 0
+        self._rebuild_index()
+
+    @property
+    def indexer_options(self) -> Optional[Dict]:
+        """
+        Argumentos do `ContentIndexer` dos índices ligados (None se nenhum),
+        para calcular os dados fora do manager (ex.: nos workers de contract_batch).
+        """
+        if self.similarity is None and not self.chunking and self.search_index is None:
+            return None
+        return {'similarity': self.similarity is not None, 'chunking': self.chunking,
+                'search': self.search_index is not None, 'max_bytes': self.index_max_bytes}
+
+    def _rebuild_index(self) -> None:
+        """
+        Reconstrói os índices de hashes e a árvore de Merkle a partir dos
+        contratos já existentes no store. Os textos não são lidos: os índices
+        derivados são preenchidos na primeira consulta que precisar deles.
+        """
+        for number, contract_hash in enumerate(self.store.iter_hashes(), start=1):
+            self._hash_index.setdefault(contract_hash, number)
+            self._algorithms_in_use.add(self.store.algorithm_at(number))
+            self.merkle.append(contract_hash)
+        self._sorted_hashes = sorted(self._hash_index)
+        self._load_anchors()
+
+    def _load_anchors(self) -> None:
+        """
+        Recupera as âncoras já gravadas na blockchain (ex.: reaberta de um
+        arquivo junto com o store): valem as que conferem com a árvore atual.
+        """
+        if self.blockchain is None:
+            return
+        for block in self.blockchain.chain:
+            anchor = self._anchor_data(block)
+            if anchor is None or not 1 <= anchor.get('tree_size', 0) <= len(self.merkle):
+                continue
+            if self.merkle.root(anchor['tree_size']) == anchor.get('root'):
+                anchor.update({'block_index': block.index, 'block_hash': block.hash})
+                self.anchors.append(anchor)
+
+    @property
+    def content_pending(self) -> int:
+        """Quantos contratos ainda não passaram pelos índices derivados do texto."""
+        if self.indexer_options is None:
+            return 0
+        return len(self.store) - self._content_indexed
+
+    def index_pending_content(self) -> int:
+        """
+        Lê os contratos que ainda não passaram pelos índices derivados do texto
+        (registrados depois da última consulta, ou todos após reabrir o store)
+        e os indexa. Contratos maiores que `index_max_bytes` nem são lidos.
+        :return: Quantidade de contratos processados.
+        """
+        options = self.indexer_options
+        if options is None:
+            return 0
+        total = len(self.store)
+        start = self._content_indexed
+        for number in range(start + 1, total + 1):
+            content = None
+            if self.store.size_at(number) <= self.index_max_bytes:
+                indexer = ContentIndexer(**options)
+                for chunk in self.store.iter_bytes(number):
+                    indexer.update(chunk)
+                content = indexer.finish()
+            self._add_content(number, content)
+        return total - start
 
     @staticmethod
-    def hash_text(text: str) -> str:
+    def hash_text(text: str, algorithm: str = DEFAULT_ALGORITHM) -> str:
         """
-        Gera o hash SHA-256 para o texto fornecido.
+        Gera o hash para o texto fornecido.
         :param text: O texto do contrato.
-        :return: O hash SHA-256 como string hexadecimal.
+        :param algorithm: O algoritmo de digest (padrão: SHA-256).
+        :return: O hash como string hexadecimal.
         """
         # Codifica o texto para bytes e calcula o hash
         text_bytes = text.encode('utf-8')
-        return hashlib.sha256(text_bytes).hexdigest()
+        return digest_bytes(text_bytes, algorithm)
+
+    @staticmethod
+    def hash_stream(source: ByteSource, chunk_size: int = HASH_CHUNK_SIZE,
+                    algorithm: str = DEFAULT_ALGORITHM) -> str:
+        """
+        Gera o hash de uma fonte binária lida em blocos (memória limitada).
+        Para um texto UTF-8, o resultado é igual ao de `hash_text`.
+        :param source: Arquivo binário ou iterável de blocos de bytes.
+        :param chunk_size: Tamanho dos blocos lidos.
+        :param algorithm: O algoritmo de digest (padrão: SHA-256).
+        :return: O hash como string hexadecimal.
+        """
+        hasher = new_hasher(algorithm)
+        for chunk in iter_chunks(source, chunk_size):
+            hasher.update(chunk)
+        return hasher.hexdigest()
+
+    @property
+    def digest_algorithms(self) -> List[str]:
+        """
+        Algoritmos com que um conteúdo precisa ser hashado para ser comparado
+        ao registro: os já presentes e o usado nos novos registros.
+        """
+        return sorted(self._algorithms_in_use | {self.algorithm})
+
+    def hash_stream_all(self, source: ByteSource, chunk_size: int = HASH_CHUNK_SIZE) -> Dict[str, str]:
+        """
+        Calcula, em uma única passada, os digests de uma fonte binária com todos
+        os algoritmos de `digest_algorithms`.
+        :return: Dicionário algoritmo -> hash hex.
+        """
+        hasher = MultiHasher(self.digest_algorithms)
+        for chunk in iter_chunks(source, chunk_size):
+            hasher.update(chunk)
+        return hasher.hexdigests()
+
+    def find_number_by_digests(self, digests: Dict[str, str]) -> Optional[int]:
+        """
+        Procura o contrato cujo hash registrado coincide com o digest do mesmo
+        algoritmo (ex.: resultado de `hash_stream_all`).
+        :return: O número (base 1) ou None.
+        """
+        for algorithm, digest in digests.items():
+            number = self._hash_index.get(digest)
+            if number is not None and self.store.algorithm_at(number) == algorithm:
+                return number
+        return None
 
     def add_contract(self, text: str) -> int:
         """
         Adiciona um novo contrato e seu hash na lista.
+        Se um texto idêntico já estiver registrado (com qualquer algoritmo),
+        nada é gravado e o número do registro existente é retornado.
         :param text: O texto do contrato (upload).
         :return: O número/índice (base 1) do contrato adicionado.
         """
-        contract_hash = self.hash_text(text)
-        self.contracts.append((contract_hash, text))
-        
-        # Retorna o número do contrato (índice + 1)
-        return len(self.contracts)
+        text_bytes = text.encode('utf-8')
+        hasher = MultiHasher(self.digest_algorithms)
+        hasher.update(text_bytes)
+        digests = hasher.hexdigests()
+        existing_number = self.find_number_by_digests(digests)
+        if existing_number is not None:
+            return existing_number
 
-    def get_contract_by_index(self, index: int) -> Optional[Dict]:
+        contract_hash = digests[self.algorithm]
+        contract_number = self.store.append(contract_hash, text, self.algorithm)
+        self._index_hash(contract_hash, contract_number)
+        return contract_number
+
+    def prepare_contract_stream(self, source: ByteSource, chunk_size: int = HASH_CHUNK_SIZE,
+                                contract_hash: Optional[str] = None,
+                                algorithm: Optional[str] = None,
+                                content: Optional[Dict] = None) -> Dict:
         """
-        Busca um contrato pelo seu número (índice base 1).
+        Primeira fase do registro: lê a fonte uma única vez, calculando os
+        hashes (um por algoritmo em uso, se `contract_hash` não for informado)
+        enquanto os blocos vão para um spool do store. Não altera o registro,
+        então pode rodar em paralelo com outras preparações e leituras; a
+        gravação é feita por `commit_prepared`. Os índices derivados do texto
+        não são calculados aqui: só os contratos novos entram neles depois.
+        :param source: Arquivo binário ou iterável de blocos de bytes.
+        :param chunk_size: Tamanho dos blocos lidos.
+        :param contract_hash: Hash já calculado do conteúdo (opcional).
+        :param algorithm: O algoritmo de `contract_hash` (padrão: o do manager).
+        :param content: Dados dos índices derivados já calculados (resultado de
+                        `ContentIndexer.finish` com `indexer_options`), opcional.
+        :return: Dicionário com 'digests', 'algorithm', 'content' e 'spool'.
+        :raises UnicodeDecodeError: Se o conteúdo não for UTF-8 válido.
+        """
+        algorithm = algorithm or self.algorithm
+        hasher = MultiHasher(self.digest_algorithms) if contract_hash is None else None
+        # Valida o UTF-8 bloco a bloco (caracteres partidos entre blocos são tratados)
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        spool = self.store.open_spool()
+        try:
+            for chunk in iter_chunks(source, chunk_size):
+                decoder.decode(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+                spool.write(chunk)
+            decoder.decode(b'', final=True)
+        except Exception:
+            self.store.discard_spool(spool)
+            raise
+
+        digests = hasher.hexdigests() if hasher is not None else {algorithm: contract_hash}
+        return {'digests': digests, 'algorithm': algorithm, 'content': content, 'spool': spool}
+
+    def commit_prepared(self, prepared: Dict) -> int:
+        """
+        Segunda fase do registro: grava um contrato preparado por
+        `prepare_contract_stream`, ou descarta o spool se o conteúdo já estiver
+        registrado (inclusive por outra preparação gravada antes).
+        :return: O número/índice (base 1) do contrato adicionado (ou já existente).
+        """
+        existing_number = self.find_number_by_digests(prepared['digests'])
+        if existing_number is not None:
+            self.store.discard_spool(prepared['spool'])
+            return existing_number
+
+        algorithm = prepared['algorithm']
+        contract_hash = prepared['digests'][algorithm]
+        contract_number = self.store.commit_spool(prepared['spool'], contract_hash, algorithm)
+        self._index_hash(contract_hash, contract_number, prepared['content'])
+        return contract_number
+
+    def add_contract_stream(self, source: ByteSource, chunk_size: int = HASH_CHUNK_SIZE) -> int:
+        """
+        Adiciona um contrato lido em blocos de uma fonte binária UTF-8.
+        Os hashes (um por algoritmo em uso) são calculados na mesma passada em
+        que os blocos são repassados ao store, sem decodificar o arquivo inteiro
+        de uma vez.
+        :param source: Arquivo binário ou iterável de blocos de bytes.
+        :param chunk_size: Tamanho dos blocos lidos.
+        :return: O número/índice (base 1) do contrato adicionado (ou já existente).
+        :raises UnicodeDecodeError: Se o conteúdo não for UTF-8 válido.
+        """
+        return self.commit_prepared(self.prepare_contract_stream(source, chunk_size))
+
+    def add_hashed_contract_stream(self, contract_hash: str, source: ByteSource,
+                                   chunk_size: int = HASH_CHUNK_SIZE,
+                                   algorithm: Optional[str] = None,
+                                   content: Optional[Dict] = None) -> int:
+        """
+        Adiciona um contrato cujo hash já foi calculado (ex.: por workers do
+        registro em lote). Se o hash já estiver registrado, a fonte nem é lida.
+        :param contract_hash: O hash (hex) do conteúdo de `source`.
+        :param source: Arquivo binário ou iterável de blocos de bytes (UTF-8 válido).
+        :param chunk_size: Tamanho dos blocos lidos.
+        :param algorithm: O algoritmo de `contract_hash` (padrão: o do manager).
+        :param content: Dados dos índices derivados já calculados (opcional).
+        :return: O número/índice (base 1) do contrato adicionado (ou já existente).
+        """
+        algorithm = algorithm or self.algorithm
+        existing_number = self.find_number_by_digests({algorithm: contract_hash})
+        if existing_number is not None:
+            return existing_number
+        return self.commit_prepared(self.prepare_contract_stream(source, chunk_size, contract_hash, algorithm,
+                                                                 content))
+
+    def find_number_by_hash(self, target_hash: str) -> Optional[int]:
+        """
+        Retorna o número do contrato com o hash informado, sem carregar o texto.
+        :param target_hash: O hash do contrato.
+        :return: O número (base 1) ou None.
+        """
+        return self._hash_index.get(target_hash.lower())
+
+    def _index_hash(self, contract_hash: str, contract_number: int, content: Optional[Dict] = None) -> None:
+        """
+        Registra o hash nos índices de busca exata e por prefixo e na árvore
+        de Merkle, ancorando a raiz se o intervalo configurado for atingido.
+        Com `content`, o contrato entra também nos índices derivados do texto
+        (se estiverem em dia; senão, fica para `index_pending_content`).
+        """
+        self._hash_index[contract_hash] = contract_number
+        self._algorithms_in_use.add(self.store.algorithm_at(contract_number))
+        bisect.insort(self._sorted_hashes, contract_hash)
+        self.merkle.append(contract_hash)
+        if content is not None and self._content_indexed == contract_number - 1:
+            self._add_content(contract_number, content)
+        if self.blockchain is not None and self.anchor_every and contract_number % self.anchor_every == 0:
+            self.anchor_root()
+
+    def _add_content(self, contract_number: int, content: Optional[Dict]) -> None:
+        """Atualiza os índices de similaridade, de blocos e de termos (None = contrato fora deles)."""
+        self._content_indexed = contract_number
+        if content is None:
+            return
+        if self.similarity is not None and content['signature'] is not None:
+            self.similarity.add(contract_number, content['signature'])
+        if self.chunking and content['chunks'] is not None:
+            self._chunk_index[contract_number] = pack_chunks(content['chunks'])
+        if self.search_index is not None and content['terms'] is not None:
+            self.search_index.add(contract_number, content['terms'])
+
+    def anchor_root(self, blockchain=None) -> Optional[Dict]:
+        """
+        Grava a raiz de Merkle atual do registro em um novo bloco da blockchain.
+        :param blockchain: Blockchain de destino (padrão: a informada no construtor).
+        :return: Dicionário com 'root', 'tree_size', 'block_index', 'block_hash' ou None.
+        """
+        blockchain = blockchain if blockchain is not None else self.blockchain
+        if blockchain is None or len(self.merkle) == 0:
+            return None
+
+        anchor = {'type': 'merkle_root', 'root': self.merkle.root(), 'tree_size': len(self.merkle)}
+        blockchain.add_block(json.dumps(anchor))
+        block = blockchain.get_latest_block()
+        anchor.update({'block_index': block.index, 'block_hash': block.hash})
+        self.anchors.append(anchor)
+        return anchor
+
+    @staticmethod
+    def _anchor_data(block) -> Optional[Dict]:
+        """Dados de âncora de um bloco ou None se o bloco não ancorar uma raiz de Merkle."""
+        try:
+            data = json.loads(block.data)
+        except (TypeError, ValueError):
+            return None
+        if isinstance(data, dict) and data.get('type') == 'merkle_root':
+            return data
+        return None
+
+    @staticmethod
+    def find_anchor_block(blockchain, root: str):
+        """
+        Procura na blockchain o bloco que ancorou a raiz de Merkle informada.
+        :return: O bloco ou None.
+        """
+        for block in blockchain.chain:
+            data = ContractManager._anchor_data(block)
+            if data is not None and data.get('root') == root:
+                return block
+        return None
+
+    def latest_anchor_for(self, index: int) -> Optional[Dict]:
+        """Retorna a âncora mais recente que já inclui o contrato de número `index`."""
+        for anchor in reversed(self.anchors):
+            if anchor['tree_size'] >= index:
+                return anchor
+        return None
+
+    def get_inclusion_proof(self, index: int, tree_size: Optional[int] = None) -> Optional[Dict]:
+        """
+        Gera a prova de inclusão (O(log n) hashes) de um contrato na árvore de Merkle.
         :param index: O número do contrato (1, 2, 3...).
-        :return: Dicionário com 'number', 'hash', 'text' ou None.
+        :param tree_size: Tamanho da árvore da raiz desejada, p. ex. o de uma
+                          âncora (padrão: todos os contratos atuais).
+        :return: Dicionário com 'number', 'hash', 'algorithm', 'tree_size', 'root', 'proof' ou None.
         """
-        # Converte para índice base 0
-        list_index = index - 1 
-        
-        if 0 <= list_index < len(self.contracts):
-            contract_hash, text = self.contracts[list_index]
+        tree_size = len(self.merkle) if tree_size is None else tree_size
+        if not 1 <= index <= tree_size <= len(self.merkle):
+            return None
+        return {
+            'number': index,
+            'hash': self.store.hash_at(index),
+            'algorithm': self.store.algorithm_at(index),
+            'tree_size': tree_size,
+            'root': self.merkle.root(tree_size),
+            'proof': self.merkle.inclusion_proof(index - 1, tree_size)
+        }
+
+    def get_contract_info(self, index: int) -> Optional[Dict]:
+        """
+        Busca os metadados de um contrato sem carregar o texto.
+        :param index: O número do contrato (1, 2, 3...).
+        :return: Dicionário com 'number', 'hash', 'algorithm', 'size' e
+                 'registered_at' (segundos desde a época ou None) ou None.
+        """
+        if 1 <= index <= len(self.store):
             return {
                 'number': index,
-                'hash': contract_hash,
-                'text': text
+                'hash': self.store.hash_at(index),
+                'algorithm': self.store.algorithm_at(index),
+                'size': self.store.size_at(index),
+                'registered_at': self.store.registered_at(index) or None
             }
         return None
 
+    def get_contract_by_index(self, index: int) -> Optional[Dict]:
+        """
+        Busca um contrato pelo seu número (índice base 1).
+        :param index: O número do contrato (1, 2, 3...).
+        :return: Dicionário com 'number', 'hash', 'algorithm', 'size', 'text' ou None.
+        """
+        contract = self.get_contract_info(index)
+        if contract:
+            # O texto só é carregado aqui (leitura sob demanda no store em disco)
+            contract['text'] = self.store.read_text(index)
+        return contract
+
+    def iter_contract_bytes(self, index: int, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Conteúdo (UTF-8) do contrato em blocos, lido do armazenamento sob demanda.
+        Usado nos downloads: a memória fica limitada a um bloco por vez.
+        :param index: O número do contrato (base 1).
+        :raises IndexError: Se o contrato não existir.
+        """
+        if not 1 <= index <= len(self.store):
+            raise IndexError(f"Contrato número {index} não encontrado.")
+        return self.store.iter_bytes(index, chunk_size)
+
     def get_contract_by_hash(self, target_hash: str) -> Optional[Dict]:
         """
         Busca um contrato pelo seu hash.
         :param target_hash: O hash do contrato a ser buscado.
         :return: Dicionário com 'number', 'hash', 'text' ou None.
         """
-        for i, (contract_hash, text) in enumerate(self.contracts):
-            if contract_hash == target_hash:
-                return {
-                    'number': i + 1,  # Retorna o número (base 1)
-                    'hash': contract_hash,
-                    'text': text
-                }
-        return None
+        contract_number = self.find_number_by_hash(target_hash)
+        if contract_number is None:
+            return None
+        return self.get_contract_by_index(contract_number)
+
+    def find_contracts_by_prefix(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """
+        Busca contratos cujo hash começa com o prefixo informado (hash abreviado).
+        :param prefix: Os primeiros caracteres hexadecimais do hash.
+        :param limit: Número máximo de contratos retornados.
+        :return: Lista de dicionários com 'number', 'hash', 'text' (pode ser vazia).
+        """
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+
+        # Os hashes com o prefixo formam um intervalo contíguo na lista ordenada
+        start = bisect.bisect_left(self._sorted_hashes, prefix)
+        matches = []
+        for contract_hash in self._sorted_hashes[start:start + limit]:
+            if not contract_hash.startswith(prefix):
+                break
+            matches.append(self.get_contract_by_index(self._hash_index[contract_hash]))
+        return matches
 
     def verify_text_and_find_contract(self, text: str) -> Optional[Dict]:
         """
@@ -73,17 +564,209 @@ class ContractManager:
         :param text: O texto a ser verificado.
         :return: Dicionário com os dados do contrato correspondente ou None.
         """
-        verified_hash = self.hash_text(text)
-        
-        # Reutiliza a função de busca por hash
-        return self.get_contract_by_hash(verified_hash)
+        # Hash com todos os algoritmos do registro, em uma única passada
+        digests = self.hash_stream_all([text.encode('utf-8')])
+        contract_number = self.find_number_by_digests(digests)
+        if contract_number is None:
+            return None
+        return self.get_contract_by_index(contract_number)
+
+    def _analyze(self, source: ByteSource, similarity: bool, chunking: bool) -> Dict:
+        """
+        Calcula assinatura e/ou blocos de um arquivo qualquer (UTF-8 inválido é
+        tolerado). A leitura para em `index_max_bytes`: arquivos maiores
+        resultam em assinatura e blocos None, como os contratos fora dos índices.
+        """
+        indexer = ContentIndexer(similarity, chunking, errors='replace', max_bytes=self.index_max_bytes)
+        for chunk in iter_chunks(source):
+            indexer.update(chunk)
+            if indexer.exceeded:
+                break
+        return indexer.finish()
+
+    def _similar_from_signature(self, signature, limit: int, min_similarity: float) -> List[Dict]:
+        matches = self.similarity.query(signature, limit, min_similarity)
+        for match in matches:
+            match['hash'] = self.store.hash_at(match['number'])
+        return matches
+
+    def find_similar_contracts(self, source: ByteSource, limit: int = 5,
+                               min_similarity: float = 0.2) -> List[Dict]:
+        """
+        Busca os contratos registrados mais parecidos com um texto (ex.: um arquivo
+        que falhou na verificação), sem comparar com todos os contratos.
+        :param source: Arquivo binário UTF-8 ou iterável de blocos de bytes.
+        :param limit: Número máximo de contratos retornados.
+        :param min_similarity: Similaridade de Jaccard estimada mínima (0 a 1).
+        :return: Lista de dicionários com 'number', 'hash', 'similarity' (vazia
+                 se o arquivo passar de `index_max_bytes`).
+        """
+        if self.similarity is None:
+            return []
+        self.index_pending_content()
+        content = self._analyze(source, similarity=True, chunking=False)
+        if content['signature'] is None:
+            return []
+        return self._similar_from_signature(content['signature'], limit, min_similarity)
+
+    def locate_changes(self, source: ByteSource, reference_number: Optional[int] = None) -> Optional[Dict]:
+        """
+        Localiza as regiões de um arquivo que diferem de um contrato registrado,
+        comparando os digests dos blocos definidos pelo conteúdo (sem diff do texto).
+        :param source: Arquivo binário ou iterável de blocos de bytes.
+        :param reference_number: Contrato de referência; se omitido, usa o
+                                 contrato registrado mais parecido (índice MinHash).
+        :return: Dicionário com 'reference' (número), 'changed' e 'removed'
+                 (intervalos de bytes [início, fim) no arquivo e no contrato),
+                 'changed_bytes', 'matched_chunks', 'total_chunks', ou None se não
+                 houver contrato de referência ou se o arquivo passar de `index_max_bytes`.
+        """
+        if not self.chunking:
+            return None
+        self.index_pending_content()
+        content = self._analyze(source, similarity=reference_number is None and self.similarity is not None,
+                                chunking=True)
+        if content['chunks'] is None:
+            return None
+        if reference_number is None:
+            if content['signature'] is None:
+                return None
+            similar = self._similar_from_signature(content['signature'], limit=1, min_similarity=0.0)
+            if not similar:
+                return None
+            reference_number = similar[0]['number']
+
+        packed = self._chunk_index.get(reference_number)
+        if packed is None:
+            return None
+        result = compare_chunks(unpack_chunks(packed), content['chunks'])
+        result.update({'reference': reference_number, 'total_chunks': len(content['chunks'])})
+        return result
+
+    def search_contracts(self, query: str, limit: int = 10, snippet_width: int = 200) -> List[Dict]:
+        """
+        Busca contratos pelo texto, com operadores booleanos (ver
+        `contract_search.parse_query`) e ordenação por relevância (BM25).
+        Só os textos dos contratos retornados são lidos, para montar os trechos
+        (além dos que ainda não estavam no índice; ver `index_pending_content`).
+        :param query: A consulta, ex.: "multa rescisão OU distrato -aditivo".
+        :param limit: Número máximo de contratos retornados.
+        :param snippet_width: Tamanho aproximado do trecho de cada resultado.
+        :return: Lista de dicionários com 'number', 'hash', 'score' e 'snippet'
+                 (lista de (fragmento, destacado)).
+        """
+        if self.search_index is None:
+            return []
+        self.index_pending_content()
+        results = self.search_index.search(query, limit)
+        for result in results:
+            result['hash'] = self.store.hash_at(result['number'])
+            result['snippet'] = make_snippet(self.store.read_text(result['number']), query, snippet_width)
+        return results
 
     @property
     def total_contracts(self) -> int:
         """Retorna o número total de contratos registrados."""
-        return len(self.contracts)
+        return len(self.store)
 
     @property
-    def contract_numbers(self) -> List[int]:
-        """Retorna uma lista de números de contratos (1, 2, 3...)."""
-        return list(range(1, len(self.contracts) + 1))
\ No newline at end of file
+    def contract_numbers(self) -> Sequence[int]:
+        """Retorna os números dos contratos (1, 2, 3...), sem materializar uma lista."""
+        return range(1, len(self.store) + 1)
+
+    def _first_registered_since(self, timestamp: float, total: int) -> int:
+        """
+        Primeiro número registrado no instante `timestamp` ou depois (total + 1
+        se nenhum). Os instantes crescem com o número: busca binária.
+        """
+        low, high = 1, total + 1
+        while low < high:
+            middle = (low + high) // 2
+            if self.store.registered_at(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def list_contracts(self, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE, after=None,
+                       hash_prefix: Optional[str] = None, registered_from: Optional[float] = None,
+                       registered_until: Optional[float] = None) -> Dict:
+        """
+        Lista uma página de contratos (metadados, sem os textos). O custo é
+        proporcional ao tamanho da página, não ao do registro; com filtro de
+        hash e de data ao mesmo tempo, ao número de hashes com o prefixo.
+        Sem `hash_prefix`, os contratos vêm em ordem de número; com ele, em
+        ordem de hash.
+        :param offset: Quantos contratos pular (paginação por deslocamento).
+        :param limit: Tamanho da página (0 = só a contagem).
+        :param after: Cursor: o 'next_cursor' da página anterior (substitui `offset`).
+        :param hash_prefix: Os primeiros caracteres hexadecimais do hash.
+        :param registered_from: Instante inicial, inclusivo (segundos desde a época).
+        :param registered_until: Instante final, exclusivo.
+        :return: Dicionário com 'items' (dicionários de `get_contract_info`),
+                 'total' (contratos que atendem aos filtros) e 'next_cursor'
+                 (None na última página).
+        """
+        count = len(self.store)
+        first = self._first_registered_since(registered_from, count) if registered_from is not None else 1
+        last = self._first_registered_since(registered_until, count) - 1 if registered_until is not None else count
+
+        prefix = (hash_prefix or '').strip().lower()
+        if not prefix:
+            start = first + offset if after is None else max(first, after + 1)
+            stop = min(last, start + limit - 1)
+            items = [self.get_contract_info(number) for number in range(start, stop + 1)]
+            return {'items': items, 'total': max(0, last - first + 1),
+                    'next_cursor': stop if items and stop < last else None}
+
+        # Os hashes com o prefixo formam um intervalo contíguo na lista ordenada
+        # ('~' vem depois de qualquer dígito hexadecimal)
+        low = bisect.bisect_left(self._sorted_hashes, prefix)
+        high = bisect.bisect_left(self._sorted_hashes, prefix + '~')
+        start = low if after is None else max(low, bisect.bisect_right(self._sorted_hashes, after))
+
+        if first == 1 and last == count:
+            start += offset if after is None else 0
+            page = self._sorted_hashes[start:min(high, start + limit)]
+            total = high - low
+            has_more = start + len(page) < high
+        else:
+            # Filtro por data: percorre os hashes do prefixo
+            matches = [contract_hash for contract_hash in self._sorted_hashes[low:high]
+                       if first <= self._hash_index[contract_hash] <= last]
+            total = len(matches)
+            skip = offset if after is None else bisect.bisect_right(matches, after)
+            page = matches[skip:skip + limit]
+            has_more = skip + len(page) < total
+
+        items = [self.get_contract_info(self._hash_index[contract_hash]) for contract_hash in page]
+        return {'items': items, 'total': total,
+                'next_cursor': page[-1] if page and has_more else None}
+
+    @property
+    def stats(self) -> Dict:
+        """
+        Retorna estatísticas do armazenamento: total de contratos, método de
+        compressão e bytes antes ('original_bytes') e depois ('stored_bytes')
+        da compressão, em memória ou em disco conforme o store.
+        """
+        stats = {'total_contracts': self.total_contracts}
+        stats.update(self.store.stats())
+        original = stats['original_bytes']
+        stats['compression_ratio'] = stats['stored_bytes'] / original if original else 1.0
+        return stats
+
+    def train_compression_dictionary(self, sample_size: int = 1000,
+                                     size: int = MAX_DICTIONARY_SIZE) -> bytes:
+        """
+        Treina um dicionário zlib compartilhado com os contratos mais recentes.
+        O dicionário deve ser usado na criação de um novo store, por exemplo
+        `DiskContractStore(dir, TextCompressor('zlib', dictionary=dicionario))`.
+        :param sample_size: Quantidade de contratos usados como amostra.
+        :param size: Tamanho máximo do dicionário em bytes.
+        :return: O dicionário treinado.
+        """
+        first = max(1, self.total_contracts - sample_size + 1)
+        samples = (self.store.read_text(number).encode('utf-8')
+                   for number in range(first, self.total_contracts + 1))
+        return train_dictionary(samples, size)
@@ -0,0 +1,125 @@
+"""
+Árvore de Merkle incremental sobre os hashes dos contratos registrados.
+
+As folhas são os hashes dos contratos, na ordem de registro. Cada nível é
+formado pelos hashes dos pares do nível anterior; um nó sem par sobe sem
+alteração. Prefixos 0x00 (folha) e 0x01 (nó interno) separam os domínios,
+como no Certificate Transparency (RFC 6962), cuja árvore tem o mesmo formato.
+"""
+import hashlib
+from typing import Dict, List, Optional
+
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def leaf_hash(contract_hash: str) -> bytes:
+    """Hash da folha correspondente ao hash (hex) de um contrato."""
+    return hashlib.sha256(LEAF_PREFIX + bytes.fromhex(contract_hash)).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    """Hash de um nó interno a partir dos filhos."""
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+class MerkleTree:
+    """
+    Árvore de Merkle com inserção incremental em O(log n) e provas de
+    inclusão em O(log n) hashes.
+    """
+
+    def __init__(self):
+        # levels[0] são as folhas; levels[-1][0] é a raiz
+        self.levels: List[List[bytes]] = [[]]
+
+    def __len__(self) -> int:
+        return len(self.levels[0])
+
+    def append(self, contract_hash: str) -> None:
+        """Adiciona uma folha e recalcula apenas o caminho até a raiz."""
+        self.levels[0].append(leaf_hash(contract_hash))
+        index = len(self.levels[0]) - 1
+        level = 0
+        while len(self.levels[level]) > 1:
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            parent_index = index // 2
+            left = self.levels[level][2 * parent_index]
+            if 2 * parent_index + 1 < len(self.levels[level]):
+                parent = node_hash(left, self.levels[level][2 * parent_index + 1])
+            else:
+                parent = left
+            parent_level = self.levels[level + 1]
+            if parent_index < len(parent_level):
+                parent_level[parent_index] = parent
+            else:
+                parent_level.append(parent)
+            index = parent_index
+            level += 1
+
+    def _node(self, level: int, index: int, size: int) -> bytes:
+        """
+        Valor do nó (nível, índice) na árvore formada pelas `size` primeiras folhas.
+        Nós completos vêm do cache; só a borda direita é recalculada.
+        """
+        if (index + 1) << level <= size or level == 0:
+            return self.levels[level][index]
+        left = self._node(level - 1, 2 * index, size)
+        if (2 * index + 1) << (level - 1) < size:
+            return node_hash(left, self._node(level - 1, 2 * index + 1, size))
+        return left
+
+    @staticmethod
+    def _height(size: int) -> int:
+        height = 0
+        while (1 << height) < size:
+            height += 1
+        return height
+
+    def root(self, size: Optional[int] = None) -> Optional[str]:
+        """
+        Raiz da árvore (hex) com todas as folhas ou apenas as `size` primeiras.
+        :return: A raiz ou None se a árvore estiver vazia.
+        """
+        size = len(self) if size is None else size
+        if size == 0:
+            return None
+        return self._node(self._height(size), 0, size).hex()
+
+    def inclusion_proof(self, index: int, size: Optional[int] = None) -> List[Dict]:
+        """
+        Prova de inclusão da folha `index` (base 0) na árvore de `size` folhas.
+        :return: Lista de irmãos, da folha para a raiz: {'side': 'left'|'right', 'hash': hex}.
+        """
+        size = len(self) if size is None else size
+        if not 0 <= index < size <= len(self):
+            raise IndexError("Folha fora da árvore.")
+
+        proof = []
+        for level in range(self._height(size)):
+            sibling = index ^ 1
+            # Só existe irmão se ele tiver ao menos uma folha dentro da árvore
+            if sibling << level < size:
+                proof.append({'side': 'left' if sibling < index else 'right',
+                              'hash': self._node(level, sibling, size).hex()})
+            index //= 2
+        return proof
+
+
+def verify_inclusion(contract_hash: str, proof: List[Dict], root: str) -> bool:
+    """
+    Verifica uma prova de inclusão sem acesso ao registro completo.
+    :param contract_hash: O hash SHA-256 (hex) do contrato.
+    :param proof: Lista de irmãos retornada por `MerkleTree.inclusion_proof`.
+    :param root: A raiz (hex) publicada/ancorada.
+    :return: True se o contrato pertence à árvore com a raiz informada.
+    """
+    current = leaf_hash(contract_hash)
+    for step in proof:
+        sibling = bytes.fromhex(step['hash'])
+        if step['side'] == 'left':
+            current = node_hash(sibling, current)
+        else:
+            current = node_hash(current, sibling)
+    return current.hex() == root
@@ -0,0 +1,212 @@
+"""
+Registro de contratos compartilhado por todas as sessões de um processo.
+
+O `SharedContractRegistry` envolve um único ContractManager:
+
+- A parte cara de um registro (ler o arquivo, calcular hashes, comprimir)
+  roda em paralelo, fora de qualquer trava, via
+  `ContractManager.prepare_contract_stream`.
+- As gravações entram em uma fila e são aplicadas em lote: a thread que obtém
+  a trava de escrita grava todos os contratos pendentes de uma vez (group
+  commit), e as demais apenas aguardam o seu resultado.
+- Consultas pontuais (hash -> número, metadados, texto) não usam trava: os
+  índices são dicionários e listas em que cada gravação entra por último, de
+  modo que um leitor nunca enxerga um contrato pela metade.
+- Operações que percorrem estruturas atualizadas em várias etapas (árvore de
+  Merkle, índice invertido, listagem paginada, estatísticas) usam a trava de leitura,
+  compartilhada entre leitores e exclusiva só em relação às gravações.
+- Os índices derivados do texto (similaridade, blocos, busca) são preenchidos
+  sob demanda: antes de uma consulta, os contratos que ainda não estão neles
+  são indexados sob a trava de escrita.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from contract_manager import HASH_CHUNK_SIZE, ByteSource, ContractManager
+
+
+class ReadWriteLock:
+    """
+    Trava de leitura/escrita: vários leitores simultâneos ou um único escritor.
+    Escritores aguardando têm preferência, para que um fluxo contínuo de
+    leituras não atrase as gravações indefinidamente.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+class _PendingCommit:
+    """Um contrato preparado aguardando gravação no lote."""
+
+    def __init__(self, prepared: Dict):
+        self.prepared = prepared
+        self.number: Optional[int] = None
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+
+class SharedContractRegistry:
+    """
+    ContractManager seguro para uso simultâneo por várias threads (ex.: sessões
+    do Streamlit). Métodos não redefinidos aqui são repassados ao manager sem
+    trava (consultas pontuais).
+    """
+
+    def __init__(self, manager: ContractManager):
+        self.manager = manager
+        self.lock = ReadWriteLock()
+        self._pending: List[_PendingCommit] = []
+        self._pending_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.manager, name)
+
+    @contextmanager
+    def _indexed(self) -> Iterator[None]:
+        """
+        Trava de leitura com os índices derivados do texto em dia: os contratos
+        pendentes são indexados antes, sob a trava de escrita.
+        """
+        while True:
+            if self.manager.content_pending:
+                with self.lock.write():
+                    self.manager.index_pending_content()
+            with self.lock.read():
+                # Um registro pode ter entrado entre as duas travas
+                if not self.manager.content_pending:
+                    yield
+                    return
+
+    # --- Gravações ---
+
+    def _commit(self, prepared: Dict) -> int:
+        """
+        Enfileira um contrato preparado e participa do group commit: quem obtém
+        a trava de escrita grava todos os pendentes, na ordem de chegada.
+        """
+        pending = _PendingCommit(prepared)
+        with self._pending_lock:
+            self._pending.append(pending)
+
+        while not pending.done.is_set():
+            with self.lock.write():
+                with self._pending_lock:
+                    batch, self._pending = self._pending, []
+                try:
+                    # Em bancos de dados, o lote inteiro vai em um único envio
+                    with self.manager.store.batch():
+                        for item in batch:
+                            try:
+                                item.number = self.manager.commit_prepared(item.prepared)
+                            except BaseException as e:
+                                item.error = e
+                except BaseException as e:
+                    # O envio do lote falhou: cada contrato do lote recebe o erro
+                    for item in batch:
+                        if item.error is None:
+                            item.error = e
+                finally:
+                    # Sempre libera quem aguarda; senão, as outras threads ficariam presas no laço
+                    for item in batch:
+                        item.done.set()
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.number
+
+    def add_contract(self, text: str) -> int:
+        """Adiciona um contrato (ver `ContractManager.add_contract`)."""
+        return self.add_contract_stream([text.encode('utf-8')])
+
+    def add_contract_stream(self, source: ByteSource, chunk_size: int = HASH_CHUNK_SIZE) -> int:
+        """Adiciona um contrato lido em blocos (ver `ContractManager.add_contract_stream`)."""
+        return self._commit(self.manager.prepare_contract_stream(source, chunk_size))
+
+    def add_hashed_contract_stream(self, contract_hash: str, source: ByteSource,
+                                   chunk_size: int = HASH_CHUNK_SIZE,
+                                   algorithm: Optional[str] = None,
+                                   content: Optional[Dict] = None) -> int:
+        """Adiciona um contrato com hash já calculado (ver `ContractManager.add_hashed_contract_stream`)."""
+        algorithm = algorithm or self.manager.algorithm
+        existing_number = self.manager.find_number_by_digests({algorithm: contract_hash})
+        if existing_number is not None:
+            return existing_number
+        return self._commit(self.manager.prepare_contract_stream(source, chunk_size, contract_hash, algorithm,
+                                                                 content))
+
+    def anchor_root(self, blockchain=None) -> Optional[Dict]:
+        """Ancora a raiz de Merkle atual (ver `ContractManager.anchor_root`)."""
+        with self.lock.write():
+            return self.manager.anchor_root(blockchain)
+
+    # --- Leituras que percorrem várias estruturas ---
+
+    def merkle_root(self) -> Optional[str]:
+        """Raiz de Merkle atual do registro (hex) ou None se estiver vazio."""
+        with self.lock.read():
+            return self.manager.merkle.root()
+
+    def get_inclusion_proof(self, index: int, tree_size: Optional[int] = None) -> Optional[Dict]:
+        """Prova de inclusão de um contrato (ver `ContractManager.get_inclusion_proof`)."""
+        with self.lock.read():
+            return self.manager.get_inclusion_proof(index, tree_size)
+
+    def search_contracts(self, query: str, limit: int = 10, snippet_width: int = 200) -> List[Dict]:
+        """Busca no texto dos contratos (ver `ContractManager.search_contracts`)."""
+        with self._indexed():
+            return self.manager.search_contracts(query, limit, snippet_width)
+
+    def find_similar_contracts(self, source: ByteSource, *args, **kwargs) -> List[Dict]:
+        """Contratos parecidos com um arquivo (ver `ContractManager.find_similar_contracts`)."""
+        with self._indexed():
+            return self.manager.find_similar_contracts(source, *args, **kwargs)
+
+    def locate_changes(self, source: ByteSource, reference_number: Optional[int] = None) -> Optional[Dict]:
+        """Regiões alteradas de um arquivo (ver `ContractManager.locate_changes`)."""
+        with self._indexed():
+            return self.manager.locate_changes(source, reference_number)
+
+    def list_contracts(self, *args, **kwargs) -> Dict:
+        """Página da listagem de contratos (ver `ContractManager.list_contracts`)."""
+        with self.lock.read():
+            return self.manager.list_contracts(*args, **kwargs)
+
+    @property
+    def stats(self) -> Dict:
+        """Estatísticas do armazenamento (ver `ContractManager.stats`)."""
+        with self.lock.read():
+            return self.manager.stats
@@ -0,0 +1,406 @@
+"""
+Índice invertido para busca textual nos contratos registrados.
+
+A tokenização é voltada ao português: minúsculas, remoção de acentos (para que
+"rescisão" e "rescisao" coincidam), descarte de stopwords e uma redução leve de
+plurais ("contratos" -> "contrato", "cláusulas" -> "clausula",
+"obrigações" -> "obrigacao"). O índice guarda, para cada termo, os números dos
+contratos e a frequência do termo em cada um, e ordena os resultados por BM25.
+
+A busca devolve só os `limit` mais relevantes sem pontuar todos os contratos
+que atendem à consulta (MaxScore): cada termo tem um limite superior da sua
+contribuição ao BM25, e listas de termos cuja soma de limites não alcança a
+pior nota entre os melhores até o momento deixam de ser percorridas.
+"""
+import heapq
+import math
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+_WORD_RE = re.compile(r'\w+')
+
+STOPWORDS = frozenset('''
+a ao aos as ate com como da das de dela dele deles do dos e ela elas ele eles em
+entre era essa esse esta este eu foi ha isso isto ja la lhe mais mas me mesmo
+meu minha muito na nao nas nem no nos nossa nosso num numa o os ou para pela
+pelas pelo pelos por quando que quem se sem ser seu seus so sua suas tambem te
+tem um uma umas uns voce
+'''.split())
+
+# Parâmetros do BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Folga nas comparações com os limites superiores (erros de arredondamento nas somas)
+SCORE_TOLERANCE = 1e-9
+
+# Contratos por bloco das listas do índice (cada bloco guarda o seu limite superior)
+POSTINGS_BLOCK = 64
+
+
+def _strip_accents(word: str) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFKD', word) if not unicodedata.combining(c))
+
+
+def normalize_term(word: str) -> Optional[str]:
+    """
+    Normaliza uma palavra para o índice (None se for stopword).
+    :param word: A palavra como aparece no texto.
+    :return: O termo normalizado ou None.
+    """
+    term = _strip_accents(word.lower())
+    if term in STOPWORDS:
+        return None
+    # Redução leve de plurais
+    if len(term) > 4:
+        if term.endswith('oes') or term.endswith('aes'):
+            return term[:-3] + 'ao'
+        if term.endswith('ais'):
+            return term[:-3] + 'al'
+        if term.endswith('eis'):
+            return term[:-3] + 'el'
+        if term.endswith('ns'):
+            return term[:-2] + 'm'
+    if len(term) > 3 and term.endswith('s') and not term.endswith('ss'):
+        return term[:-1]
+    return term
+
+
+def tokenize(text: str) -> List[str]:
+    """Termos normalizados de um texto, na ordem em que aparecem."""
+    terms = []
+    for word in _WORD_RE.findall(text):
+        term = normalize_term(word)
+        if term:
+            terms.append(term)
+    return terms
+
+
+class TermCounter:
+    """
+    Conta os termos de um texto recebido em partes (palavras partidas entre
+    partes são tratadas).
+    """
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self._partial = ''
+
+    def update(self, text: str) -> None:
+        text = self._partial + text
+        words = _WORD_RE.findall(text)
+        # A última palavra pode continuar no próximo trecho
+        if words and text and (text[-1].isalnum() or text[-1] == '_'):
+            self._partial = words.pop()
+        else:
+            self._partial = ''
+        self._count(words)
+
+    def _count(self, words: List[str]) -> None:
+        for word in words:
+            term = normalize_term(word)
+            if term:
+                self.counts[term] += 1
+
+    def finish(self) -> Counter:
+        if self._partial:
+            self._count([self._partial])
+            self._partial = ''
+        return self.counts
+
+
+def parse_query(query: str) -> Tuple[List[List[str]], Set[str]]:
+    """
+    Interpreta uma consulta booleana.
+
+    Termos separados por espaço são combinados com E; "OU"/"OR" separa
+    alternativas; termos precedidos de "-" ou de "NAO"/"NÃO"/"NOT" são excluídos.
+    Exemplo: "multa rescisão OU distrato -aditivo".
+
+    :return: (grupos de termos — cada grupo é um E, os grupos são combinados
+             com OU —, termos excluídos)
+    """
+    groups: List[List[str]] = [[]]
+    excluded: Set[str] = set()
+    negate = False
+    for word in query.split():
+        operator = _strip_accents(word).upper()
+        if operator in ('OU', 'OR'):
+            groups.append([])
+            continue
+        if operator in ('NAO', 'NOT'):
+            negate = True
+            continue
+        if operator in ('E', 'AND'):
+            continue
+        if word.startswith('-'):
+            negate, word = True, word[1:]
+        for term in tokenize(word):
+            (excluded.add if negate else groups[-1].append)(term)
+        negate = False
+    return [group for group in groups if group], excluded
+
+
+class InvertedIndex:
+    """
+    Índice invertido incremental: termo -> (números dos contratos, frequências).
+    As listas são divididas em blocos de POSTINGS_BLOCK contratos, com a maior
+    frequência e o menor tamanho de contrato de cada bloco: daí saem limites
+    superiores da nota que permitem pular blocos inteiros na busca.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        # Por termo e bloco: (maiores frequências, menores tamanhos de contrato)
+        self._blocks: Dict[str, Tuple[array, array]] = {}
+        self._doc_lengths: Dict[int, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def add(self, number: int, counts: Counter) -> None:
+        """
+        Indexa os termos (com frequências) do contrato de número `number`. Os
+        números devem ser crescentes: as listas de cada termo ficam ordenadas.
+        """
+        length = sum(counts.values())
+        for term, frequency in counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array('I'), array('I'))
+                self._blocks[term] = (array('I'), array('I'))
+            max_frequencies, min_lengths = self._blocks[term]
+            if len(postings[0]) % POSTINGS_BLOCK == 0:
+                max_frequencies.append(frequency)
+                min_lengths.append(length)
+            else:
+                max_frequencies[-1] = max(max_frequencies[-1], frequency)
+                min_lengths[-1] = min(min_lengths[-1], length)
+            postings[0].append(number)
+            postings[1].append(frequency)
+        self._doc_lengths[number] = length
+        self._total_length += length
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        Executa uma consulta booleana (ver `parse_query`) e ordena por BM25,
+        mantendo só os `limit` melhores em um heap.
+        :return: Lista de {'number', 'score'}, do mais ao menos relevante.
+        """
+        groups, excluded = parse_query(query)
+        # Todos os termos da consulta contam na nota, mas um grupo com termo
+        # ausente do índice não é atendido por nenhum contrato
+        terms = {term for group in groups for term in group if term in self._postings}
+        groups = [sorted(set(group), key=lambda term: len(self._postings[term][0]))
+                  for group in groups if terms.issuperset(group)]
+        if not groups or limit <= 0:
+            return []
+
+        total_docs = len(self._doc_lengths)
+        # A nota de um termo em um contrato é weight * f / (f + k1_norm + k1_length * tamanho)
+        k1_norm = BM25_K1 * (1 - BM25_B)
+        k1_length = BM25_K1 * BM25_B * total_docs / self._total_length
+        weights, block_bounds = {}, {}
+        for term in terms:
+            frequency_count = len(self._postings[term][0])
+            weights[term] = (BM25_K1 + 1) * math.log(1 + (total_docs - frequency_count + 0.5) /
+                                                     (frequency_count + 0.5))
+            block_bounds[term] = [weights[term] * frequency / (frequency + k1_norm + k1_length * length)
+                                  for frequency, length in zip(*self._blocks[term])]
+
+        excluded = [self._postings[term][0] for term in excluded if term in self._postings]
+        if len(terms) == 1 and not excluded:
+            (term,) = terms
+            heap = self._top_single_term(term, weights[term], block_bounds[term], k1_norm, k1_length, limit)
+        else:
+            heap = self._top_boolean(groups, excluded, weights, block_bounds, k1_norm, k1_length, limit)
+        return [{'number': -negative_number, 'score': score}
+                for score, negative_number in sorted(heap, reverse=True)]
+
+    def _top_single_term(self, term: str, weight: float, block_bounds: List[float],
+                         k1_norm: float, k1_length: float, limit: int) -> List[Tuple[float, int]]:
+        """
+        Os `limit` melhores para um único termo: os blocos são pontuados em
+        sequência, e os que não alcançam o pior entre os melhores, pulados.
+        :return: Heap de (nota, -número).
+        """
+        documents, frequencies = self._postings[term]
+        lengths = self._doc_lengths
+        heap: List[Tuple[float, int]] = []
+        threshold = -math.inf
+        for block, block_bound in enumerate(block_bounds):
+            if block_bound < threshold - SCORE_TOLERANCE:
+                continue
+            start = block * POSTINGS_BLOCK
+            for number, frequency in zip(documents[start:start + POSTINGS_BLOCK],
+                                         frequencies[start:start + POSTINGS_BLOCK]):
+                score = weight * frequency / (frequency + k1_norm + k1_length * lengths[number])
+                # Em ordem de número: num empate, o contrato que já está no heap fica
+                if len(heap) < limit:
+                    heapq.heappush(heap, (score, -number))
+                elif score > threshold:
+                    heapq.heapreplace(heap, (score, -number))
+                else:
+                    continue
+                if len(heap) == limit:
+                    threshold = heap[0][0]
+        return heap
+
+    def _top_boolean(self, groups: List[List[str]], excluded: List[array], weights: Dict[str, float],
+                     block_bounds: Dict[str, List[float]], k1_norm: float, k1_length: float,
+                     limit: int) -> List[Tuple[float, int]]:
+        """
+        Os `limit` melhores para uma consulta com vários termos (MaxScore).
+
+        Os contratos são avaliados em ordem de número, percorrendo só algumas
+        listas: a do termo mais raro de cada grupo (todo contrato que atende ao
+        grupo está nela) ou, quando for mais barato, as dos termos "essenciais"
+        (sem algum deles, um contrato não alcança o pior entre os melhores já
+        encontrados). Blocos que não alcançam esse limiar são pulados; a
+        presença dos demais termos é conferida por busca binária, e a
+        pontuação de um contrato para assim que a nota máxima ainda possível
+        fica abaixo do limiar.
+        :return: Heap de (nota, -número).
+        """
+        # Termos do maior ao menor limite (a pontuação de um contrato pode parar
+        # cedo), identificados pela posição nesta ordem
+        terms = sorted(block_bounds, key=lambda term: max(block_bounds[term]), reverse=True)
+        documents = [self._postings[term][0] for term in terms]
+        sizes = [len(term_documents) for term_documents in documents]
+        frequencies = [self._postings[term][1] for term in terms]
+        term_weights = [weights[term] for term in terms]
+        term_blocks = [block_bounds[term] for term in terms]
+        bounds = [max(blocks) for blocks in term_blocks]
+        total_bound = sum(bounds)
+        # Cada grupo vira uma máscara de bits dos seus termos
+        group_masks = [sum(1 << terms.index(term) for term in group) for group in groups]
+        drivers = sorted({terms.index(group[0]) for group in groups})
+        drivers_cost = sum(sizes[i] for i in drivers)
+
+        def lists_to_walk(threshold: float) -> List[int]:
+            # Termos não essenciais: os de menor limite cuja soma não alcança o limiar
+            essential = list(range(len(terms)))
+            skipped_bound = 0.0
+            while essential and skipped_bound + bounds[essential[-1]] < threshold - SCORE_TOLERANCE:
+                skipped_bound += bounds[essential.pop()]
+            essential_cost = sum(sizes[i] for i in essential)
+            return essential if essential_cost < drivers_cost else drivers
+
+        heap: List[Tuple[float, int]] = []
+        threshold = -math.inf
+        walked = lists_to_walk(threshold)
+        cursors = [0] * len(terms)
+        # Próximo bloco ainda não conferido contra o limiar, por termo percorrido
+        checked_blocks = [0] * len(terms)
+        lengths = self._doc_lengths
+        number = 0
+        while True:
+            # Próximo contrato: o menor número, após o atual, nas listas percorridas
+            candidate = None
+            for i in walked:
+                term_documents = documents[i]
+                position = _advance(term_documents, sizes[i], cursors[i], number + 1)
+                # Pula os blocos em que nem o máximo do termo com o dos demais alcança o limiar
+                block = position // POSTINGS_BLOCK
+                if block >= checked_blocks[i]:
+                    blocks = term_blocks[i]
+                    others = total_bound - bounds[i] - SCORE_TOLERANCE
+                    while block < len(blocks) and blocks[block] + others < threshold:
+                        block += 1
+                        position = block * POSTINGS_BLOCK
+                    checked_blocks[i] = block + 1
+                cursors[i] = position
+                if position < sizes[i] and (candidate is None or term_documents[position] < candidate):
+                    candidate = term_documents[position]
+            if candidate is None:
+                return heap
+            number = candidate
+            if excluded and any(_contains(excluded_documents, number) >= 0 for excluded_documents in excluded):
+                continue
+
+            norm = k1_norm + k1_length * lengths[number]
+            score = 0.0
+            remaining = total_bound
+            present = 0
+            for i, term_documents in enumerate(documents):
+                remaining -= bounds[i]
+                position = cursors[i]
+                if position < sizes[i] and term_documents[position] < number:
+                    position = cursors[i] = _advance(term_documents, sizes[i], position + 1, number)
+                if position < sizes[i] and term_documents[position] == number:
+                    frequency = frequencies[i][position]
+                    score += term_weights[i] * frequency / (frequency + norm)
+                    present |= 1 << i
+                elif score + remaining < threshold - SCORE_TOLERANCE:
+                    break
+            else:
+                if not any(present & mask == mask for mask in group_masks):
+                    continue
+                # Em ordem de número: num empate, o contrato que já está no heap fica
+                if len(heap) < limit:
+                    heapq.heappush(heap, (score, -number))
+                elif score > threshold:
+                    heapq.heapreplace(heap, (score, -number))
+                else:
+                    continue
+                if len(heap) == limit:
+                    threshold = heap[0][0]
+                    walked = lists_to_walk(threshold)
+
+
+def _advance(documents: array, size: int, position: int, number: int) -> int:
+    """
+    Primeira posição a partir de `position` com número >= `number` na lista
+    ordenada. Confere as duas posições seguintes antes da busca binária: em
+    listas densas, o próximo contrato costuma estar logo ali.
+    """
+    if position < size and documents[position] < number:
+        position += 1
+        if position < size and documents[position] < number:
+            position = bisect_left(documents, number, position + 1)
+    return position
+
+
+def _contains(documents: array, number: int, start: int = 0) -> int:
+    """Posição de `number` na lista ordenada `documents` (a partir de `start`) ou -1."""
+    position = bisect_left(documents, number, start)
+    return position if position < len(documents) and documents[position] == number else -1
+
+
+def make_snippet(text: str, query: str, width: int = 200) -> List[Tuple[str, bool]]:
+    """
+    Trecho do texto em torno da primeira ocorrência de um termo da consulta.
+    :param text: O texto do contrato.
+    :param query: A consulta usada na busca.
+    :param width: Tamanho aproximado do trecho em caracteres.
+    :return: Lista de (fragmento, destacado), pronta para renderização.
+    """
+    groups, _ = parse_query(query)
+    terms = {term for group in groups for term in group}
+    matches = [m for m in _WORD_RE.finditer(text) if normalize_term(m.group()) in terms]
+    if not matches:
+        return [(text[:width], False)]
+
+    start = max(0, matches[0].start() - width // 3)
+    end = min(len(text), start + width)
+    segments: List[Tuple[str, bool]] = []
+    position = start
+    for match in matches:
+        if match.start() < start:
+            continue
+        if match.end() > end:
+            break
+        segments.append((text[position:match.start()], False))
+        segments.append((match.group(), True))
+        position = match.end()
+    segments.append((text[position:end], False))
+    if start > 0:
+        segments.insert(0, ('...', False))
+    if end < len(text):
+        segments.append(('...', False))
+    return segments
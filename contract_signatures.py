@@ -0,0 +1,323 @@
+"""
+Assinaturas digitais destacadas sobre os hashes dos contratos.
+
+O hash registrado prova apenas que um texto confere com o registro, não quem o
+registrou. Aqui cada contrato pode receber assinaturas (RSA-PSS com SHA-256 ou
+Ed25519) sobre a mensagem `signing_message(hash, algoritmo)`, guardadas fora
+do texto.
+
+- `batch_sign`/`batch_verify` processam muitos hashes de uma vez, opcionalmente
+  em um pool de processos que carrega a chave uma única vez por processo.
+- O `VerificationCache` guarda as assinaturas já verificadas, indexadas por
+  (hash, impressão digital da chave): verificações repetidas (ex.: a página de
+  integridade) não refazem a operação de chave pública.
+- O `SignatureRegistry` guarda as assinaturas de cada contrato e as chaves
+  públicas dos signatários, compartilhado pelas sessões do servidor.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, padding, rsa
+
+from crypto_keyring import DEFAULT_KEYRING
+from digest_utils import DEFAULT_ALGORITHM
+
+# Prefixo da mensagem assinada: uma assinatura de contrato não serve para outro fim
+SIGNATURE_CONTEXT = b'educablock-assinatura-contrato-1\x00'
+
+# Algoritmos de assinatura, determinados pelo tipo da chave
+SIGNATURE_ALGORITHMS = ('rsa-pss', 'ed25519')
+
+PSS_PADDING = padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH)
+
+# Hashes por tarefa enviada a um processo worker
+DEFAULT_SIGNATURE_BATCH = 64
+
+# Verificações bem-sucedidas mantidas no cache
+DEFAULT_CACHE_SIZE = 100_000
+
+# (hash do contrato, algoritmo de digest)
+SignedHash = Tuple[str, str]
+
+
+def signing_message(contract_hash: str, algorithm: str = DEFAULT_ALGORITHM) -> bytes:
+    """Bytes assinados para um contrato: o contexto, o algoritmo de digest e o hash."""
+    return SIGNATURE_CONTEXT + f"{algorithm}:{contract_hash.lower()}".encode('ascii')
+
+
+def signature_algorithm(key) -> str:
+    """
+    Algoritmo de assinatura de uma chave (privada ou pública).
+    :raises ValueError: Se a chave não servir para assinar (ex.: X25519).
+    """
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return 'rsa-pss'
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return 'ed25519'
+    raise ValueError("A chave não serve para assinaturas: use RSA ou Ed25519.")
+
+
+def public_key_pem(private_key_pem: str) -> str:
+    """Chave pública (PEM) correspondente a uma chave privada, para registrar o signatário."""
+    public_key = DEFAULT_KEYRING.private_key(private_key_pem).key.public_key()
+    return public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode('utf-8')
+
+
+def sign_hash(private_key, contract_hash: str, algorithm: str = DEFAULT_ALGORITHM) -> bytes:
+    """
+    Assina o hash de um contrato.
+    :param private_key: Chave privada RSA ou Ed25519 já carregada.
+    :return: A assinatura.
+    """
+    message = signing_message(contract_hash, algorithm)
+    if signature_algorithm(private_key) == 'rsa-pss':
+        return private_key.sign(message, PSS_PADDING, hashes.SHA256())
+    return private_key.sign(message)
+
+
+def verify_hash(public_key, signature: bytes, contract_hash: str, algorithm: str = DEFAULT_ALGORITHM) -> bool:
+    """Verifica a assinatura do hash de um contrato com uma chave pública já carregada."""
+    message = signing_message(contract_hash, algorithm)
+    try:
+        if signature_algorithm(public_key) == 'rsa-pss':
+            public_key.verify(signature, message, PSS_PADDING, hashes.SHA256())
+        else:
+            public_key.verify(signature, message)
+    except InvalidSignature:
+        return False
+    return True
+
+
+class VerificationCache:
+    """
+    LRU limitado das assinaturas já verificadas, indexado por (hash, impressão
+    digital da chave). Guarda o SHA-256 da assinatura verificada: outra
+    assinatura para o mesmo par não é aceita pelo cache e volta a ser
+    verificada. Só verificações bem-sucedidas entram no cache.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple[str, bytes], bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def is_verified(self, contract_hash: str, fingerprint: bytes, signature: bytes) -> bool:
+        """Se esta assinatura já foi verificada para o hash e a chave."""
+        key = (contract_hash.lower(), fingerprint)
+        with self._lock:
+            verified = self._entries.get(key) == hashlib.sha256(signature).digest()
+            if verified:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return verified
+
+    def add(self, contract_hash: str, fingerprint: bytes, signature: bytes) -> None:
+        """Registra uma verificação bem-sucedida."""
+        key = (contract_hash.lower(), fingerprint)
+        with self._lock:
+            self._entries[key] = hashlib.sha256(signature).digest()
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Chave carregada uma vez em cada processo worker
+_worker_key = None
+
+
+def _init_signature_worker(key_pem: str, private: bool) -> None:
+    global _worker_key
+    entry = DEFAULT_KEYRING.private_key(key_pem) if private else DEFAULT_KEYRING.public_key(key_pem)
+    _worker_key = entry.key
+
+
+def _sign_batch(items: List[SignedHash], key=None) -> List[bytes]:
+    key = _worker_key if key is None else key
+    return [sign_hash(key, contract_hash, algorithm) for contract_hash, algorithm in items]
+
+
+def _verify_batch(items: List[Tuple[str, str, bytes]], key=None) -> List[bool]:
+    key = _worker_key if key is None else key
+    return [verify_hash(key, signature, contract_hash, algorithm)
+            for contract_hash, algorithm, signature in items]
+
+
+def _run_batches(function, items: list, key_pem: str, private: bool, workers: Optional[int],
+                 batch_size: int) -> list:
+    """Aplica `function` aos lotes de `items`, em ordem, com a chave carregada no processo."""
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    if workers == 1 or len(batches) <= 1:
+        # No próprio processo a chave é passada direto: várias sessões podem assinar ao mesmo tempo
+        entry = DEFAULT_KEYRING.private_key(key_pem) if private else DEFAULT_KEYRING.public_key(key_pem)
+        return function(items, entry.key)
+
+    workers = min(workers or os.cpu_count() or 1, len(batches))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_signature_worker,
+                             initargs=(key_pem, private)) as executor:
+        return [result for results in executor.map(function, batches) for result in results]
+
+
+def batch_sign(items: Iterable[SignedHash], private_key_pem: str, workers: Optional[int] = 1,
+               batch_size: int = DEFAULT_SIGNATURE_BATCH) -> List[Dict]:
+    """
+    Assina muitos hashes com a mesma chave, opcionalmente em um pool de processos.
+    :param items: Pares (hash, algoritmo de digest).
+    :param private_key_pem: Chave privada RSA ou Ed25519 (PEM, sem senha).
+    :param workers: Número de processos (None = número de CPUs). 1 = sem pool.
+    :param batch_size: Hashes por tarefa enviada a um processo.
+    :return: Um dicionário por hash, na ordem de `items`, com 'hash',
+             'algorithm', 'signature_algorithm', 'fingerprint' e 'signature'.
+    :raises ValueError: Se a chave for inválida ou não servir para assinar.
+    """
+    items = [(contract_hash.lower(), algorithm) for contract_hash, algorithm in items]
+    entry = DEFAULT_KEYRING.private_key(private_key_pem)
+    scheme = signature_algorithm(entry.key)
+    signatures = _run_batches(_sign_batch, items, private_key_pem, True, workers, batch_size)
+    return [{'hash': contract_hash, 'algorithm': algorithm, 'signature_algorithm': scheme,
+             'fingerprint': entry.fingerprint, 'signature': signature}
+            for (contract_hash, algorithm), signature in zip(items, signatures)]
+
+
+def batch_verify(signatures: Iterable[Dict], public_key_pem: str, workers: Optional[int] = 1,
+                 cache: Optional[VerificationCache] = None,
+                 batch_size: int = DEFAULT_SIGNATURE_BATCH) -> List[bool]:
+    """
+    Verifica muitas assinaturas de uma mesma chave. As que já estão no cache
+    não são verificadas de novo; as válidas entram no cache.
+    :param signatures: Dicionários com 'hash', 'algorithm' e 'signature' (ver `batch_sign`).
+    :param public_key_pem: Chave pública do signatário (PEM).
+    :param workers: Número de processos (None = número de CPUs). 1 = sem pool.
+    :param cache: Cache de verificações (opcional).
+    :param batch_size: Assinaturas por tarefa enviada a um processo.
+    :return: Um booleano por assinatura, na ordem de `signatures`.
+    :raises ValueError: Se a chave for inválida ou não servir para assinar.
+    """
+    signatures = list(signatures)
+    fingerprint = DEFAULT_KEYRING.public_key(public_key_pem).fingerprint
+    results = [False] * len(signatures)
+    pending = []
+    for position, record in enumerate(signatures):
+        if cache is not None and cache.is_verified(record['hash'], fingerprint, record['signature']):
+            results[position] = True
+        else:
+            pending.append(position)
+
+    items = [(signatures[position]['hash'], signatures[position]['algorithm'], signatures[position]['signature'])
+             for position in pending]
+    for position, valid in zip(pending, _run_batches(_verify_batch, items, public_key_pem, False,
+                                                     workers, batch_size)):
+        results[position] = valid
+        if valid and cache is not None:
+            record = signatures[position]
+            cache.add(record['hash'], fingerprint, record['signature'])
+    return results
+
+
+class SignatureRegistry:
+    """
+    Assinaturas dos contratos (hash -> impressão digital -> assinatura) e as
+    chaves públicas dos signatários, em memória. Seguro para várias threads.
+    """
+
+    def __init__(self, cache: Optional[VerificationCache] = None):
+        self.cache = cache if cache is not None else VerificationCache()
+        self._signatures: Dict[str, Dict[bytes, Dict]] = {}
+        self._public_keys: Dict[bytes, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(by_key) for by_key in self._signatures.values())
+
+    def add_signer(self, public_key_pem: str) -> bytes:
+        """
+        Registra a chave pública de um signatário.
+        :return: A impressão digital da chave.
+        :raises ValueError: Se a chave for inválida ou não servir para assinar.
+        """
+        entry = DEFAULT_KEYRING.public_key(public_key_pem)
+        signature_algorithm(entry.key)
+        with self._lock:
+            self._public_keys[entry.fingerprint] = public_key_pem
+        return entry.fingerprint
+
+    def add_signatures(self, records: Iterable[Dict]) -> int:
+        """
+        Guarda assinaturas geradas por `batch_sign` (o signatário precisa ter
+        sido registrado com `add_signer`). Não são verificadas aqui.
+        :return: Quantidade de assinaturas guardadas.
+        :raises KeyError: Se a chave do signatário não estiver registrada.
+        """
+        count = 0
+        with self._lock:
+            for record in records:
+                if record['fingerprint'] not in self._public_keys:
+                    raise KeyError(f"Signatário não registrado: {record['fingerprint'].hex()[:16]}")
+                self._signatures.setdefault(record['hash'], {})[record['fingerprint']] = record
+                count += 1
+        return count
+
+    def signed_by(self, contract_hash: str, fingerprint: bytes) -> bool:
+        return fingerprint in self._signatures.get(contract_hash.lower(), {})
+
+    def signatures_for(self, contract_hash: str) -> List[Dict]:
+        """Assinaturas guardadas de um contrato."""
+        with self._lock:
+            return list(self._signatures.get(contract_hash.lower(), {}).values())
+
+    def verify_contract(self, contract_hash: str) -> List[Dict]:
+        """
+        Verifica todas as assinaturas de um contrato, usando o cache.
+        :return: Um dicionário por assinatura, com 'fingerprint',
+                 'signature_algorithm' e 'valid'.
+        """
+        results = []
+        for record in self.signatures_for(contract_hash):
+            valid = batch_verify([record], self._public_keys[record['fingerprint']], workers=1,
+                                 cache=self.cache)[0]
+            results.append({'fingerprint': record['fingerprint'],
+                            'signature_algorithm': record['signature_algorithm'], 'valid': valid})
+        return results
+
+    def verify_all(self, workers: Optional[int] = 1) -> Dict:
+        """
+        Verifica todas as assinaturas guardadas, em lote por signatário.
+        :return: Dicionário com 'verified', 'invalid' (hashes com alguma
+                 assinatura inválida) e as estatísticas do cache.
+        """
+        with self._lock:
+            by_signer: Dict[bytes, List[Dict]] = {}
+            for by_key in self._signatures.values():
+                for fingerprint, record in by_key.items():
+                    by_signer.setdefault(fingerprint, []).append(record)
+            public_keys = dict(self._public_keys)
+
+        hits_before = self.cache.hits
+        verified, invalid = 0, []
+        for fingerprint, records in by_signer.items():
+            for record, valid in zip(records, batch_verify(records, public_keys[fingerprint], workers,
+                                                           self.cache)):
+                if valid:
+                    verified += 1
+                else:
+                    invalid.append(record['hash'])
+        return {'verified': verified, 'invalid': invalid, 'cache_hits': self.cache.hits - hits_before}
@@ -0,0 +1,158 @@
+"""
+Índice de similaridade entre contratos (MinHash + LSH).
+
+Cada texto é reduzido a um conjunto de shingles (sequências de SHINGLE_SIZE
+palavras) e a uma assinatura MinHash de NUM_PERM valores, que estima a
+similaridade de Jaccard entre dois contratos. Cada shingle recebe um hash de
+64 bits (BLAKE2b) e as "permutações" são XORs com máscaras aleatórias fixas,
+bem mais baratas em Python puro que (a * x + b) mod p.
+
+As assinaturas são divididas em BANDS faixas: contratos que coincidem em pelo
+menos uma faixa viram candidatos, de modo que a consulta não percorre o
+registro inteiro.
+"""
+import hashlib
+import random
+import re
+from array import array
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+
+_MAX_HASH = (1 << 64) - 1
+# As assinaturas guardam só os 32 bits menos significativos de cada mínimo
+_SIGNATURE_MASK = (1 << 32) - 1
+
+_WORD_RE = re.compile(r'\w+')
+
+# Máscaras fixas: as assinaturas são comparáveis entre execuções
+_rng = random.Random(20240601)
+_MASKS = [_rng.getrandbits(64) for _ in range(NUM_PERM)]
+
+
+def _shingle_hash(words: List[str]) -> int:
+    return int.from_bytes(hashlib.blake2b(' '.join(words).encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class MinHasher:
+    """
+    Calcula a assinatura MinHash de um texto recebido em partes, com memória
+    limitada ao tamanho de cada parte.
+    """
+
+    def __init__(self):
+        self._mins = [_MAX_HASH] * NUM_PERM
+        self._window: List[str] = []
+        self._partial = ''
+        self._shingles = 0
+
+    def update(self, text: str) -> None:
+        """Processa mais um trecho do texto."""
+        text = self._partial + text.lower()
+        words = _WORD_RE.findall(text)
+        # A última palavra pode continuar no próximo trecho
+        if words and text and (text[-1].isalnum() or text[-1] == '_'):
+            self._partial = words.pop()
+        else:
+            self._partial = ''
+        self._add_words(words)
+
+    def _add_words(self, words: List[str]) -> None:
+        hashes = []
+        for word in words:
+            self._window.append(word)
+            if len(self._window) > SHINGLE_SIZE:
+                self._window.pop(0)
+            if len(self._window) == SHINGLE_SIZE:
+                hashes.append(_shingle_hash(self._window))
+        self._update_mins(hashes)
+
+    def _update_mins(self, hashes: List[int]) -> None:
+        if not hashes:
+            return
+        self._shingles += len(hashes)
+        for i, mask in enumerate(_MASKS):
+            value = min(map(mask.__xor__, hashes))
+            if value < self._mins[i]:
+                self._mins[i] = value
+
+    def signature(self) -> Optional[array]:
+        """
+        Finaliza e retorna a assinatura (None se o texto não tiver palavras).
+        Textos com menos de SHINGLE_SIZE palavras viram um único shingle.
+        """
+        if self._partial:
+            self._add_words([self._partial])
+            self._partial = ''
+        if self._shingles == 0 and self._window:
+            self._update_mins([_shingle_hash(self._window)])
+        if self._shingles == 0:
+            return None
+        return array('I', (value & _SIGNATURE_MASK for value in self._mins))
+
+
+def text_signature(text: str) -> Optional[array]:
+    """Assinatura MinHash de um texto completo."""
+    hasher = MinHasher()
+    hasher.update(text)
+    return hasher.signature()
+
+
+def estimate_similarity(sig_a: array, sig_b: array) -> float:
+    """Estimativa da similaridade de Jaccard entre duas assinaturas (0 a 1)."""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+
+class SimilarityIndex:
+    """
+    Índice LSH de assinaturas MinHash, atualizado incrementalmente.
+    """
+
+    def __init__(self):
+        self._signatures: Dict[int, array] = {}
+        # Uma tabela por faixa: chave da faixa -> números dos contratos
+        self._buckets = [defaultdict(list) for _ in range(BANDS)]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    @staticmethod
+    def _band_keys(signature: array):
+        for band in range(BANDS):
+            start = band * ROWS_PER_BAND
+            yield band, hash(tuple(signature[start:start + ROWS_PER_BAND]))
+
+    def add(self, number: int, signature: Optional[array]) -> None:
+        """Indexa a assinatura do contrato de número `number`."""
+        if signature is None:
+            return
+        self._signatures[number] = signature
+        for band, key in self._band_keys(signature):
+            self._buckets[band][key].append(number)
+
+    def query(self, signature: Optional[array], limit: int = 5,
+              min_similarity: float = 0.0) -> List[Dict]:
+        """
+        Busca os contratos mais parecidos com a assinatura informada.
+        :param signature: Assinatura MinHash do texto consultado.
+        :param limit: Número máximo de resultados.
+        :param min_similarity: Similaridade estimada mínima (0 a 1).
+        :return: Lista de {'number', 'similarity'}, da maior para a menor similaridade.
+        """
+        if signature is None:
+            return []
+        candidates = set()
+        for band, key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(key, ()))
+
+        results = []
+        for number in candidates:
+            similarity = estimate_similarity(signature, self._signatures[number])
+            if similarity >= min_similarity:
+                results.append({'number': number, 'similarity': similarity})
+        results.sort(key=lambda result: (-result['similarity'], result['number']))
+        return results[:limit]
@@ -0,0 +1,643 @@
+import io
+import json
+import os
+import struct
+import tempfile
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from contract_chunking import DIGEST_SIZE, ContentDefinedChunker, chunk_digest
+from contract_compression import TextCompressor
+from digest_utils import ALGORITHM_NAMES, DEFAULT_ALGORITHM, DIGEST_ALGORITHMS
+
+# Tamanho dos blocos lidos e entregues por `iter_bytes` (downloads em streaming)
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def registration_time(timestamps: array) -> float:
+    """
+    Instante de registro de um novo contrato (segundos desde a época). Nunca
+    é anterior ao último registro, para que os instantes fiquem em ordem e as
+    buscas por data possam usar busca binária sobre os números.
+    """
+    now = time.time()
+    return max(now, timestamps[-1]) if timestamps else now
+
+
+class CompressingSpool:
+    """
+    Recebe um contrato em partes e grava a versão comprimida em `target`,
+    contabilizando os tamanhos original e armazenado.
+    """
+
+    def __init__(self, target, compressor: TextCompressor):
+        self.target = target
+        self._compressobj = compressor.compressobj()
+        self.original_size = 0
+        self.stored_size = 0
+
+    @property
+    def name(self) -> str:
+        return self.target.name
+
+    def write(self, data: bytes) -> None:
+        self.original_size += len(data)
+        self._write_stored(self._compressobj.compress(data))
+
+    def finish(self) -> None:
+        """Finaliza a compressão (grava os bytes pendentes)."""
+        self._write_stored(self._compressobj.flush())
+
+    def _write_stored(self, data: bytes) -> None:
+        if data:
+            self.target.write(data)
+            self.stored_size += len(data)
+
+    def close(self) -> None:
+        self.target.close()
+
+
+class ContractStore:
+    """
+    Interface dos armazenamentos usados pelo ContractManager.
+
+    Os contratos são numerados a partir de 1, na ordem de registro. Um contrato
+    é recebido em partes por um spool (`open_spool`) e só passa a existir no
+    `commit_spool`. Os metadados (`hash_at`, `algorithm_at`, `size_at`,
+    `registered_at`) devem ser baratos; `read_text` pode buscar o texto sob demanda.
+    """
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def append(self, contract_hash: str, text: str, algorithm: str = DEFAULT_ALGORITHM) -> int:
+        """
+        Armazena um novo contrato.
+        :param contract_hash: O hash do texto.
+        :param text: O texto do contrato.
+        :param algorithm: O algoritmo de digest usado em `contract_hash`.
+        :return: O número (base 1) do contrato armazenado.
+        """
+        spool = self.open_spool()
+        spool.write(text.encode('utf-8'))
+        return self.commit_spool(spool, contract_hash, algorithm)
+
+    def open_spool(self):
+        """Abre um receptor para um contrato enviado em partes (método `write`)."""
+        raise NotImplementedError
+
+    def commit_spool(self, spool, contract_hash: str, algorithm: str = DEFAULT_ALGORITHM) -> int:
+        """Registra o conteúdo do spool como um novo contrato e retorna o seu número."""
+        raise NotImplementedError
+
+    def discard_spool(self, spool) -> None:
+        """Descarta o spool (ex.: contrato duplicado)."""
+        raise NotImplementedError
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Agrupa as gravações feitas dentro do bloco `with`; armazenamentos em
+        banco de dados as enviam de uma vez (ver contract_db_store).
+        """
+        yield
+
+    def hash_at(self, number: int) -> str:
+        raise NotImplementedError
+
+    def algorithm_at(self, number: int) -> str:
+        raise NotImplementedError
+
+    def size_at(self, number: int) -> int:
+        raise NotImplementedError
+
+    def registered_at(self, number: int) -> float:
+        """Instante do registro (segundos desde a época; 0.0 se desconhecido)."""
+        raise NotImplementedError
+
+    def read_text(self, number: int) -> str:
+        raise NotImplementedError
+
+    def iter_bytes(self, number: int, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Percorre o conteúdo (UTF-8) do contrato em blocos de até `chunk_size`
+        bytes. Os armazenamentos redefinem este método para ler e descomprimir
+        aos poucos, com memória limitada qualquer que seja o tamanho do contrato.
+        """
+        data = self.read_text(number).encode('utf-8')
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+
+    def iter_hashes(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        """Dicionário com 'backend', 'compression', 'original_bytes' e 'stored_bytes'."""
+        raise NotImplementedError
+
+
+def iter_slices(blob: bytes, chunk_size: int) -> Iterator[memoryview]:
+    """Fatias de `blob` com até `chunk_size` bytes, sem copiá-lo."""
+    view = memoryview(blob)
+    for start in range(0, len(view), chunk_size):
+        yield view[start:start + chunk_size]
+
+
+class MemoryContractStore(ContractStore):
+    """
+    Armazena os contratos em memória, na sessão do processo. Os textos ficam
+    comprimidos e só são descomprimidos quando lidos.
+    """
+
+    def __init__(self, compressor: Optional[TextCompressor] = None):
+        self.compressor = compressor if compressor is not None else TextCompressor('zlib')
+        # Estrutura: list of (hash_str, compressed_text)
+        self._records: List[Tuple[str, bytes]] = []
+        self._sizes = array('Q')
+        self._algorithms = array('B')
+        self._timestamps = array('d')
+        self._original_bytes = 0
+        self._stored_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def append(self, contract_hash: str, text: str, algorithm: str = DEFAULT_ALGORITHM) -> int:
+        """
+        Armazena um novo contrato.
+        :param contract_hash: O hash do texto.
+        :param text: O texto do contrato.
+        :param algorithm: O algoritmo de digest usado em `contract_hash`.
+        :return: O número (base 1) do contrato armazenado.
+        """
+        data = text.encode('utf-8')
+        return self._append_record(contract_hash, self.compressor.compress(data), len(data), algorithm)
+
+    def _append_record(self, contract_hash: str, blob: bytes, size: int, algorithm: str) -> int:
+        # O registro entra por último: `len` só conta contratos completos
+        self._sizes.append(size)
+        self._algorithms.append(DIGEST_ALGORITHMS[algorithm])
+        self._timestamps.append(registration_time(self._timestamps))
+        self._original_bytes += size
+        self._stored_bytes += len(blob)
+        self._records.append((contract_hash, blob))
+        return len(self._records)
+
+    def open_spool(self) -> CompressingSpool:
+        """Abre um buffer para receber um contrato em partes (upload em streaming)."""
+        return CompressingSpool(io.BytesIO(), self.compressor)
+
+    def commit_spool(self, spool: CompressingSpool, contract_hash: str,
+                     algorithm: str = DEFAULT_ALGORITHM) -> int:
+        """Armazena o conteúdo do buffer como um novo contrato."""
+        spool.finish()
+        blob = spool.target.getvalue()
+        spool.close()
+        return self._append_record(contract_hash, blob, spool.original_size, algorithm)
+
+    def discard_spool(self, spool: CompressingSpool) -> None:
+        """Descarta o buffer (ex.: contrato duplicado)."""
+        spool.close()
+
+    def hash_at(self, number: int) -> str:
+        """Retorna o hash do contrato de número `number` (base 1)."""
+        return self._records[number - 1][0]
+
+    def algorithm_at(self, number: int) -> str:
+        """Retorna o algoritmo de digest do hash do contrato de número `number`."""
+        return ALGORITHM_NAMES[self._algorithms[number - 1]]
+
+    def size_at(self, number: int) -> int:
+        """Retorna o tamanho original em bytes (UTF-8) do contrato de número `number`."""
+        return self._sizes[number - 1]
+
+    def registered_at(self, number: int) -> float:
+        """Retorna o instante do registro do contrato de número `number`."""
+        return self._timestamps[number - 1]
+
+    def read_text(self, number: int) -> str:
+        """Descomprime e retorna o texto do contrato de número `number` (base 1)."""
+        return self.compressor.decompress(self._records[number - 1][1]).decode('utf-8')
+
+    def iter_bytes(self, number: int, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+        """Descomprime o contrato de número `number` aos poucos, em blocos de até `chunk_size` bytes."""
+        blob = self._records[number - 1][1]
+        return self.compressor.iter_decompress(iter_slices(blob, chunk_size), chunk_size)
+
+    def iter_hashes(self) -> Iterator[str]:
+        """Percorre os hashes na ordem de registro."""
+        return (contract_hash for contract_hash, _ in self._records)
+
+    def stats(self) -> Dict:
+        """Tamanho dos textos antes ('original_bytes') e depois ('stored_bytes') da compressão."""
+        return {
+            'backend': 'memória',
+            'compression': self.compressor.method,
+            'original_bytes': self._original_bytes,
+            'stored_bytes': self._stored_bytes
+        }
+
+
+class ChunkingSpool:
+    """
+    Recebe um contrato em partes e o divide em blocos definidos pelo conteúdo.
+    Só os blocos ainda inexistentes no `store` são comprimidos e mantidos até
+    o `commit_spool`; o store não é alterado antes disso, então vários spools
+    podem ser preenchidos em paralelo.
+    """
+
+    def __init__(self, store: 'ChunkedContractStore'):
+        self.store = store
+        self._chunker = ContentDefinedChunker()
+        self.digests: List[bytes] = []
+        # digest -> bloco comprimido, para os blocos novos
+        self.new_chunks: Dict[bytes, bytes] = {}
+        self.original_size = 0
+
+    def write(self, data: bytes) -> None:
+        self.original_size += len(data)
+        for _, chunk in self._chunker.update(data):
+            self._add_chunk(chunk)
+
+    def finish(self) -> None:
+        """Grava os blocos restantes no fim do fluxo."""
+        for _, chunk in self._chunker.finish():
+            self._add_chunk(chunk)
+
+    def _add_chunk(self, chunk: bytes) -> None:
+        digest = bytes.fromhex(chunk_digest(chunk))
+        if digest not in self.new_chunks and not self.store.has_chunk(digest):
+            self.new_chunks[digest] = self.store.compressor.compress(chunk)
+        self.digests.append(digest)
+
+    def close(self) -> None:
+        pass
+
+
+class ChunkedContractStore(ContractStore):
+    """
+    Armazena os contratos em memória como sequências de blocos definidos pelo
+    conteúdo (ver contract_chunking). Blocos idênticos são guardados uma única
+    vez, de modo que versões quase iguais de um contrato ocupam só os blocos
+    que mudaram. Cada bloco é comprimido individualmente.
+    """
+
+    def __init__(self, compressor: Optional[TextCompressor] = None):
+        """
+        :raises ValueError: Se o compressor criptografar: cada bloco (~1 KiB)
+                            teria a sua própria chave de dados.
+        """
+        self.compressor = compressor if compressor is not None else TextCompressor('zlib')
+        if self.compressor.encryption:
+            raise ValueError("O armazenamento com deduplicação de blocos não suporta criptografia: "
+                             "use o armazenamento em memória, em disco ou em banco de dados.")
+        # digest do bloco -> (bloco comprimido, contagem de referências)
+        self._chunks: Dict[bytes, List] = {}
+        # Estrutura: list of (hash_str, digests concatenados)
+        self._records: List[Tuple[str, bytes]] = []
+        self._sizes = array('Q')
+        self._algorithms = array('B')
+        self._timestamps = array('d')
+        self._original_bytes = 0
+        self._stored_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def has_chunk(self, digest: bytes) -> bool:
+        """Indica se o bloco com o digest informado já está armazenado."""
+        return digest in self._chunks
+
+    def put_chunk(self, digest: bytes, blob: Optional[bytes]) -> bool:
+        """
+        Adiciona uma referência a um bloco, guardando-o se ainda não existir.
+        :param blob: O bloco já comprimido (pode ser None se o bloco já existe).
+        :return: True se o bloco é novo.
+        """
+        entry = self._chunks.get(digest)
+        if entry is not None:
+            entry[1] += 1
+            return False
+        self._chunks[digest] = [blob, 1]
+        self._stored_bytes += len(blob)
+        return True
+
+    def open_spool(self) -> ChunkingSpool:
+        """Abre um receptor de blocos para um contrato enviado em partes."""
+        return ChunkingSpool(self)
+
+    def commit_spool(self, spool: ChunkingSpool, contract_hash: str,
+                     algorithm: str = DEFAULT_ALGORITHM) -> int:
+        """Registra o contrato como a sequência de blocos recebida."""
+        spool.finish()
+        for digest in spool.digests:
+            self.put_chunk(digest, spool.new_chunks.get(digest))
+        # O registro entra por último: `len` só conta contratos completos
+        self._sizes.append(spool.original_size)
+        self._algorithms.append(DIGEST_ALGORITHMS[algorithm])
+        self._timestamps.append(registration_time(self._timestamps))
+        self._original_bytes += spool.original_size
+        self._records.append((contract_hash, b''.join(spool.digests)))
+        return len(self._records)
+
+    def discard_spool(self, spool: ChunkingSpool) -> None:
+        """Descarta o contrato recebido (nada foi gravado no store)."""
+        spool.new_chunks.clear()
+
+    def hash_at(self, number: int) -> str:
+        """Retorna o hash do contrato de número `number` (base 1)."""
+        return self._records[number - 1][0]
+
+    def algorithm_at(self, number: int) -> str:
+        """Retorna o algoritmo de digest do hash do contrato de número `number`."""
+        return ALGORITHM_NAMES[self._algorithms[number - 1]]
+
+    def size_at(self, number: int) -> int:
+        """Retorna o tamanho original em bytes do contrato de número `number`."""
+        return self._sizes[number - 1]
+
+    def registered_at(self, number: int) -> float:
+        """Retorna o instante do registro do contrato de número `number`."""
+        return self._timestamps[number - 1]
+
+    def read_text(self, number: int) -> str:
+        """Remonta e retorna o texto do contrato de número `number` (base 1)."""
+        digests = self._records[number - 1][1]
+        parts = [self.compressor.decompress(self._chunks[digests[i:i + DIGEST_SIZE]][0])
+                 for i in range(0, len(digests), DIGEST_SIZE)]
+        return b''.join(parts).decode('utf-8')
+
+    def iter_bytes(self, number: int, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Descomprime um bloco de conteúdo por vez (os blocos já têm tamanho
+        limitado), entregue em partes de até `chunk_size` bytes.
+        """
+        digests = self._records[number - 1][1]
+        for i in range(0, len(digests), DIGEST_SIZE):
+            data = self.compressor.decompress(self._chunks[digests[i:i + DIGEST_SIZE]][0])
+            for start in range(0, len(data), chunk_size):
+                yield data[start:start + chunk_size]
+
+    def iter_hashes(self) -> Iterator[str]:
+        """Percorre os hashes na ordem de registro."""
+        return (contract_hash for contract_hash, _ in self._records)
+
+    def stats(self) -> Dict:
+        """Tamanho dos textos antes ('original_bytes') e depois ('stored_bytes') da deduplicação e compressão."""
+        return {
+            'backend': 'memória (blocos deduplicados)',
+            'compression': self.compressor.method,
+            'original_bytes': self._original_bytes,
+            'stored_bytes': self._stored_bytes,
+            'unique_chunks': len(self._chunks)
+        }
+
+
+class DiskContractStore(ContractStore):
+    """
+    Armazenamento endereçado por conteúdo em disco.
+
+    Cada texto é gravado uma única vez em `objects/ab/cd/<hash>`, com diretórios
+    fragmentados pelo prefixo do hash. A ordem de registro fica em `index.bin`,
+    um arquivo de registros de tamanho fixo (digest de 32 bytes + tamanho), de
+    modo que o registro do contrato N está no deslocamento (N - 1) * RECORD_SIZE.
+    Em memória ficam apenas os hashes e os tamanhos; o texto é lido sob demanda.
+
+    O algoritmo de digest de cada registro fica em `algorithms.bin`, um byte
+    por contrato na mesma ordem do índice. Diretórios anteriores a esse arquivo
+    (ou registros além do seu tamanho) usam SHA-256. Da mesma forma, o instante
+    de cada registro fica em `timestamps.bin` (double de 8 bytes; 0.0 nos
+    registros anteriores a esse arquivo). O espaço que cada registro passou a
+    ocupar em `objects/` fica em `stored.bin` (inteiro de 8 bytes), para que
+    as estatísticas não precisem consultar o tamanho de cada objeto.
+
+    Os objetos são gravados comprimidos conforme `config.json` (e `zdict.bin`,
+    se houver dicionário compartilhado), fixados na criação do diretório.
+    Diretórios criados sem `config.json` guardam os textos sem compressão.
+    """
+
+    RECORD = struct.Struct('>32sQ')
+    RECORD_SIZE = RECORD.size
+    TIMESTAMP = struct.Struct('>d')
+    STORED_SIZE = struct.Struct('>Q')
+
+    def __init__(self, root: str, compressor: Optional[TextCompressor] = None):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.tmp_dir = os.path.join(root, 'tmp')
+        self.index_path = os.path.join(root, 'index.bin')
+        self.algorithms_path = os.path.join(root, 'algorithms.bin')
+        self.timestamps_path = os.path.join(root, 'timestamps.bin')
+        self.stored_sizes_path = os.path.join(root, 'stored.bin')
+        is_new = not os.path.exists(self.index_path)
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self.compressor = self._load_compressor(compressor, is_new)
+
+        self._hashes: List[str] = []
+        self._sizes = array('Q')
+        self._algorithms = array('B')
+        self._timestamps = array('d')
+        self._original_bytes = 0
+        self._stored_bytes = 0
+        self._load_index()
+
+    def _load_compressor(self, compressor: Optional[TextCompressor], is_new: bool) -> TextCompressor:
+        """
+        Lê a configuração de compressão do diretório; em um diretório novo,
+        grava a configuração informada (zlib por padrão).
+        """
+        config_path = os.path.join(self.root, 'config.json')
+        dictionary_path = os.path.join(self.root, 'zdict.bin')
+
+        compressor = compressor if compressor is not None else TextCompressor('zlib')
+        if os.path.exists(config_path):
+            with open(config_path, encoding='utf-8') as f:
+                config = json.load(f)
+            dictionary = None
+            if config.get('dictionary_id'):
+                with open(dictionary_path, 'rb') as f:
+                    dictionary = f.read()
+            return compressor.restore(config, dictionary)
+
+        if not is_new:
+            # Diretório anterior à compressão: mantém os objetos sem compressão
+            return compressor.restore({'compression': 'none'}, None)
+
+        if compressor.dictionary:
+            with open(dictionary_path, 'wb') as f:
+                f.write(compressor.dictionary)
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(compressor.settings, f)
+        return compressor
+
+    def _load_index(self) -> None:
+        """Carrega o índice compacto (hash, tamanho) a partir de `index.bin`."""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'rb') as f:
+            data = f.read()
+        # Ignora um eventual registro final incompleto (gravação interrompida)
+        usable = len(data) - len(data) % self.RECORD_SIZE
+        for digest, size in self.RECORD.iter_unpack(memoryview(data)[:usable]):
+            self._hashes.append(digest.hex())
+            self._sizes.append(size)
+
+        if os.path.exists(self.algorithms_path):
+            with open(self.algorithms_path, 'rb') as f:
+                self._algorithms.frombytes(f.read(len(self._hashes)))
+        # Registros sem algoritmo gravado são SHA-256
+        missing = len(self._hashes) - len(self._algorithms)
+        self._algorithms.extend([DIGEST_ALGORITHMS[DEFAULT_ALGORITHM]] * missing)
+
+        if os.path.exists(self.timestamps_path):
+            with open(self.timestamps_path, 'rb') as f:
+                data = f.read(len(self._hashes) * self.TIMESTAMP.size)
+            usable = len(data) - len(data) % self.TIMESTAMP.size
+            self._timestamps.extend(value for value, in self.TIMESTAMP.iter_unpack(data[:usable]))
+        self._timestamps.extend([0.0] * (len(self._hashes) - len(self._timestamps)))
+
+        self._original_bytes = sum(self._sizes)
+        self._stored_bytes = self._load_stored_bytes()
+
+    def _load_stored_bytes(self) -> int:
+        """
+        Soma o espaço ocupado pelos objetos a partir de `stored.bin`. Os registros
+        anteriores a esse arquivo são medidos no disco uma única vez e gravados nele.
+        """
+        known, total = 0, 0
+        if os.path.exists(self.stored_sizes_path):
+            with open(self.stored_sizes_path, 'rb') as f:
+                data = f.read(len(self._hashes) * self.STORED_SIZE.size)
+            known = len(data) // self.STORED_SIZE.size
+            total = sum(value for value, in self.STORED_SIZE.iter_unpack(data[:known * self.STORED_SIZE.size]))
+        if known < len(self._hashes):
+            missing = [os.path.getsize(self.object_path(h)) for h in self._hashes[known:]]
+            with open(self.stored_sizes_path, 'ab') as f:
+                f.truncate(known * self.STORED_SIZE.size)
+                f.write(b''.join(self.STORED_SIZE.pack(size) for size in missing))
+            total += sum(missing)
+        return total
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def object_path(self, contract_hash: str) -> str:
+        """Retorna o caminho do objeto em disco para o hash informado."""
+        return os.path.join(self.objects_dir, contract_hash[:2], contract_hash[2:4], contract_hash)
+
+    def _append_record(self, contract_hash: str, size: int, stored_size: int, algorithm: str) -> int:
+        algorithm_id = DIGEST_ALGORITHMS[algorithm]
+        # O algoritmo é gravado antes do índice. O truncate descarta um byte
+        # órfão de uma gravação interrompida e, em diretórios antigos, completa
+        # o arquivo com zeros (o identificador do SHA-256)
+        with open(self.algorithms_path, 'ab') as f:
+            f.truncate(len(self._hashes))
+            f.write(bytes([algorithm_id]))
+        timestamp = registration_time(self._timestamps)
+        with open(self.timestamps_path, 'ab') as f:
+            f.truncate(len(self._hashes) * self.TIMESTAMP.size)
+            f.write(self.TIMESTAMP.pack(timestamp))
+        with open(self.stored_sizes_path, 'ab') as f:
+            f.truncate(len(self._hashes) * self.STORED_SIZE.size)
+            f.write(self.STORED_SIZE.pack(stored_size))
+        # Um registro final incompleto (ignorado na carga) desalinharia todos os seguintes
+        with open(self.index_path, 'ab') as f:
+            f.truncate(len(self._hashes) * self.RECORD_SIZE)
+            f.write(self.RECORD.pack(bytes.fromhex(contract_hash), size))
+        self._sizes.append(size)
+        self._algorithms.append(algorithm_id)
+        self._timestamps.append(timestamp)
+        self._hashes.append(contract_hash)
+        self._original_bytes += size
+        self._stored_bytes += stored_size
+        return len(self._hashes)
+
+    def open_spool(self) -> CompressingSpool:
+        """
+        Abre um arquivo temporário para receber um contrato em partes, sem
+        manter o texto inteiro em memória.
+        """
+        target = tempfile.NamedTemporaryFile(dir=self.tmp_dir, delete=False)
+        return CompressingSpool(target, self.compressor)
+
+    def commit_spool(self, spool: CompressingSpool, contract_hash: str,
+                     algorithm: str = DEFAULT_ALGORITHM) -> int:
+        """Move o arquivo temporário para o seu endereço definitivo e o registra."""
+        spool.finish()
+        spool.close()
+        # Grava em arquivo temporário e renomeia: o objeto nunca fica parcial
+        path = self.object_path(contract_hash)
+        if os.path.exists(path):
+            # Objeto órfão de uma gravação interrompida: passa a ser deste registro
+            stored_size = os.path.getsize(path)
+            os.remove(spool.name)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(spool.name, path)
+            stored_size = spool.stored_size
+        return self._append_record(contract_hash, spool.original_size, stored_size, algorithm)
+
+    def discard_spool(self, spool: CompressingSpool) -> None:
+        """Descarta o arquivo temporário (ex.: contrato duplicado)."""
+        spool.close()
+        os.remove(spool.name)
+
+    def hash_at(self, number: int) -> str:
+        """Retorna o hash do contrato de número `number` (base 1)."""
+        return self._hashes[number - 1]
+
+    def algorithm_at(self, number: int) -> str:
+        """Retorna o algoritmo de digest do hash do contrato de número `number`."""
+        return ALGORITHM_NAMES[self._algorithms[number - 1]]
+
+    def size_at(self, number: int) -> int:
+        """Retorna o tamanho original em bytes do contrato de número `number`."""
+        return self._sizes[number - 1]
+
+    def registered_at(self, number: int) -> float:
+        """Retorna o instante do registro do contrato de número `number`."""
+        return self._timestamps[number - 1]
+
+    def read_text(self, number: int) -> str:
+        """Lê do disco e descomprime o texto do contrato de número `number` (base 1)."""
+        with open(self.object_path(self._hashes[number - 1]), 'rb') as f:
+            return self.compressor.decompress(f.read()).decode('utf-8')
+
+    def iter_bytes(self, number: int, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+        """Lê e descomprime o objeto do contrato de número `number` em blocos de até `chunk_size` bytes."""
+        with open(self.object_path(self._hashes[number - 1]), 'rb') as f:
+            yield from self.compressor.iter_decompress(iter(lambda: f.read(chunk_size), b''), chunk_size)
+
+    def iter_hashes(self) -> Iterator[str]:
+        """Percorre os hashes na ordem de registro."""
+        return iter(self._hashes)
+
+    def stats(self) -> Dict:
+        """Tamanho dos textos antes ('original_bytes') e depois ('stored_bytes') da compressão."""
+        return {
+            'backend': 'disco',
+            'compression': self.compressor.method,
+            'original_bytes': self._original_bytes,
+            'stored_bytes': self._stored_bytes
+        }
+
+
+def open_contract_store(storage_dir: Optional[str] = None, compressor: Optional[TextCompressor] = None,
+                        chunked: bool = False, url: Optional[str] = None) -> ContractStore:
+    """
+    Cria o armazenamento adequado: em banco de dados se `url` for informada
+    ('sqlite:///caminho.db' ou 'mongodb://...'), em disco se `storage_dir` for
+    informado, caso contrário em memória (com deduplicação de blocos se `chunked`).
+    """
+    if url:
+        # Importado só aqui: contract_db_store depende deste módulo
+        from contract_db_store import open_database_store
+        return open_database_store(url, compressor)
+    if storage_dir:
+        return DiskContractStore(storage_dir, compressor)
+    if chunked:
+        return ChunkedContractStore(compressor)
+    return MemoryContractStore(compressor)
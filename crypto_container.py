@@ -0,0 +1,379 @@
+"""
+Formato binário (contêiner versionado) dos arquivos criptografados no modo
+híbrido, lido e gravado em segmentos.
+
+Cabeçalho:
+    magic 'EDBK' | versão (1 byte) | id da cifra (1 byte)
+    | tamanho do segmento (4 bytes) | quantidade de destinatários (2 bytes)
+    | para cada destinatário (slot): impressão digital da chave (32 bytes)
+      + tamanho da chave cifrada (2 bytes) + chave simétrica cifrada
+    | prefixo do nonce (7 bytes)
+Segmentos:
+    tamanho (4 bytes) + segmento cifrado com a cifra simétrica (AEAD)
+
+O conteúdo é cifrado uma única vez; só a chave simétrica é cifrada para cada
+destinatário. A impressão digital é o SHA-256 da chave pública (DER): cada
+destinatário encontra o seu slot sem tentar os demais, e uma chave privada
+errada é detectada antes de qualquer operação RSA.
+
+O nonce de cada segmento é prefixo + contador (4 bytes) + 1 byte que marca o
+último segmento, e o cabeçalho inteiro entra como dado associado: segmentos
+trocados de ordem, removidos ou truncados no fim falham na autenticação.
+
+Para copiar e colar, o contêiner pode ser gravado em ASCII armor (base64 em
+linhas de 64 colunas entre as linhas BEGIN/END).
+"""
+import base64
+import hashlib
+import io
+import struct
+from typing import Iterator, NamedTuple, Sequence, Tuple
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+
+# Cifras simétricas do modo híbrido (chaves de 256 bits, nonce de 96 bits)
+SYMMETRIC_CIPHERS = {
+    'aes-gcm': AESGCM,
+    'chacha20-poly1305': ChaCha20Poly1305,
+}
+CIPHER_IDS = {'aes-gcm': 1, 'chacha20-poly1305': 2}
+CIPHER_NAMES = {cipher_id: name for name, cipher_id in CIPHER_IDS.items()}
+DEFAULT_CIPHER = 'aes-gcm'
+SYMMETRIC_KEY_SIZE = 32
+NONCE_SIZE = 12
+TAG_SIZE = 16
+
+MAGIC = b'EDBK'
+VERSION = 1
+PREFIX = struct.Struct('>4sB')
+# Campos após magic/versão: cifra, tamanho do segmento e quantidade de destinatários
+HEADER_FIELDS = struct.Struct('>BIH')
+# Slot de destinatário: impressão digital + tamanho da chave cifrada
+SLOT = struct.Struct('>32sH')
+SEGMENT_LENGTH = struct.Struct('>I')
+NONCE_PREFIX_SIZE = 7
+SEGMENT_SIZE = 64 * 1024
+# Maior segmento aceito: o tamanho vem do arquivo (ainda não autenticado) e define o buffer de leitura
+MAX_SEGMENT_SIZE = 4 * 1024 * 1024
+FINGERPRINT_SIZE = 32
+
+ARMOR_BEGIN = b'-----BEGIN EDUCABLOCK ENCRYPTED FILE-----'
+ARMOR_END = b'-----END EDUCABLOCK ENCRYPTED FILE-----'
+# 48 bytes viram exatamente uma linha de 64 caracteres em base64
+ARMOR_LINE_BYTES = 48
+
+
+# Slot de destinatário: (impressão digital da chave pública, chave cifrada)
+KeySlot = Tuple[bytes, bytes]
+
+
+class ContainerHeader(NamedTuple):
+    """Cabeçalho de um contêiner; `raw` são os bytes usados como dado associado."""
+    version: int
+    cipher: str
+    segment_size: int
+    slots: Tuple[KeySlot, ...]
+    nonce_prefix: bytes
+    raw: bytes
+
+    def wrapped_key_for(self, fingerprint: bytes) -> bytes:
+        """
+        Chave cifrada do slot da chave com a impressão digital informada.
+        :raises ValueError: Se a chave não for destinatária do arquivo.
+        """
+        for slot_fingerprint, wrapped_key in self.slots:
+            if slot_fingerprint == fingerprint:
+                return wrapped_key
+        raise ValueError("O arquivo foi criptografado para outra chave pública.")
+
+
+def key_fingerprint(public_key) -> bytes:
+    """SHA-256 (32 bytes) da chave pública em DER (SubjectPublicKeyInfo)."""
+    der = public_key.public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return hashlib.sha256(der).digest()
+
+
+def new_symmetric_cipher(cipher: str, key: bytes):
+    """
+    Cria o objeto AEAD da cifra simétrica informada.
+    :raises ValueError: Se a cifra não for suportada.
+    """
+    if cipher not in SYMMETRIC_CIPHERS:
+        raise ValueError(f"Cifra simétrica não suportada: {cipher}")
+    return SYMMETRIC_CIPHERS[cipher](key)
+
+
+def segment_nonce(prefix: bytes, counter: int, last: bool) -> bytes:
+    """Nonce do segmento `counter`."""
+    return prefix + struct.pack('>IB', counter, 1 if last else 0)
+
+
+def pack_header(cipher: str, slots: Sequence[KeySlot], segment_size: int,
+                nonce_prefix: bytes) -> ContainerHeader:
+    """
+    Monta o cabeçalho de um novo contêiner (versão atual).
+    :param slots: (impressão digital, chave cifrada) de cada destinatário.
+    """
+    if cipher not in CIPHER_IDS:
+        raise ValueError(f"Cifra simétrica não suportada: {cipher}")
+    if not 1 <= len(slots) <= 0xFFFF:
+        raise ValueError("Informe de 1 a 65535 destinatários.")
+    if not 1 <= segment_size <= MAX_SEGMENT_SIZE:
+        raise ValueError(f"O tamanho do segmento deve estar entre 1 e {MAX_SEGMENT_SIZE} bytes.")
+    parts = [PREFIX.pack(MAGIC, VERSION), HEADER_FIELDS.pack(CIPHER_IDS[cipher], segment_size, len(slots))]
+    for fingerprint, wrapped_key in slots:
+        parts.append(SLOT.pack(fingerprint, len(wrapped_key)))
+        parts.append(wrapped_key)
+    parts.append(nonce_prefix)
+    return ContainerHeader(VERSION, cipher, segment_size, tuple(slots), nonce_prefix, b''.join(parts))
+
+
+def _unpack_fields(data) -> Tuple[str, int, int]:
+    """
+    Campos fixos do cabeçalho.
+    :return: (cifra, tamanho do segmento, quantidade de slots)
+    """
+    cipher_id, segment_size, slot_count = HEADER_FIELDS.unpack(data)
+    if cipher_id not in CIPHER_NAMES:
+        raise ValueError(f"Cifra desconhecida no arquivo criptografado: {cipher_id}")
+    if not 1 <= segment_size <= MAX_SEGMENT_SIZE:
+        raise ValueError(f"Tamanho de segmento inválido no arquivo criptografado: {segment_size}")
+    return CIPHER_NAMES[cipher_id], segment_size, slot_count
+
+
+def _check_prefix(data) -> None:
+    magic, version = PREFIX.unpack(data)
+    if magic != MAGIC:
+        raise ValueError("O arquivo não é um contêiner criptografado.")
+    if version != VERSION:
+        raise ValueError(f"Versão desconhecida do arquivo criptografado: {version}")
+
+
+def read_header(source) -> ContainerHeader:
+    """Lê o cabeçalho do início de um arquivo (método `read`)."""
+    parts = [read_exactly(source, PREFIX.size)]
+    _check_prefix(parts[0])
+    parts.append(read_exactly(source, HEADER_FIELDS.size))
+    cipher, segment_size, slot_count = _unpack_fields(parts[-1])
+    slots = []
+    for _ in range(slot_count):
+        parts.append(read_exactly(source, SLOT.size))
+        fingerprint, wrapped_length = SLOT.unpack(parts[-1])
+        parts.append(read_exactly(source, wrapped_length))
+        slots.append((fingerprint, parts[-1]))
+    parts.append(read_exactly(source, NONCE_PREFIX_SIZE))
+    return ContainerHeader(VERSION, cipher, segment_size, tuple(slots), parts[-1], b''.join(parts))
+
+
+def parse_header(view: memoryview) -> Tuple[ContainerHeader, int]:
+    """
+    Lê o cabeçalho de um contêiner em memória.
+    :return: O cabeçalho e o deslocamento do primeiro segmento.
+    """
+    def take(size):
+        nonlocal offset
+        if offset + size > len(view):
+            raise ValueError("Arquivo criptografado truncado.")
+        offset += size
+        return view[offset - size:offset]
+
+    offset = 0
+    _check_prefix(take(PREFIX.size))
+    cipher, segment_size, slot_count = _unpack_fields(take(HEADER_FIELDS.size))
+    slots = []
+    for _ in range(slot_count):
+        fingerprint, wrapped_length = SLOT.unpack(take(SLOT.size))
+        slots.append((fingerprint, bytes(take(wrapped_length))))
+    nonce_prefix = bytes(take(NONCE_PREFIX_SIZE))
+    return ContainerHeader(VERSION, cipher, segment_size, tuple(slots), nonce_prefix, bytes(view[:offset])), offset
+
+
+def read_exactly(source, size: int) -> bytes:
+    """
+    Lê exatamente `size` bytes de `source`.
+    :raises ValueError: Se o arquivo terminar antes.
+    """
+    data = source.read(size)
+    while len(data) < size:
+        more = source.read(size - len(data))
+        if not more:
+            raise ValueError("Arquivo criptografado truncado.")
+        data += more
+    return data
+
+
+def _readinto_exactly(source, view: memoryview) -> int:
+    """Preenche `view` a partir de `source`; retorna quantos bytes foram lidos (menos só no fim do arquivo)."""
+    filled = 0
+    while filled < len(view):
+        count = source.readinto(view[filled:])
+        if not count:
+            break
+        filled += count
+    return filled
+
+
+def write_segments(source, target, aead, header: ContainerHeader) -> int:
+    """
+    Grava o cabeçalho e os segmentos cifrados do conteúdo lido de `source`.
+    :return: Quantidade de bytes de conteúdo.
+    """
+    target.write(header.raw)
+    segment_size = header.segment_size
+    total = 0
+    counter = 0
+    # Lê um segmento à frente para saber qual é o último
+    segment = source.read(segment_size)
+    while True:
+        following = source.read(segment_size) if len(segment) == segment_size else b''
+        last = not following
+        encrypted = aead.encrypt(segment_nonce(header.nonce_prefix, counter, last), segment, header.raw)
+        target.write(SEGMENT_LENGTH.pack(len(encrypted)))
+        target.write(encrypted)
+        total += len(segment)
+        if last:
+            return total
+        segment = following
+        counter += 1
+
+
+def read_segments(source, aead, header: ContainerHeader) -> Iterator[bytes]:
+    """
+    Lê e autentica os segmentos de `source` (posicionado após o cabeçalho), um
+    por vez, reaproveitando o mesmo buffer de leitura.
+    :raises ValueError: Se o arquivo estiver truncado ou malformado.
+    :raises cryptography.exceptions.InvalidTag: Se algum segmento foi alterado.
+    """
+    # Espaço para o tamanho, o maior segmento possível e o tamanho do seguinte
+    buffer = memoryview(bytearray(header.segment_size + TAG_SIZE + 2 * SEGMENT_LENGTH.size))
+    length_view = buffer[:SEGMENT_LENGTH.size]
+    if _readinto_exactly(source, length_view) < SEGMENT_LENGTH.size:
+        raise ValueError("Arquivo criptografado truncado.")
+    counter = 0
+    while True:
+        (length,) = SEGMENT_LENGTH.unpack(length_view)
+        if length > header.segment_size + TAG_SIZE:
+            raise ValueError("Segmento maior que o tamanho declarado no cabeçalho.")
+        # O segmento e o tamanho do seguinte são lidos de uma vez
+        segment_view = buffer[SEGMENT_LENGTH.size:SEGMENT_LENGTH.size + length]
+        filled = _readinto_exactly(source, buffer[SEGMENT_LENGTH.size:SEGMENT_LENGTH.size * 2 + length])
+        if filled < length:
+            raise ValueError("Arquivo criptografado truncado.")
+        # O segmento é o último se o arquivo termina logo depois dele
+        last = filled == length
+        if not last and filled < length + SEGMENT_LENGTH.size:
+            raise ValueError("Arquivo criptografado truncado.")
+        yield aead.decrypt(segment_nonce(header.nonce_prefix, counter, last), segment_view, header.raw)
+        if last:
+            return
+        length_view[:] = buffer[SEGMENT_LENGTH.size + length:SEGMENT_LENGTH.size * 2 + length]
+        counter += 1
+
+
+def parse_segments(view: memoryview, offset: int, aead, header: ContainerHeader) -> Iterator[bytes]:
+    """Autentica os segmentos de um contêiner em memória, fatiando `view` sem copiá-lo."""
+    counter = 0
+    end = len(view)
+    while True:
+        if offset + SEGMENT_LENGTH.size > end:
+            raise ValueError("Arquivo criptografado truncado.")
+        (length,) = SEGMENT_LENGTH.unpack_from(view, offset)
+        offset += SEGMENT_LENGTH.size
+        if length > header.segment_size + TAG_SIZE or offset + length > end:
+            raise ValueError("Arquivo criptografado truncado ou malformado.")
+        last = offset + length == end
+        yield aead.decrypt(segment_nonce(header.nonce_prefix, counter, last),
+                           view[offset:offset + length], header.raw)
+        if last:
+            return
+        offset += length
+        counter += 1
+
+
+class ArmorWriter:
+    """Grava os bytes recebidos em ASCII armor; `close` grava o fim e não fecha `target`."""
+
+    def __init__(self, target):
+        self.target = target
+        self._pending = b''
+        target.write(ARMOR_BEGIN + b'\n')
+
+    def write(self, data: bytes) -> None:
+        data = self._pending + bytes(data)
+        complete = len(data) - len(data) % ARMOR_LINE_BYTES
+        for start in range(0, complete, ARMOR_LINE_BYTES):
+            self.target.write(base64.b64encode(data[start:start + ARMOR_LINE_BYTES]) + b'\n')
+        self._pending = data[complete:]
+
+    def close(self) -> None:
+        if self._pending:
+            self.target.write(base64.b64encode(self._pending) + b'\n')
+        self.target.write(ARMOR_END + b'\n')
+
+
+class ArmorReader(io.RawIOBase):
+    """Lê o contêiner binário de dentro de um ASCII armor, linha a linha."""
+
+    def __init__(self, source):
+        self.source = source
+        self._buffer = b''
+        self._done = False
+        line = source.readline().strip()
+        if line != ARMOR_BEGIN:
+            raise ValueError("Início do ASCII armor não encontrado.")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, view) -> int:
+        while len(self._buffer) < len(view) and not self._done:
+            line = self.source.readline()
+            if not line:
+                raise ValueError("Fim do ASCII armor não encontrado.")
+            line = line.strip()
+            if line == ARMOR_END:
+                self._done = True
+            elif line:
+                self._buffer += base64.b64decode(line)
+        count = min(len(view), len(self._buffer))
+        view[:count] = self._buffer[:count]
+        self._buffer = self._buffer[count:]
+        return count
+
+
+class PrefixedReader(io.RawIOBase):
+    """Devolve `prefix` (bytes já lidos para detectar o formato) e depois o resto de `source`."""
+
+    def __init__(self, prefix: bytes, source):
+        self._prefix = prefix
+        self.source = source
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, view) -> int:
+        if self._prefix:
+            count = min(len(view), len(self._prefix))
+            view[:count] = self._prefix[:count]
+            self._prefix = self._prefix[count:]
+            return count
+        data = self.source.read(len(view))
+        view[:len(data)] = data
+        return len(data)
+
+    def readline(self, size: int = -1) -> bytes:
+        if self._prefix:
+            return super().readline(size)
+        return self.source.readline(size)
+
+
+def dearmor(data: bytes) -> bytes:
+    """Decodifica um contêiner em ASCII armor mantido em memória."""
+    lines = data.strip().splitlines()
+    if not lines or lines[0].strip() != ARMOR_BEGIN or lines[-1].strip() != ARMOR_END:
+        raise ValueError("ASCII armor malformado.")
+    return base64.b64decode(b''.join(line.strip() for line in lines[1:-1]))
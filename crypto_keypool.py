@@ -0,0 +1,89 @@
+"""
+Pares de chaves gerados antecipadamente, em segundo plano.
+
+Gerar uma chave RSA leva de dezenas de milissegundos (2048 bits) a alguns
+segundos (4096 bits), com grande variação. O `KeyPool` mantém alguns pares
+prontos de um tipo de chave e os repõe em uma thread de fundo (a geração no
+OpenSSL libera o GIL), de modo que pedir um par não espera a geração.
+O `KeySupply` reúne um pool por tipo de chave, criados sob demanda.
+"""
+import threading
+from collections import deque
+from typing import Dict, Iterable, Tuple
+
+from crypto_utils import DEFAULT_KEY_TYPE, KEY_TYPES, RSACrypto
+
+# Pares mantidos prontos em cada pool
+DEFAULT_POOL_SIZE = 4
+
+# (chave privada PEM, chave pública PEM)
+KeyPair = Tuple[str, str]
+
+
+class KeyPool:
+    """
+    Pares de chaves de um tipo, gerados antes de serem pedidos. Se o pool
+    estiver vazio, `get` gera o par na hora (como `RSACrypto.generate_keys`).
+    """
+
+    def __init__(self, key_type: str = DEFAULT_KEY_TYPE, size: int = DEFAULT_POOL_SIZE):
+        if key_type not in KEY_TYPES:
+            raise ValueError(f"Tipo de chave não suportado: {key_type}")
+        self.key_type = key_type
+        self.size = size
+        self._pairs: deque = deque()
+        self._condition = threading.Condition()
+        self._worker = None
+
+    @property
+    def available(self) -> int:
+        """Quantidade de pares prontos."""
+        return len(self._pairs)
+
+    def start(self) -> None:
+        """Inicia (se necessário) a thread que mantém o pool cheio."""
+        with self._condition:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._refill, name=f"keypool-{self.key_type}",
+                                                daemon=True)
+                self._worker.start()
+            self._condition.notify()
+
+    def get(self) -> KeyPair:
+        """Retira um par pronto (ou gera um, se não houver) e pede a reposição."""
+        with self._condition:
+            pair = self._pairs.popleft() if self._pairs else None
+        self.start()
+        return pair if pair is not None else RSACrypto.generate_keys(self.key_type)
+
+    def _refill(self) -> None:
+        while True:
+            with self._condition:
+                while len(self._pairs) >= self.size:
+                    self._condition.wait()
+            # Gerado fora da trava: `get` não espera a geração em andamento
+            pair = RSACrypto.generate_keys(self.key_type)
+            with self._condition:
+                self._pairs.append(pair)
+
+
+class KeySupply:
+    """Um KeyPool por tipo de chave, criado no primeiro pedido daquele tipo."""
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, prefill: Iterable[str] = (DEFAULT_KEY_TYPE,)):
+        self.size = size
+        self._pools: Dict[str, KeyPool] = {}
+        self._lock = threading.Lock()
+        for key_type in prefill:
+            self.pool(key_type).start()
+
+    def pool(self, key_type: str) -> KeyPool:
+        with self._lock:
+            pool = self._pools.get(key_type)
+            if pool is None:
+                pool = self._pools[key_type] = KeyPool(key_type, self.size)
+            return pool
+
+    def get(self, key_type: str = DEFAULT_KEY_TYPE) -> KeyPair:
+        """Par de chaves do tipo informado (ver `KeyPool.get`)."""
+        return self.pool(key_type).get()
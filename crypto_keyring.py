@@ -0,0 +1,114 @@
+"""
+Cache das chaves RSA já carregadas, compartilhado pelo processo.
+
+Carregar uma chave a partir do PEM (principalmente a privada, que passa por
+validações da chave) custa mais que criptografar um arquivo pequeno no modo
+híbrido. O `KeyRing` guarda as chaves carregadas em um LRU limitado, indexado
+pelo SHA-256 do PEM, de modo que reexecuções da página e operações em lote com
+a mesma chave a carregam uma única vez.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+
+from crypto_container import key_fingerprint
+
+# Quantidade de chaves mantidas (públicas e privadas)
+DEFAULT_KEYRING_SIZE = 32
+
+PEM_BLOCK = re.compile(r'-----BEGIN ([A-Z0-9 ]+)-----.*?-----END \1-----', re.DOTALL)
+
+
+class KeyEntry(NamedTuple):
+    """Chave carregada e a impressão digital da chave pública correspondente (ver crypto_container)."""
+    key: object
+    fingerprint: bytes
+
+
+def normalize_pem(pem: str) -> str:
+    """PEM sem espaços nas pontas das linhas nem '\\r' (chaves coladas na página)."""
+    return '\n'.join(line.strip() for line in pem.strip().splitlines())
+
+
+def split_pem(text: str) -> List[str]:
+    """Blocos PEM contidos em um texto (ex.: várias chaves públicas coladas juntas)."""
+    return [match.group(0) for match in PEM_BLOCK.finditer(text)]
+
+
+def pem_fingerprint(pem: str) -> str:
+    """SHA-256 (hex) do PEM normalizado: a chave do cache."""
+    return hashlib.sha256(normalize_pem(pem).encode('utf-8')).hexdigest()
+
+
+class KeyRing:
+    """
+    LRU limitado de chaves carregadas, seguro para várias threads. O PEM é
+    carregado fora da trava; duas threads pedindo a mesma chave nova podem
+    carregá-la ambas, e a segunda apenas substitui a primeira.
+    """
+
+    def __init__(self, max_keys: int = DEFAULT_KEYRING_SIZE):
+        self.max_keys = max_keys
+        self._entries: 'OrderedDict[tuple, KeyEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def public_key(self, pem: str) -> KeyEntry:
+        """
+        Chave pública carregada do PEM (formato SubjectPublicKeyInfo).
+        :raises ValueError: Se o PEM for inválido.
+        """
+        return self._get('public', pem, self._load_public)
+
+    def private_key(self, pem: str) -> KeyEntry:
+        """
+        Chave privada carregada do PEM (sem senha).
+        :raises ValueError: Se o PEM for inválido.
+        """
+        return self._get('private', pem, self._load_private)
+
+    def clear(self) -> None:
+        """Descarta todas as chaves (ex.: ao trocar de chaves)."""
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, kind: str, pem: str, loader) -> KeyEntry:
+        cache_key = (kind, pem_fingerprint(pem))
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = loader(normalize_pem(pem).encode('utf-8'))
+        with self._lock:
+            self._entries[cache_key] = entry
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        return entry
+
+    @staticmethod
+    def _load_public(pem: bytes) -> KeyEntry:
+        key = serialization.load_pem_public_key(pem, backend=default_backend())
+        return KeyEntry(key, key_fingerprint(key))
+
+    @staticmethod
+    def _load_private(pem: bytes) -> KeyEntry:
+        key = serialization.load_pem_private_key(pem, password=None, backend=default_backend())
+        return KeyEntry(key, key_fingerprint(key.public_key()))
+
+
+# Cache usado por RSACrypto: dura enquanto o processo (servidor) estiver ativo
+DEFAULT_KEYRING = KeyRing()
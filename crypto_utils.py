@@ -1,29 +1,258 @@
 # crypto_utils.py
 """
 Módulo com funções de criptografia RSA
+
+Formatos de arquivo criptografado:
+
+- Contêiner híbrido (padrão): o conteúdo é cifrado uma única vez com uma chave
+  simétrica aleatória (AES-256-GCM ou ChaCha20-Poly1305), em segmentos
+  autenticados, e só essa chave é cifrada com RSA-OAEP. É binário (ver
+  crypto_container), opcionalmente em ASCII armor para copiar e colar.
+- Legado: o conteúdo é dividido em blocos de 190 bytes (em chaves de 2048
+  bits), cada um cifrado com RSA-OAEP e gravado em base64, um por linha.
+  Continua sendo descriptografado.
+
+`decrypt_file`/`decrypt_stream` detectam o formato pelos primeiros bytes. Para
+arquivos grandes, `encrypt_stream`/`decrypt_stream` trabalham de arquivo para
+arquivo, um segmento por vez, com memória constante.
 """
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
+from cryptography.hazmat.primitives.asymmetric import rsa, padding, x25519, ed25519
 from cryptography.hazmat.primitives import serialization, hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.backends import default_backend
 import base64
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from crypto_container import (
+    ARMOR_BEGIN, DEFAULT_CIPHER, MAGIC, NONCE_PREFIX_SIZE, NONCE_SIZE, SEGMENT_SIZE, SYMMETRIC_KEY_SIZE,
+    ArmorReader, ArmorWriter, PrefixedReader, dearmor, new_symmetric_cipher, pack_header,
+    parse_header, parse_segments, read_header, read_segments, write_segments
+)
+from crypto_keyring import DEFAULT_KEYRING
+
+# Tipos de par de chaves. X25519 só criptografa (modo híbrido); Ed25519 só
+# assina. As chaves RSA servem para ambos.
+RSA_KEY_SIZES = {'rsa-2048': 2048, 'rsa-3072': 3072, 'rsa-4096': 4096}
+KEY_TYPES = tuple(RSA_KEY_SIZES) + ('x25519', 'ed25519')
+DEFAULT_KEY_TYPE = 'rsa-2048'
+
+# Chave simétrica cifrada para uma chave X25519: chave pública efêmera + a
+# chave cifrada com AES-GCM sob uma chave derivada do segredo compartilhado
+X25519_WRAP_INFO = b'educablock x25519 key wrap'
+X25519_WRAP_NONCE = bytes(NONCE_SIZE)
+
+# Linhas do formato legado por tarefa enviada a um processo worker
+LEGACY_BATCH_LINES = 256
+
+# Bytes lidos do início de um arquivo para detectar o formato
+DETECT_SIZE = len(ARMOR_BEGIN)
+
+
+# Padding OAEP com SHA-256 usado em todas as operações RSA do módulo (imutável,
+# criado uma vez e reaproveitado)
+OAEP_PADDING = padding.OAEP(
+    mgf=padding.MGF1(algorithm=hashes.SHA256()),
+    algorithm=hashes.SHA256(),
+    label=None
+)
+
+
+def load_public_key(public_key_pem):
+    """Chave pública do PEM e sua impressão digital (KeyEntry), carregadas uma vez e mantidas no DEFAULT_KEYRING."""
+    return DEFAULT_KEYRING.public_key(public_key_pem)
+
+
+def load_private_key(private_key_pem):
+    """Chave privada do PEM (sem senha) e a impressão digital da pública (KeyEntry), mantidas no DEFAULT_KEYRING."""
+    return DEFAULT_KEYRING.private_key(private_key_pem)
+
+
+def legacy_chunk_size(public_key):
+    """
+    Maior bloco de conteúdo cifrável com RSA-OAEP/SHA-256 na chave informada
+    (190 bytes em 2048 bits, 318 em 3072, 446 em 4096).
+
+    Raises:
+        ValueError: Se a chave não for RSA
+    """
+    if not isinstance(public_key, rsa.RSAPublicKey):
+        raise ValueError("O formato legado exige uma chave RSA.")
+    return public_key.key_size // 8 - 2 * hashes.SHA256.digest_size - 2
+
+
+def _x25519_wrapping_key(shared_secret, ephemeral_public, recipient_public):
+    return HKDF(algorithm=hashes.SHA256(), length=SYMMETRIC_KEY_SIZE, salt=None,
+                info=X25519_WRAP_INFO + ephemeral_public + recipient_public).derive(shared_secret)
+
+
+def _raw_public(public_key):
+    return public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+
+
+def wrap_key(public_key, key):
+    """
+    Cifra a chave simétrica para o destinatário: RSA-OAEP ou, em chaves
+    X25519, troca de chaves com um par efêmero (ECIES)
+
+    Raises:
+        ValueError: Se a chave não servir para criptografia (ex.: Ed25519)
+    """
+    if isinstance(public_key, rsa.RSAPublicKey):
+        return public_key.encrypt(key, OAEP_PADDING)
+    if isinstance(public_key, x25519.X25519PublicKey):
+        ephemeral = x25519.X25519PrivateKey.generate()
+        ephemeral_public = _raw_public(ephemeral.public_key())
+        wrapping_key = _x25519_wrapping_key(ephemeral.exchange(public_key), ephemeral_public,
+                                            _raw_public(public_key))
+        # A chave de cifragem é nova a cada arquivo, então o nonce fixo é seguro
+        return ephemeral_public + AESGCM(wrapping_key).encrypt(X25519_WRAP_NONCE, key, None)
+    raise ValueError("Esta chave não pode ser usada para criptografia (use RSA ou X25519).")
+
+
+def unwrap_key(private_key, wrapped_key):
+    """Recupera a chave simétrica cifrada por `wrap_key`."""
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        return private_key.decrypt(wrapped_key, OAEP_PADDING)
+    if isinstance(private_key, x25519.X25519PrivateKey):
+        ephemeral_public = bytes(wrapped_key[:32])
+        shared_secret = private_key.exchange(x25519.X25519PublicKey.from_public_bytes(ephemeral_public))
+        wrapping_key = _x25519_wrapping_key(shared_secret, ephemeral_public, _raw_public(private_key.public_key()))
+        return AESGCM(wrapping_key).decrypt(X25519_WRAP_NONCE, bytes(wrapped_key[32:]), None)
+    raise ValueError("Esta chave não pode ser usada para criptografia (use RSA ou X25519).")
+
+
+def recipient_slots(public_key_pems, key):
+    """
+    Slots do contêiner: a chave simétrica cifrada para cada destinatário.
+    Chaves repetidas (mesma impressão digital) geram um único slot.
+    
+    Args:
+        public_key_pems (str | list[str]): Chave(s) pública(s) em formato PEM
+        key (bytes): A chave simétrica do arquivo
+    
+    Returns:
+        list: (impressão digital, chave cifrada) de cada destinatário
+    """
+    if isinstance(public_key_pems, str):
+        public_key_pems = [public_key_pems]
+    slots = {}
+    for pem in public_key_pems:
+        entry = load_public_key(pem)
+        if entry.fingerprint not in slots:
+            slots[entry.fingerprint] = wrap_key(entry.key, key)
+    if not slots:
+        raise ValueError("Informe ao menos uma chave pública.")
+    return list(slots.items())
+
+
+def unwrap_file_key(header, private_entry):
+    """
+    Recupera a chave simétrica do contêiner a partir do slot da chave privada.
+
+    Raises:
+        ValueError: Se a chave não for destinatária do arquivo
+    """
+    return unwrap_key(private_entry.key, header.wrapped_key_for(private_entry.fingerprint))
+
+
+# Chave privada carregada uma vez em cada processo worker
+_worker_private_key = None
+
+
+def _init_legacy_worker(private_key_pem):
+    global _worker_private_key
+    _worker_private_key = load_private_key(private_key_pem).key
+
+
+def _decrypt_legacy_batch(lines, private_key=None):
+    """
+    Descriptografa um lote de linhas do formato legado: nos processos worker,
+    com a chave carregada pelo initializer; no próprio processo, com `private_key`
+    """
+    private_key = _worker_private_key if private_key is None else private_key
+    return b''.join(private_key.decrypt(base64.b64decode(line), OAEP_PADDING) for line in lines)
+
+
+def _legacy_batches(lines, batch_lines):
+    """Agrupa as linhas não vazias em listas de até `batch_lines`."""
+    batch = []
+    for line in lines:
+        line = line.strip()
+        if line:
+            batch.append(line)
+            if len(batch) == batch_lines:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def decrypt_legacy_lines(lines, private_key_pem, workers=1, batch_lines=LEGACY_BATCH_LINES):
+    """
+    Descriptografa as linhas do formato legado (cada uma é um bloco RSA-OAEP
+    independente), opcionalmente em um pool de processos
+    
+    Args:
+        lines: Iterável de linhas em base64 (str ou bytes)
+        private_key_pem (str): Chave privada em formato PEM
+        workers (int | None): Número de processos (None = número de CPUs). 1 = sem pool
+        batch_lines (int): Linhas por tarefa enviada a um processo
+    
+    Returns:
+        Iterator[bytes]: Conteúdo descriptografado de cada lote, na ordem original
+    """
+    batches = _legacy_batches(lines, batch_lines)
+    if workers == 1:
+        # No próprio processo a chave é passada direto: várias sessões podem descriptografar ao mesmo tempo
+        private_key = load_private_key(private_key_pem).key
+        for batch in batches:
+            yield _decrypt_legacy_batch(batch, private_key)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_legacy_worker,
+                             initargs=(private_key_pem,)) as executor:
+        # Poucos lotes em andamento por processo: a memória não cresce com o arquivo
+        max_pending = 2 * (workers or os.cpu_count() or 1)
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(_decrypt_legacy_batch, batch))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
 
 
 class RSACrypto:
     """Classe para operações de criptografia RSA"""
     
     @staticmethod
-    def generate_keys():
+    def generate_keys(key_type=DEFAULT_KEY_TYPE):
         """
-        Gera um par de chaves RSA (privada e pública)
+        Gera um par de chaves (privada e pública). Para não bloquear a página,
+        use um KeyPool (crypto_keypool), que gera os pares em segundo plano
+        
+        Args:
+            key_type (str): 'rsa-2048', 'rsa-3072', 'rsa-4096', 'x25519' ou 'ed25519'
         
         Returns:
             tuple: (chave_privada_pem, chave_publica_pem)
         """
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=2048,
-            backend=default_backend()
-        )
+        if key_type in RSA_KEY_SIZES:
+            private_key = rsa.generate_private_key(
+                public_exponent=65537,
+                key_size=RSA_KEY_SIZES[key_type],
+                backend=default_backend()
+            )
+        elif key_type == 'x25519':
+            private_key = x25519.X25519PrivateKey.generate()
+        elif key_type == 'ed25519':
+            private_key = ed25519.Ed25519PrivateKey.generate()
+        else:
+            raise ValueError(f"Tipo de chave não suportado: {key_type}")
         
         public_key = private_key.public_key()
         
@@ -43,71 +272,201 @@ class RSACrypto:
         return private_pem, public_pem
     
     @staticmethod
-    def encrypt_file(content, public_key_pem):
+    def encrypt_file(content, public_key_pem, cipher=DEFAULT_CIPHER):
         """
         Criptografa conteúdo usando chave pública RSA
         
         Args:
             content (bytes): Conteúdo a ser criptografado
-            public_key_pem (str): Chave pública em formato PEM
+            public_key_pem (str | list[str]): Chave pública em formato PEM, ou
+                uma lista delas (um destinatário por chave)
+            cipher (str): Cifra simétrica do modo híbrido ('aes-gcm' ou
+                'chacha20-poly1305'), ou 'rsa' para o formato legado em blocos
+                (um único destinatário)
             
         Returns:
-            str: Conteúdo criptografado em base64
+            str: Contêiner em ASCII armor (ou o formato legado em base64)
+        """
+        if cipher == 'rsa':
+            return RSACrypto._encrypt_legacy(content, RSACrypto._single_recipient(public_key_pem).key)
+        target = io.BytesIO()
+        RSACrypto.encrypt_stream(io.BytesIO(content), target, public_key_pem, cipher, armor=True)
+        return target.getvalue().decode('ascii')
+    
+    @staticmethod
+    def encrypt_bytes(content, public_key_pem, cipher=DEFAULT_CIPHER, segment_size=SEGMENT_SIZE):
         """
-        public_key = serialization.load_pem_public_key(
-            public_key_pem.encode('utf-8'),
-            backend=default_backend()
-        )
+        Criptografa conteúdo no contêiner binário (sem o acréscimo do base64)
         
+        Args:
+            content (bytes): Conteúdo a ser criptografado
+            public_key_pem (str | list[str]): Chave(s) pública(s) em formato PEM
+            cipher (str): 'aes-gcm' ou 'chacha20-poly1305'
+            segment_size (int): Bytes de conteúdo por segmento
+            
+        Returns:
+            bytes: O contêiner
+        """
+        target = io.BytesIO()
+        RSACrypto.encrypt_stream(io.BytesIO(content), target, public_key_pem, cipher, segment_size)
+        return target.getvalue()
+    
+    @staticmethod
+    def _single_recipient(public_key_pem):
+        """Chave do formato legado, que só admite um destinatário."""
+        if not isinstance(public_key_pem, str):
+            if len(public_key_pem) != 1:
+                raise ValueError("O formato legado admite um único destinatário.")
+            public_key_pem = public_key_pem[0]
+        return load_public_key(public_key_pem)
+    
+    @staticmethod
+    def _encrypt_legacy(content, public_key):
+        """Formato legado: um bloco RSA-OAEP por 190 bytes (em 2048 bits), em base64, um por linha."""
+
         # RSA pode criptografar apenas dados pequenos, então dividimos em chunks
-        max_chunk_size = 190  # Para chave de 2048 bits
+        max_chunk_size = legacy_chunk_size(public_key)
         chunks = [content[i:i+max_chunk_size] for i in range(0, len(content), max_chunk_size)]
         
         encrypted_chunks = []
         for chunk in chunks:
-            encrypted_chunk = public_key.encrypt(
-                chunk,
-                padding.OAEP(
-                    mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                    algorithm=hashes.SHA256(),
-                    label=None
-                )
-            )
+            encrypted_chunk = public_key.encrypt(chunk, OAEP_PADDING)
             encrypted_chunks.append(base64.b64encode(encrypted_chunk).decode('utf-8'))
         
         return '\n'.join(encrypted_chunks)
     
     @staticmethod
-    def decrypt_file(encrypted_content, private_key_pem):
+    def decrypt_file(encrypted_content, private_key_pem, workers=1):
         """
-        Descriptografa conteúdo usando chave privada RSA
+        Descriptografa conteúdo usando chave privada RSA (o formato é detectado
+        pelo início do conteúdo)
         
         Args:
-            encrypted_content (str): Conteúdo criptografado em base64
+            encrypted_content (str | bytes): Contêiner binário, contêiner em
+                ASCII armor ou legado em base64
             private_key_pem (str): Chave privada em formato PEM
+            workers (int | None): Processos usados no formato legado (ver
+                `decrypt_legacy_lines`)
             
         Returns:
             bytes: Conteúdo descriptografado
+        
+        Raises:
+            ValueError: Se o arquivo for de outra chave ou estiver malformado
+            cryptography.exceptions.InvalidTag: Se o conteúdo foi alterado
         """
-        private_key = serialization.load_pem_private_key(
-            private_key_pem.encode('utf-8'),
-            password=None,
-            backend=default_backend()
-        )
-        
-        encrypted_chunks = encrypted_content.strip().split('\n')
-        decrypted_chunks = []
-        
-        for chunk in encrypted_chunks:
-            encrypted_data = base64.b64decode(chunk)
-            decrypted_chunk = private_key.decrypt(
-                encrypted_data,
-                padding.OAEP(
-                    mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                    algorithm=hashes.SHA256(),
-                    label=None
-                )
-            )
-            decrypted_chunks.append(decrypted_chunk)
+        private_entry = load_private_key(private_key_pem)
+        if isinstance(encrypted_content, str):
+            encrypted_content = encrypted_content.encode('ascii')
+        if encrypted_content.lstrip().startswith(ARMOR_BEGIN):
+            encrypted_content = dearmor(encrypted_content)
+        if encrypted_content.startswith(MAGIC):
+            return RSACrypto._decrypt_container(memoryview(encrypted_content), private_entry)
+        encrypted_chunks = encrypted_content.decode('ascii').strip().split('\n')
+        return b''.join(decrypt_legacy_lines(encrypted_chunks, private_key_pem, workers))
+    
+    @staticmethod
+    def _decrypt_container(view, private_entry):
+        """Descriptografa um contêiner em memória, fatiando `view` sem cópias."""
+        header, offset = parse_header(view)
+        key = unwrap_file_key(header, private_entry)
+        aead = new_symmetric_cipher(header.cipher, key)
+        return b''.join(parse_segments(view, offset, aead, header))
+    
+    @staticmethod
+    def encrypt_stream(source, target, public_key_pem, cipher=DEFAULT_CIPHER, segment_size=SEGMENT_SIZE,
+                       armor=False):
+        """
+        Criptografa de arquivo para arquivo, um segmento por vez (memória
+        limitada a um segmento, qualquer que seja o tamanho do arquivo)
+        
+        Args:
+            source: Arquivo binário de origem (método `read`)
+            target: Arquivo binário de destino (método `write`)
+            public_key_pem (str | list[str]): Chave pública em formato PEM, ou
+                uma lista delas: o conteúdo é cifrado uma vez e só a chave
+                simétrica é cifrada para cada destinatário
+            cipher (str): 'aes-gcm', 'chacha20-poly1305' ou 'rsa' (formato
+                legado em texto, também gravado aos poucos; um destinatário)
+            segment_size (int): Bytes de conteúdo por segmento
+            armor (bool): Grava o contêiner em ASCII armor
+            
+        Returns:
+            int: Quantidade de bytes de conteúdo criptografados
+        """
+        if cipher == 'rsa':
+            return RSACrypto._encrypt_legacy_stream(source, target, RSACrypto._single_recipient(public_key_pem).key)
+        
+        # Uma chave simétrica por arquivo; o RSA cifra só essa chave, uma vez por destinatário
+        key = os.urandom(SYMMETRIC_KEY_SIZE)
+        header = pack_header(cipher, recipient_slots(public_key_pem, key), segment_size,
+                             os.urandom(NONCE_PREFIX_SIZE))
+        aead = new_symmetric_cipher(cipher, key)
+        if not armor:
+            return write_segments(source, target, aead, header)
+        writer = ArmorWriter(target)
+        total = write_segments(source, writer, aead, header)
+        writer.close()
+        return total
+    
+    @staticmethod
+    def _encrypt_legacy_stream(source, target, public_key):
+        """Formato legado gravado linha a linha (uma operação RSA por linha)."""
+        total = 0
+        first = True
+        chunk_size = legacy_chunk_size(public_key)
+        for chunk in iter(lambda: source.read(chunk_size), b''):
+            if not first:
+                target.write(b'\n')
+            target.write(base64.b64encode(public_key.encrypt(chunk, OAEP_PADDING)))
+            total += len(chunk)
+            first = False
+        return total
+    
+    @staticmethod
+    def decrypt_stream(source, target, private_key_pem, workers=1):
+        """
+        Descriptografa de arquivo para arquivo, um segmento por vez. O formato
+        é detectado pelos primeiros bytes; o legado também é processado linha
+        a linha
         
-        return b''.join(decrypted_chunks)
+        Args:
+            source: Arquivo binário criptografado (métodos `read` e `readline`)
+            target: Arquivo binário de destino (método `write`)
+            private_key_pem (str): Chave privada em formato PEM
+            workers (int | None): Processos usados no formato legado (ver
+                `decrypt_legacy_lines`)
+            
+        Returns:
+            int: Quantidade de bytes de conteúdo gravados em `target`
+        
+        Raises:
+            ValueError: Se o arquivo for de outra chave, estiver truncado ou malformado
+            cryptography.exceptions.InvalidTag: Se algum segmento foi alterado.
+                Os segmentos anteriores já foram gravados em `target`, que
+                deve ser descartado
+        """
+        private_entry = load_private_key(private_key_pem)
+        start = source.read(DETECT_SIZE)
+        source = PrefixedReader(start, source)
+        if start.lstrip().startswith(ARMOR_BEGIN):
+            source = ArmorReader(source)
+        elif not start.startswith(MAGIC):
+            return RSACrypto._decrypt_legacy_stream(source, target, private_key_pem, workers)
+        
+        header = read_header(source)
+        key = unwrap_file_key(header, private_entry)
+        total = 0
+        for segment in read_segments(source, new_symmetric_cipher(header.cipher, key), header):
+            target.write(segment)
+            total += len(segment)
+        return total
+    
+    @staticmethod
+    def _decrypt_legacy_stream(source, target, private_key_pem, workers=1):
+        """Formato legado, em lotes de linhas."""
+        total = 0
+        for chunk in decrypt_legacy_lines(iter(source.readline, b''), private_key_pem, workers):
+            target.write(chunk)
+            total += len(chunk)
+        return total
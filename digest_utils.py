@@ -0,0 +1,53 @@
+"""
+Algoritmos de digest usados no registro de contratos e na blockchain.
+
+Todos produzem 32 bytes (64 caracteres hex), então os índices, a árvore de
+Merkle e o `index.bin` do armazenamento em disco valem para qualquer um deles.
+O BLAKE2b é usado com digest de 256 bits e costuma ser bem mais rápido que o
+SHA-256 em CPUs sem instruções SHA dedicadas.
+"""
+import hashlib
+from typing import Dict, Iterable
+
+# Nome do algoritmo -> identificador gravado em cada registro
+DIGEST_ALGORITHMS = {'sha256': 0, 'blake2b': 1, 'sha3_256': 2}
+ALGORITHM_NAMES = {algorithm_id: name for name, algorithm_id in DIGEST_ALGORITHMS.items()}
+DEFAULT_ALGORITHM = 'sha256'
+
+
+def new_hasher(algorithm: str = DEFAULT_ALGORITHM):
+    """
+    Cria um objeto de hash incremental para o algoritmo informado.
+    :param algorithm: 'sha256', 'blake2b' ou 'sha3_256'.
+    :raises ValueError: Se o algoritmo não for suportado.
+    """
+    if algorithm == 'blake2b':
+        return hashlib.blake2b(digest_size=32)
+    if algorithm in DIGEST_ALGORITHMS:
+        return hashlib.new(algorithm)
+    raise ValueError(f"Algoritmo de digest não suportado: {algorithm}")
+
+
+def digest_bytes(data: bytes, algorithm: str = DEFAULT_ALGORITHM) -> str:
+    """Digest (hex) de um conteúdo completo."""
+    hasher = new_hasher(algorithm)
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+class MultiHasher:
+    """
+    Calcula vários digests em uma única passada pelos dados: cada bloco
+    recebido é repassado a todos os algoritmos enquanto ainda está em cache.
+    """
+
+    def __init__(self, algorithms: Iterable[str]):
+        self._hashers = {algorithm: new_hasher(algorithm) for algorithm in algorithms}
+
+    def update(self, data: bytes) -> None:
+        for hasher in self._hashers.values():
+            hasher.update(data)
+
+    def hexdigests(self) -> Dict[str, str]:
+        """:return: Dicionário algoritmo -> digest hex."""
+        return {algorithm: hasher.hexdigest() for algorithm, hasher in self._hashers.items()}
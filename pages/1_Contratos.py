@@ -1,16 +1,169 @@
 import streamlit as st
-import io 
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import time
+from blockchain import Blockchain
+from contract_batch import batch_verify, batch_verify_files, bulk_register, verification_report_csv
+from contract_encryption import EnvelopeCompressor
 from contract_manager import ContractManager
+from contract_merkle import verify_inclusion
+from contract_registry import SharedContractRegistry
+from contract_signatures import SignatureRegistry, batch_sign, public_key_pem
+from contract_store import open_contract_store
+from crypto_utils import RSACrypto
 
 # --- Configuração Inicial e Estado da Sessão ---
 
 st.set_page_config(layout="wide", page_title="Registro de Contratos Imutáveis")
 
-# Inicializa o ContractManager na sessão do Streamlit
-if 'contract_manager' not in st.session_state:
-    st.session_state.contract_manager = ContractManager()
-    
-manager = st.session_state.contract_manager
+# A cada ANCHOR_EVERY contratos, a raiz de Merkle do registro é gravada na blockchain
+ANCHOR_EVERY = int(os.environ.get("CONTRACTS_ANCHOR_EVERY", "10"))
+
+# Algoritmo de digest dos novos registros: sha256 (padrão), blake2b ou sha3_256
+DIGEST_ALGORITHM = os.environ.get("CONTRACTS_DIGEST_ALGORITHM", "sha256")
+
+# Chave privada mestra (arquivo PEM): com ela, os textos são criptografados no
+# armazenamento, cada um com a sua chave de dados (ver contract_encryption)
+MASTER_KEY_FILE = os.environ.get("CONTRACTS_MASTER_KEY_FILE")
+
+STORAGE_DIR = os.environ.get("CONTRACTS_STORAGE_DIR")
+STORE_URL = os.environ.get("CONTRACTS_STORE_URL")
+
+
+def blockchain_file():
+    """
+    Arquivo da blockchain das âncoras, gravado junto dos contratos persistentes:
+    CONTRACTS_BLOCKCHAIN_FILE ou, por padrão, ao lado do diretório ou do banco
+    SQLite. Sem ele (memória, ou MongoDB sem a variável), as âncoras não persistem.
+    """
+    if os.environ.get("CONTRACTS_BLOCKCHAIN_FILE"):
+        return os.environ["CONTRACTS_BLOCKCHAIN_FILE"]
+    if STORE_URL:
+        if STORE_URL.startswith("sqlite:///"):
+            return STORE_URL[len("sqlite:///"):] + ".blockchain.jsonl"
+        return None
+    if STORAGE_DIR:
+        return os.path.join(STORAGE_DIR, "blockchain.jsonl")
+    return None
+
+
+# O registro é único por processo do servidor e compartilhado por todas as sessões.
+# Com CONTRACTS_STORE_URL (sqlite:///contratos.db ou mongodb://...), os contratos
+# ficam em banco de dados; com CONTRACTS_STORAGE_DIR, em disco; com
+# CONTRACTS_CHUNKED_STORE=1, em memória com deduplicação de blocos.
+@st.cache_resource
+def get_shared_registry():
+    compressor = None
+    if MASTER_KEY_FILE:
+        with open(MASTER_KEY_FILE, encoding="utf-8") as f:
+            compressor = EnvelopeCompressor(f.read())
+    store = open_contract_store(STORAGE_DIR, compressor,
+                                chunked=os.environ.get("CONTRACTS_CHUNKED_STORE") == "1",
+                                url=STORE_URL)
+    # Aberta depois do store: no disco, o diretório é criado por ele
+    registry_chain = Blockchain(difficulty=0, path=blockchain_file())
+    # Similaridade, blocos e busca: preenchidos na primeira consulta, não no registro
+    return SharedContractRegistry(ContractManager(
+        store, blockchain=registry_chain, anchor_every=ANCHOR_EVERY, algorithm=DIGEST_ALGORITHM,
+        similarity=True, chunking=True, search=True))
+
+
+try:
+    manager = get_shared_registry()
+except ValueError as e:
+    # Configuração inválida (ex.: chave mestra diferente, ou criptografia com CONTRACTS_CHUNKED_STORE)
+    st.error(f"Erro ao abrir o armazenamento de contratos: {e}")
+    st.stop()
+
+
+# Assinaturas dos contratos e cache das verificações, também compartilhados
+@st.cache_resource
+def get_signature_registry():
+    return SignatureRegistry()
+
+
+signatures = get_signature_registry()
+
+# Tamanho mínimo do hash abreviado aceito na busca por prefixo
+MIN_HASH_PREFIX = 8
+
+# Quantidade máxima de trechos alterados exibidos na verificação
+MAX_CHANGED_REGIONS = 10
+
+# Opções de tamanho de página da listagem de contratos
+PAGE_SIZES = [10, 25, 50, 100]
+
+# Contratos lidos por página ao procurar os ainda não assinados
+SIGN_PAGE_SIZE = 1000
+
+
+def save_upload_to_temp(uploaded_file):
+    """Copia um upload para um arquivo temporário (lido pelos processos de hashing)."""
+    with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as tmp:
+        uploaded_file.seek(0)
+        shutil.copyfileobj(uploaded_file, tmp)
+    return tmp.name
+
+
+def render_contract_listing(key):
+    """Tabela paginada dos contratos: só a página exibida é consultada e enviada ao navegador."""
+    st.subheader("📋 Contratos Registrados")
+    col1, col2, col3 = st.columns([2, 2, 1])
+    hash_prefix = col1.text_input("Filtrar pelo início do hash:", key=f"{key}_prefix")
+    dates = col2.date_input("Registrados entre:", value=(), key=f"{key}_dates")
+    page_size = col3.selectbox("Por página:", PAGE_SIZES, index=1, key=f"{key}_page_size")
+
+    filters = {'hash_prefix': hash_prefix or None}
+    if len(dates) == 2:
+        filters['registered_from'] = datetime.datetime.combine(dates[0], datetime.time.min).timestamp()
+        filters['registered_until'] = datetime.datetime.combine(
+            dates[1] + datetime.timedelta(days=1), datetime.time.min).timestamp()
+
+    total = manager.list_contracts(limit=0, **filters)['total']
+    pages = max(1, -(-total // page_size))
+    page = st.number_input(f"Página (de {pages}):", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+    listing = manager.list_contracts(offset=(page - 1) * page_size, limit=page_size, **filters)
+
+    st.caption(f"{total} contrato(s) encontrado(s)")
+    st.dataframe([
+        {"Número": item['number'], "Hash": item['hash'], "Algoritmo": item['algorithm'],
+         "Tamanho (bytes)": item['size'],
+         "Registrado em": datetime.datetime.fromtimestamp(item['registered_at']).strftime("%d/%m/%Y %H:%M:%S")
+         if item['registered_at'] else "—"}
+        for item in listing['items']
+    ], use_container_width=True, hide_index=True)
+
+
+def read_contract_file(number):
+    """
+    Grava os blocos lidos do armazenamento em um arquivo temporário anônimo e o
+    devolve: o Streamlit lê o arquivo uma única vez, sem outra cópia do contrato
+    em memória. Chamada só quando o usuário clica no botão (dados adiados do
+    download_button); o arquivo some ao ser fechado.
+    """
+    tmp = tempfile.TemporaryFile(buffering=0)
+    for chunk in manager.iter_contract_bytes(number):
+        tmp.write(chunk)
+    return tmp
+
+
+def format_snippet(segments):
+    """Monta o Markdown de um trecho da busca, com os termos encontrados em destaque."""
+    def escape(fragment):
+        for char in "\\`*_[]<>#|~$":
+            fragment = fragment.replace(char, "\\" + char)
+        return fragment.replace("\n", " ")
+    return "".join(f"**{escape(text)}**" if highlighted else escape(text) for text, highlighted in segments)
+
+
+def format_throughput(size_bytes, elapsed):
+    """Formata a vazão do hashing em MB/s."""
+    if elapsed <= 0:
+        return "— MB/s"
+    return f"{size_bytes / elapsed / 1_000_000:.1f} MB/s"
 
 st.title("🛡️ Sistema de Verificação de Contratos (Simulação Blockchain)")
 st.caption(f"Contratos Registrados: {manager.total_contracts}")
@@ -24,7 +177,12 @@ menu_selection = st.sidebar.radio(
      "2. Consultar Contrato por Número", 
      "3. Consultar Contrato por Hash", 
      "4. Verificar Texto e Integridade (Upload)",
-     "5. Baixar Contrato por Hash (Download)"] # NOVA OPÇÃO
+     "5. Baixar Contrato por Hash (Download)",
+     "6. Registro em Lote (ZIP ou Diretório)",
+     "7. Verificação em Lote (Auditoria)",
+     "8. Prova de Inclusão (Árvore de Merkle)",
+     "9. Buscar no Texto dos Contratos",
+     "10. Assinaturas Digitais"]
 )
 
 # --- Opção 1: Upload de Contrato ---
@@ -36,18 +194,23 @@ if menu_selection == "1. Enviar Novo Contrato (Upload)":
 
     if uploaded_file is not None:
         try:
-            # Lendo o conteúdo do arquivo
-            string_io = io.StringIO(uploaded_file.getvalue().decode("utf-8"))
-            contract_text = string_io.read()
-            
-            # Adiciona o contrato
-            contract_number = manager.add_contract(contract_text)
-            contract_hash = manager.hash_text(contract_text)
+            # Adiciona o contrato lendo o arquivo em blocos (hash em streaming)
+            uploaded_file.seek(0)
+            start_time = time.perf_counter()
+            contract_number = manager.add_contract_stream(uploaded_file)
+            elapsed = time.perf_counter() - start_time
+            contract = manager.get_contract_info(contract_number)
+
+            # Prévia: apenas os primeiros bytes do arquivo
+            uploaded_file.seek(0)
+            preview = uploaded_file.read(500).decode("utf-8", errors="ignore")
 
             st.success(f"✅ Contrato Registrado com Sucesso!")
             st.markdown(f"**Número do Contrato:** **`{contract_number}`**")
-            st.markdown(f"**Hash (Assinatura):** `{contract_hash}`")
-            st.text_area("Prévia do Conteúdo", contract_text[:500] + '...', height=150, disabled=True)
+            st.markdown(f"**Hash (Assinatura):** `{contract['hash']}` ({contract['algorithm']})")
+            st.caption(f"Registrado em {elapsed * 1000:.1f} ms — leitura, hash e gravação "
+                       f"({format_throughput(contract['size'], elapsed)})")
+            st.text_area("Prévia do Conteúdo", preview + '...', height=150, disabled=True)
 
         except Exception as e:
             st.error(f"Erro ao processar o arquivo: {e}")
@@ -60,14 +223,16 @@ elif menu_selection == "2. Consultar Contrato por Número":
     if manager.total_contracts == 0:
         st.warning("Nenhum contrato registrado ainda. Por favor, envie um arquivo primeiro.")
     else:
-        # Usa um slider/select box para o número do contrato
-        selected_number = st.select_slider(
-            "Selecione o número do contrato:",
-            options=manager.contract_numbers,
-            value=manager.contract_numbers[-1]
+        # Campo numérico: o custo da página não cresce com o tamanho do registro
+        selected_number = st.number_input(
+            "Número do contrato:",
+            min_value=1,
+            max_value=manager.total_contracts,
+            value=manager.total_contracts,
+            key="number_select"
         )
         
-        contract = manager.get_contract_by_index(selected_number)
+        contract = manager.get_contract_by_index(int(selected_number))
 
         if contract:
             st.markdown("---")
@@ -77,23 +242,42 @@ elif menu_selection == "2. Consultar Contrato por Número":
         else:
             st.error(f"Contrato número {selected_number} não encontrado.")
 
+        st.markdown("---")
+        render_contract_listing("number_listing")
+
 
 # --- Opção 3: Consultar Contrato por Hash ---
 elif menu_selection == "3. Consultar Contrato por Hash":
     st.header("3. Consultar Contrato por Hash")
 
-    input_hash = st.text_input("Cole o Hash (Assinatura Digital) para buscar:", key="hash_search")
+    input_hash = st.text_input(
+        "Cole o Hash (Assinatura Digital) ou os primeiros caracteres dele para buscar:",
+        key="hash_search"
+    )
 
     if input_hash:
-        contract = manager.get_contract_by_hash(input_hash.strip())
-        
+        input_hash = input_hash.strip()
         st.markdown("---")
-        if contract:
-            st.success("✅ Contrato Encontrado!")
-            st.subheader(f"Contrato #{contract['number']}")
-            st.markdown(f"**Hash Correspondente:** `{contract['hash']}`")
-            st.text_area("Conteúdo do Contrato", contract['text'], height=300)
+
+        if len(input_hash) == 64:
+            contract = manager.get_contract_by_hash(input_hash)
+            matches = [contract] if contract else []
+        elif len(input_hash) >= MIN_HASH_PREFIX:
+            # Hash abreviado: busca por prefixo
+            matches = manager.find_contracts_by_prefix(input_hash)
         else:
+            matches = None
+            st.warning(f"Informe o hash completo ou pelo menos {MIN_HASH_PREFIX} caracteres do início dele.")
+
+        if matches:
+            if len(matches) > 1:
+                st.info(f"{len(matches)} contratos começam com este prefixo. Informe mais caracteres para refinar a busca.")
+            for contract in matches:
+                st.success("✅ Contrato Encontrado!")
+                st.subheader(f"Contrato #{contract['number']}")
+                st.markdown(f"**Hash Correspondente:** `{contract['hash']}`")
+                st.text_area("Conteúdo do Contrato", contract['text'], height=300, key=f"hash_text_{contract['number']}")
+        elif matches is not None:
             st.error("❌ Hash não encontrado. O contrato pode não estar registrado neste sistema.")
 
 
@@ -110,26 +294,70 @@ elif menu_selection == "4. Verificar Texto e Integridade (Upload)":
 
     if uploaded_verify_file is not None:
         try:
-            # Lendo o conteúdo do arquivo
-            string_io = io.StringIO(uploaded_verify_file.getvalue().decode("utf-8"))
-            input_text = string_io.read()
+            # Gera o hash do arquivo em blocos, sobre os mesmos bytes usados no registro
+            uploaded_verify_file.seek(0)
+            start_time = time.perf_counter()
+            # Um digest por algoritmo presente no registro, em uma única passada
+            digests = manager.hash_stream_all(uploaded_verify_file)
+            elapsed = time.perf_counter() - start_time
             
-            # Gera o hash do texto de entrada
-            calculated_hash = manager.hash_text(input_text.strip())
-            
-            # Verifica se o hash gerado existe
-            contract = manager.verify_text_and_find_contract(input_text.strip())
+            # Verifica se algum hash gerado existe
+            contract_number = manager.find_number_by_digests(digests)
+            contract = manager.get_contract_info(contract_number) if contract_number else None
+            algorithm = contract['algorithm'] if contract else manager.algorithm
 
             st.markdown("---")
-            st.markdown(f"**Hash Calculado:** `{calculated_hash}`")
+            st.markdown(f"**Hash Calculado:** `{digests[algorithm]}` ({algorithm})")
+            st.caption(f"Hash calculado em {elapsed * 1000:.1f} ms ({format_throughput(uploaded_verify_file.size, elapsed)})")
             
             if contract:
                 st.success(f"🎉 **INTEGRIDADE VERIFICADA!**")
                 st.markdown(f"Este hash corresponde ao **Contrato Número:** **`{contract['number']}`**")
                 st.info("O arquivo enviado é **idêntico** ao contrato original registrado. Sua integridade está garantida.")
+
+                # Assinaturas já verificadas saem do cache, sem operação de chave pública
+                for result in signatures.verify_contract(contract['hash']):
+                    signer = result['fingerprint'].hex()[:16]
+                    if result['valid']:
+                        st.success(f"✍️ Assinatura {result['signature_algorithm']} válida (chave `{signer}`)")
+                    else:
+                        st.error(f"✍️ Assinatura {result['signature_algorithm']} INVÁLIDA (chave `{signer}`)")
             else:
                 st.error("⚠️ Hash Não Encontrado!")
                 st.warning("O hash calculado não corresponde a nenhum contrato registrado. O arquivo pode ser novo, ou ter sido adulterado.")
+
+                # Procura de qual contrato registrado o arquivo pode ter sido derivado
+                if uploaded_verify_file.size > manager.index_max_bytes:
+                    st.info(f"Arquivo maior que {manager.index_max_bytes // 1024} KiB: a busca por contratos "
+                            "parecidos e trechos alterados não é feita.")
+                uploaded_verify_file.seek(0)
+                similar_contracts = manager.find_similar_contracts(uploaded_verify_file)
+                if similar_contracts:
+                    st.subheader("🔍 Contratos Registrados Mais Parecidos")
+                    st.caption("Similaridade estimada (MinHash) entre o arquivo enviado e os contratos registrados.")
+                    for similar in similar_contracts:
+                        st.markdown(f"- **Contrato `{similar['number']}`** — similaridade "
+                                    f"**{similar['similarity']:.0%}** — hash `{similar['hash']}`")
+
+                    # Localiza os trechos alterados em relação ao contrato mais parecido
+                    uploaded_verify_file.seek(0)
+                    changes = manager.locate_changes(uploaded_verify_file, similar_contracts[0]['number'])
+                    if changes:
+                        st.subheader(f"✂️ Trechos Alterados em Relação ao Contrato #{changes['reference']}")
+                        st.caption(f"{changes['matched_chunks']} de {changes['total_chunks']} blocos idênticos ao original; "
+                                   f"{changes['changed_bytes']} bytes divergentes.")
+                        # Só as janelas exibidas são lidas do arquivo
+                        for start, end in changes['changed'][:MAX_CHANGED_REGIONS]:
+                            uploaded_verify_file.seek(start)
+                            excerpt = uploaded_verify_file.read(min(end, start + 300) - start).decode(
+                                "utf-8", errors="replace")
+                            st.markdown(f"**Bytes {start}–{end}** do arquivo enviado:")
+                            st.code(excerpt, language=None)
+                        if len(changes['changed']) > MAX_CHANGED_REGIONS:
+                            st.info(f"... e mais {len(changes['changed']) - MAX_CHANGED_REGIONS} trechos alterados.")
+                        if changes['removed']:
+                            removed = ", ".join(f"{start}–{end}" for start, end in changes['removed'][:MAX_CHANGED_REGIONS])
+                            st.markdown(f"**Trechos do original ausentes no arquivo (bytes):** {removed}")
                 
         except Exception as e:
             st.error(f"Erro ao processar o arquivo: {e}")
@@ -142,29 +370,306 @@ elif menu_selection == "5. Baixar Contrato por Hash (Download)":
     if manager.total_contracts == 0:
         st.warning("Nenhum contrato registrado para baixar.")
     else:
-        # Permite selecionar o contrato pelo número
-        selected_number = st.selectbox(
-            "Selecione o número do contrato para download:",
-            options=manager.contract_numbers,
+        # Permite selecionar o contrato pelo número (ver a listagem na Opção 2)
+        selected_number = st.number_input(
+            "Número do contrato para download:",
+            min_value=1,
+            max_value=manager.total_contracts,
+            value=manager.total_contracts,
             key="download_select"
         )
         
-        contract = manager.get_contract_by_index(selected_number)
+        # Só os metadados: o texto não é lido nem enviado ao navegador a cada execução
+        contract = manager.get_contract_info(int(selected_number))
         
         if contract:
-            contract_text = contract['text']
             contract_hash = contract['hash']
             file_name = f"{contract_hash}.txt"
             
             st.markdown("---")
             st.markdown(f"**Contrato selecionado #**`{contract['number']}`")
             st.markdown(f"**Nome do Arquivo de Download:** `{file_name}`")
+            st.markdown(f"**Tamanho:** {contract['size']:,} bytes")
             
-            # Botão de download
+            # Botão de download: o conteúdo só é lido do armazenamento no clique
             st.download_button(
                 label="Clique para Baixar o Contrato",
-                data=contract_text,
+                data=lambda number=contract['number']: read_contract_file(number),
                 file_name=file_name,
-                mime="text/plain"
+                mime="text/plain",
+                on_click="ignore"
             )
             st.markdown("A integridade do arquivo baixado pode ser verificada usando a Opção 4.")
+
+
+# --- Opção 6: Registro em Lote (ZIP ou Diretório) ---
+elif menu_selection == "6. Registro em Lote (ZIP ou Diretório)":
+    st.header("6. Registro em Lote")
+    st.info("Registre de uma só vez todos os arquivos .txt de um arquivo ZIP ou de um diretório do servidor. "
+            "Os hashes são calculados em paralelo e os contratos são numerados na ordem dos arquivos.")
+
+    source_type = st.radio("Origem dos arquivos:", ["Arquivo ZIP (Upload)", "Diretório no Servidor"], horizontal=True)
+
+    if source_type == "Arquivo ZIP (Upload)":
+        uploaded_zip = st.file_uploader("Selecione o arquivo .zip:", type="zip", key="upload_zip")
+        directory = None
+    else:
+        uploaded_zip = None
+        directory = st.text_input("Caminho do diretório no servidor:", key="bulk_directory")
+
+    workers = st.number_input("Processos de hashing:", min_value=1, max_value=64, value=os.cpu_count() or 1)
+
+    if st.button("📦 Registrar em Lote", type="primary", disabled=not (uploaded_zip or directory)):
+        if directory and not os.path.isdir(directory):
+            st.error(f"Diretório não encontrado: {directory}")
+        else:
+            progress_bar = st.progress(0.0, text="Calculando hashes...")
+
+            def update_progress(done, total):
+                progress_bar.progress(done / total if total else 1.0, text=f"{done} de {total} arquivos processados")
+
+            zip_path = None
+            try:
+                if uploaded_zip is not None:
+                    zip_path = save_upload_to_temp(uploaded_zip)
+
+                report = bulk_register(manager, directory=directory or None, zip_path=zip_path,
+                                       workers=int(workers), progress=update_progress)
+
+                st.success(f"✅ Lote processado em {report['elapsed']:.2f} s!")
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("Registrados", len(report['registered']))
+                col2.metric("Duplicados", len(report['duplicates']))
+                col3.metric("Erros", len(report['errors']))
+                col4.metric("Arquivos/s", f"{report['files_per_second']:.0f}")
+                st.caption(f"{report['total']} arquivos, {report['bytes'] / 1_000_000:.1f} MB "
+                           f"({format_throughput(report['bytes'], report['elapsed'])})")
+
+                if report['duplicates']:
+                    st.subheader("Relatório de Duplicados")
+                    st.caption("Arquivos cujo conteúdo já estava registrado (número do contrato existente).")
+                    st.dataframe(report['duplicates'], use_container_width=True)
+                if report['errors']:
+                    st.subheader("Arquivos com Erro")
+                    st.dataframe(report['errors'], use_container_width=True)
+            except Exception as e:
+                st.error(f"Erro ao processar o lote: {e}")
+            finally:
+                if zip_path is not None:
+                    os.remove(zip_path)
+
+
+# --- Opção 7: Verificação em Lote (Auditoria) ---
+elif menu_selection == "7. Verificação em Lote (Auditoria)":
+    st.header("7. Verificação em Lote")
+    st.info("Verifique muitos arquivos de uma vez contra o registro. Ao final, baixe o relatório CSV "
+            "com o número do contrato correspondente a cada arquivo ou a indicação de divergência.")
+
+    source_type = st.radio("Origem dos arquivos:",
+                           ["Vários Arquivos (Upload)", "Arquivo ZIP (Upload)", "Diretório no Servidor"],
+                           horizontal=True, key="verify_source")
+
+    uploaded_files, uploaded_zip, directory = [], None, None
+    if source_type == "Vários Arquivos (Upload)":
+        uploaded_files = st.file_uploader("Selecione os arquivos .txt:", type="txt",
+                                          accept_multiple_files=True, key="verify_many")
+    elif source_type == "Arquivo ZIP (Upload)":
+        uploaded_zip = st.file_uploader("Selecione o arquivo .zip:", type="zip", key="verify_zip")
+    else:
+        directory = st.text_input("Caminho do diretório no servidor:", key="verify_directory")
+
+    workers = st.number_input("Workers de hashing:", min_value=1, max_value=64,
+                              value=os.cpu_count() or 1, key="verify_workers")
+
+    if st.button("🔎 Verificar Lote", type="primary", disabled=not (uploaded_files or uploaded_zip or directory)):
+        if directory and not os.path.isdir(directory):
+            st.error(f"Diretório não encontrado: {directory}")
+        else:
+            progress_bar = st.progress(0.0, text="Calculando hashes...")
+
+            def update_progress(done, total):
+                progress_bar.progress(done / total if total else 1.0, text=f"{done} de {total} arquivos verificados")
+
+            zip_path = None
+            try:
+                if uploaded_files:
+                    report = batch_verify_files(manager, [(f.name, f) for f in uploaded_files],
+                                                workers=int(workers), progress=update_progress)
+                else:
+                    if uploaded_zip is not None:
+                        zip_path = save_upload_to_temp(uploaded_zip)
+                    report = batch_verify(manager, directory=directory or None, zip_path=zip_path,
+                                          workers=int(workers), progress=update_progress)
+
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("Conferem", report['matched'])
+                col2.metric("Não Encontrados", report['not_found'])
+                col3.metric("Erros", report['errors'])
+                col4.metric("Arquivos/s", f"{report['files_per_second']:.0f}")
+                st.caption(f"{report['total']} arquivos verificados em {report['elapsed']:.2f} s "
+                           f"({format_throughput(report['bytes'], report['elapsed'])})")
+
+                if report['not_found'] or report['errors']:
+                    st.warning("⚠️ Alguns arquivos não correspondem a nenhum contrato registrado.")
+                    st.dataframe([row for row in report['results'] if row['status'] != 'confere'],
+                                 use_container_width=True)
+                else:
+                    st.success("🎉 **INTEGRIDADE VERIFICADA** para todos os arquivos!")
+
+                st.download_button(
+                    label="📥 Baixar Relatório (CSV)",
+                    data=verification_report_csv(report),
+                    file_name="relatorio_verificacao.csv",
+                    mime="text/csv"
+                )
+            except Exception as e:
+                st.error(f"Erro ao verificar o lote: {e}")
+            finally:
+                if zip_path is not None:
+                    os.remove(zip_path)
+
+# --- Opção 8: Prova de Inclusão (Árvore de Merkle) ---
+elif menu_selection == "8. Prova de Inclusão (Árvore de Merkle)":
+    st.header("8. Prova de Inclusão (Árvore de Merkle)")
+    st.info("A raiz da árvore de Merkle resume todo o registro em um único hash e é gravada periodicamente "
+            f"na blockchain (a cada {ANCHOR_EVERY} contratos). Com a prova de inclusão, qualquer pessoa "
+            "confirma que um contrato faz parte do registro usando poucos hashes, sem acessar os demais contratos.")
+
+    registry_chain = manager.blockchain
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Raiz Atual", (manager.merkle_root() or "—")[:16])
+    col2.metric("Âncoras na Blockchain", len(manager.anchors))
+    col3.metric("Blockchain", "✅ Válida" if registry_chain.is_valid() else "❌ Inválida")
+
+    if st.button("⚓ Ancorar Raiz Atual na Blockchain", disabled=manager.total_contracts == 0):
+        anchor = manager.anchor_root()
+        st.success(f"Raiz `{anchor['root']}` gravada no bloco #{anchor['block_index']}.")
+
+    tab_generate, tab_verify = st.tabs(["Gerar Prova", "Verificar Prova"])
+
+    with tab_generate:
+        if manager.total_contracts == 0:
+            st.warning("Nenhum contrato registrado ainda.")
+        else:
+            proof_number = st.number_input("Número do contrato:", min_value=1,
+                                           max_value=manager.total_contracts, value=1, key="proof_number")
+            anchor = manager.latest_anchor_for(proof_number)
+            proof = manager.get_inclusion_proof(proof_number, anchor['tree_size'] if anchor else None)
+            if anchor:
+                proof['anchor'] = {'block_index': anchor['block_index'], 'block_hash': anchor['block_hash']}
+                st.success(f"Prova relativa à raiz ancorada no bloco #{anchor['block_index']}.")
+            else:
+                st.warning("Este contrato ainda não foi incluído em nenhuma raiz ancorada. "
+                           "A prova abaixo usa a raiz atual.")
+            st.markdown(f"**Hash do Contrato:** `{proof['hash']}`")
+            st.markdown(f"**Raiz:** `{proof['root']}` ({proof['tree_size']} contratos, {len(proof['proof'])} hashes na prova)")
+            proof_json = json.dumps(proof, indent=2)
+            st.code(proof_json, language="json")
+            st.download_button("📥 Baixar Prova (JSON)", data=proof_json,
+                               file_name=f"prova_{proof['hash']}.json", mime="application/json")
+
+    with tab_verify:
+        verify_contract = st.file_uploader("Arquivo do contrato:", type="txt", key="proof_contract")
+        verify_proof = st.file_uploader("Prova de inclusão (JSON):", type="json", key="proof_json")
+
+        if verify_contract is not None and verify_proof is not None:
+            try:
+                proof = json.loads(verify_proof.getvalue().decode("utf-8"))
+                verify_contract.seek(0)
+                calculated_hash = manager.hash_stream(verify_contract, algorithm=proof.get('algorithm', 'sha256'))
+
+                # A raiz da prova precisa estar gravada em algum bloco da blockchain
+                anchor_block = manager.find_anchor_block(registry_chain, proof['root'])
+
+                st.markdown(f"**Hash Calculado:** `{calculated_hash}`")
+                if calculated_hash != proof['hash']:
+                    st.error("❌ O arquivo não corresponde ao hash da prova.")
+                elif not verify_inclusion(calculated_hash, proof['proof'], proof['root']):
+                    st.error("❌ Prova inválida: os hashes não levam à raiz informada.")
+                elif anchor_block is not None:
+                    st.success(f"🎉 **INCLUSÃO VERIFICADA!** O contrato #{proof['number']} pertence ao registro "
+                               f"cuja raiz está ancorada no bloco #{anchor_block.index} da blockchain.")
+                else:
+                    st.warning("A prova é consistente, mas a raiz não foi encontrada em nenhum bloco da blockchain.")
+            except (ValueError, KeyError) as e:
+                st.error(f"Erro ao ler a prova: {e}")
+
+# --- Opção 9: Busca no Texto dos Contratos ---
+elif menu_selection == "9. Buscar no Texto dos Contratos":
+    st.header("9. Buscar no Texto dos Contratos")
+    st.info("Busca por palavras, sem diferenciar acentos, maiúsculas ou plural. Os termos são combinados com E; "
+            "use OU para alternativas e - (ou NÃO) para excluir termos. Ex.: `multa rescisão OU distrato -aditivo`.")
+
+    query = st.text_input("Termos da busca:", key="text_search")
+    if query.strip():
+        started = time.perf_counter()
+        results = manager.search_contracts(query)
+        elapsed = time.perf_counter() - started
+        st.caption(f"{len(results)} contrato(s) em {elapsed * 1000:.0f} ms")
+        if not results:
+            st.warning("Nenhum contrato contém os termos informados.")
+        for result in results:
+            st.markdown(f"**Contrato #{result['number']}** · relevância {result['score']:.2f} · `{result['hash'][:16]}`")
+            st.markdown(format_snippet(result['snippet']))
+
+# --- Opção 10: Assinaturas Digitais ---
+elif menu_selection == "10. Assinaturas Digitais":
+    st.header("10. Assinaturas Digitais")
+    st.info("Assina os hashes dos contratos (RSA-PSS ou Ed25519), provando quem os registrou. "
+            "As assinaturas são destacadas: o texto dos contratos não muda.")
+
+    if st.button("🔑 Gerar chave Ed25519"):
+        st.session_state.signing_key = RSACrypto.generate_keys("ed25519")[0]
+    signing_key = st.text_area("Chave privada do signatário (RSA ou Ed25519, PEM):",
+                               value=st.session_state.get("signing_key", ""), height=150,
+                               key="signing_key_input")
+    sign_workers = st.number_input("Processos:", min_value=1, max_value=64, value=1,
+                                   help="Com RSA, assinar muitos contratos em vários processos compensa.")
+
+    col1, col2 = st.columns(2)
+    if col1.button("✍️ Assinar contratos ainda não assinados", disabled=not signing_key.strip()):
+        try:
+            fingerprint = signatures.add_signer(public_key_pem(signing_key))
+            # Percorre o registro página a página pelo cursor, sem montar a lista inteira de uma vez
+            unsigned = []
+            cursor = None
+            while True:
+                page = manager.list_contracts(after=cursor, limit=SIGN_PAGE_SIZE)
+                unsigned.extend((info['hash'], info['algorithm']) for info in page['items']
+                                if not signatures.signed_by(info['hash'], fingerprint))
+                cursor = page['next_cursor']
+                if cursor is None:
+                    break
+            started = time.perf_counter()
+            added = signatures.add_signatures(batch_sign(unsigned, signing_key, int(sign_workers)))
+            elapsed = time.perf_counter() - started
+            st.success(f"✅ {added} contrato(s) assinado(s) em {elapsed * 1000:.0f} ms "
+                       f"pela chave `{fingerprint.hex()[:16]}`.")
+        except (ValueError, TypeError) as e:
+            st.error(f"Erro na chave: {e}")
+
+    if col2.button("🔍 Verificar todas as assinaturas"):
+        started = time.perf_counter()
+        report = signatures.verify_all(int(sign_workers))
+        elapsed = time.perf_counter() - started
+        st.caption(f"{report['verified']} assinatura(s) válida(s) em {elapsed * 1000:.0f} ms; "
+                   f"{report['cache_hits']} já verificada(s) antes (cache).")
+        if report['invalid']:
+            st.error(f"⚠️ {len(report['invalid'])} assinatura(s) inválida(s):")
+            st.code("\n".join(report['invalid']))
+        else:
+            st.success("Todas as assinaturas conferem.")
+
+    st.caption(f"{len(signatures)} assinatura(s) guardada(s).")
+
+# Estatísticas do armazenamento no rodapé da sidebar
+storage_stats = manager.stats
+st.sidebar.markdown("---")
+st.sidebar.caption(
+    f"💾 Armazenamento em {storage_stats['backend']} ({storage_stats['compression']}): "
+    f"{storage_stats['original_bytes'] / 1_000_000:.2f} MB de texto ocupando "
+    f"{storage_stats['stored_bytes'] / 1_000_000:.2f} MB "
+    f"({storage_stats['compression_ratio']:.0%})"
+)
+if MASTER_KEY_FILE:
+    st.sidebar.caption("🔒 Textos criptografados no armazenamento (AES-256-GCM, chave de dados por contrato).")
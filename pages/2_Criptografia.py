@@ -4,9 +4,120 @@
 Interface Streamlit para sistema de criptografia RSA
 """
 import streamlit as st
+import atexit
+import os
+import shutil
+import tempfile
+import time
+from crypto_keypool import KeySupply
+from crypto_keyring import split_pem
 from crypto_utils import RSACrypto  # Importar quando separar os arquivos
 
+# Modos de criptografia oferecidos: rótulo -> cifra de RSACrypto.encrypt_file
+ENCRYPTION_MODES = {
+    "Híbrido com AES-256-GCM (recomendado)": "aes-gcm",
+    "Híbrido com ChaCha20-Poly1305": "chacha20-poly1305",
+    "Somente RSA, em blocos (legado, lento)": "rsa",
+}
+
+# Tipos de chave para criptografia: rótulo -> tipo de RSACrypto.generate_keys
+ENCRYPTION_KEY_TYPES = {
+    "RSA 2048 bits": "rsa-2048",
+    "RSA 3072 bits": "rsa-3072",
+    "RSA 4096 bits": "rsa-4096",
+    "X25519 (rápida; só modo híbrido)": "x25519",
+}
+
+
+@st.cache_resource
+def get_key_supply():
+    """
+    Pares de chaves pré-gerados em segundo plano, compartilhados pelas sessões do servidor.
+    Só o tipo padrão é preparado ao iniciar; os demais, no primeiro pedido de cada tipo.
+    """
+    return KeySupply()
+
+# Trecho do conteúdo descriptografado exibido na página
+PREVIEW_SIZE = 10_000
+
+# Arquivos gerados e não baixados (ex.: sessões abandonadas) são apagados após este tempo, em segundos
+OUTPUT_TTL = 15 * 60
+
+
+@st.cache_resource
+def get_output_dir():
+    """Diretório privado (permissão 0700) dos arquivos gerados, removido ao encerrar o servidor."""
+    path = tempfile.mkdtemp(prefix="educablock-")
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+
+def remove_expired_outputs():
+    """Apaga os arquivos gerados há mais de OUTPUT_TTL segundos."""
+    limit = time.time() - OUTPUT_TTL
+    for entry in os.scandir(get_output_dir()):
+        try:
+            if entry.stat().st_mtime < limit:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def download_once(path):
+    """
+    Dados do botão de download: o arquivo é lido no clique, fechado e apagado
+    em seguida (o Streamlit entrega o conteúdo a partir da memória). Cliques
+    repetidos reaproveitam os bytes já lidos.
+    """
+    content = []
+
+    def read():
+        if not content:
+            with open(path, 'rb') as f:
+                content.append(f.read())
+            os.remove(path)
+        return content[0]
+    return read
+
+
+def show_download(slot, **button_args):
+    """
+    Botão de download do arquivo gerado na sessão (`slot`). Continua visível
+    nas execuções seguintes da página até o arquivo ser baixado ou expirar.
+    """
+    path = st.session_state.get(slot)
+    if path is None:
+        return
+    if not os.path.exists(path):
+        # Já baixado (e apagado) ou expirado
+        del st.session_state[slot]
+        return
+    st.download_button(data=download_once(path), on_click="ignore", **button_args)
+
+
+def stream_to_temp(slot, operation, source, key_pem):
+    """
+    Executa `operation` (encrypt_stream/decrypt_stream) de `source` para um
+    arquivo no diretório privado, sem manter o resultado em memória. O arquivo
+    anterior da mesma sessão (`slot`) é apagado.
+    :return: O caminho do arquivo gerado.
+    """
+    previous = st.session_state.pop(slot, None)
+    if previous and os.path.exists(previous):
+        os.remove(previous)
+    with tempfile.NamedTemporaryFile(dir=get_output_dir(), delete=False, suffix=".bin") as target:
+        st.session_state[slot] = target.name
+        try:
+            operation(source, target, key_pem)
+        except Exception:
+            target.close()
+            os.remove(target.name)
+            del st.session_state[slot]
+            raise
+    return target.name
+
 st.set_page_config(page_title="Criptografia RSA", page_icon="🔐")
+remove_expired_outputs()
 
 # Interface principal
 st.title("🔐 Sistema de Criptografia RSA")
@@ -24,10 +135,13 @@ if menu == "Criptografar Arquivo":
     # Gerar chaves
     st.subheader("1️⃣ Gerar Chaves")
     
+    key_label = st.selectbox("Tipo de chave:", list(ENCRYPTION_KEY_TYPES))
     if st.button("🔑 Gerar Novas Chaves", type="primary"):
-        private_key, public_key = RSACrypto.generate_keys()
+        # Retira um par já pronto; o pool repõe outro em segundo plano
+        private_key, public_key = get_key_supply().get(ENCRYPTION_KEY_TYPES[key_label])
         st.session_state.private_key = private_key
         st.session_state.public_key = public_key
+        st.session_state.key_type = ENCRYPTION_KEY_TYPES[key_label]
         st.success("✅ Chaves geradas com sucesso!")
     
     # Mostrar chaves se já foram geradas
@@ -48,25 +162,48 @@ if menu == "Criptografar Arquivo":
         # Upload e criptografia
         st.subheader("2️⃣ Enviar e Criptografar Arquivo")
         uploaded_file = st.file_uploader("Escolha um arquivo .txt", type=['txt'])
+        modes = [label for label, cipher in ENCRYPTION_MODES.items()
+                 if cipher != "rsa" or st.session_state.get("key_type", "rsa").startswith("rsa")]
+        mode = st.selectbox("Modo de criptografia:", modes)
+        armor = st.checkbox("Gerar em texto (ASCII armor, para copiar e colar)",
+                            disabled=ENCRYPTION_MODES[mode] == "rsa",
+                            help="O arquivo binário é cerca de 35% menor.")
+        extra_recipients = st.text_area(
+            "Outros destinatários (opcional): cole as chaves públicas deles",
+            height=100,
+            placeholder="-----BEGIN PUBLIC KEY-----\n...\n-----END PUBLIC KEY-----",
+            disabled=ENCRYPTION_MODES[mode] == "rsa",
+            help="O arquivo é criptografado uma única vez; cada destinatário o abre com a própria chave privada."
+        )
         
         if uploaded_file is not None:
-            content = uploaded_file.read()
-            
             if st.button("🔐 Criptografar e Baixar", type="primary"):
                 try:
-                    encrypted_content = RSACrypto.encrypt_file(content, st.session_state.public_key)
-                    
-                    st.success("✅ Arquivo criptografado com sucesso!")
+                    cipher = ENCRYPTION_MODES[mode]
+                    as_text = armor or cipher == "rsa"
+                    recipients = [st.session_state.public_key]
+                    if cipher != "rsa":
+                        recipients += split_pem(extra_recipients)
+                    # Criptografa segmento a segmento direto para um arquivo temporário
+                    stream_to_temp(
+                        "encrypted_path",
+                        lambda source, target, key: RSACrypto.encrypt_stream(
+                            source, target, key, cipher, armor=armor),
+                        uploaded_file, recipients)
+                    st.session_state.encrypted_as_text = as_text
                     
-                    # Botão de download
-                    st.download_button(
-                        label="📥 Baixar Arquivo Criptografado",
-                        data=encrypted_content,
-                        file_name="arquivo_criptografado.txt",
-                        mime="text/plain"
-                    )
+                    st.success(f"✅ Arquivo criptografado com sucesso para {len(recipients)} destinatário(s)!")
                 except Exception as e:
                     st.error(f"❌ Erro ao criptografar: {str(e)}")
+        
+        # Botão de download: o arquivo só é lido no clique (e então apagado)
+        as_text = st.session_state.get("encrypted_as_text", False)
+        show_download(
+            "encrypted_path",
+            label="📥 Baixar Arquivo Criptografado",
+            file_name="arquivo_criptografado.txt" if as_text else "arquivo_criptografado.enc",
+            mime="text/plain" if as_text else "application/octet-stream"
+        )
 
 elif menu == "Descriptografar Arquivo":
     st.header("📥 Descriptografar Arquivo")
@@ -79,30 +216,44 @@ elif menu == "Descriptografar Arquivo":
     )
     
     st.subheader("2️⃣ Enviar Arquivo Criptografado")
-    encrypted_file = st.file_uploader("Escolha o arquivo criptografado", type=['txt'])
+    encrypted_file = st.file_uploader("Escolha o arquivo criptografado", type=['txt', 'enc'])
+    workers = st.number_input("Processos para arquivos no formato legado (somente RSA):",
+                              min_value=1, max_value=64, value=os.cpu_count() or 1,
+                              help="Cada linha do formato legado exige uma operação RSA; "
+                                   "os lotes de linhas são divididos entre os processos.")
     
     if encrypted_file is not None and private_key_input:
         if st.button("🔓 Descriptografar", type="primary"):
             try:
-                encrypted_content = encrypted_file.read().decode('utf-8')
-                decrypted_content = RSACrypto.decrypt_file(encrypted_content, private_key_input)
+                stream_to_temp(
+                    "decrypted_path",
+                    lambda source, target, key: RSACrypto.decrypt_stream(source, target, key, int(workers)),
+                    encrypted_file, private_key_input)
                 
                 st.success("✅ Arquivo descriptografado com sucesso!")
-                
-                # Mostrar conteúdo
-                st.subheader("📄 Conteúdo Descriptografado:")
-                st.text_area("Texto:", decrypted_content.decode('utf-8'), height=200, key="decrypted")
-                
-                # Botão de download
-                st.download_button(
-                    label="📥 Baixar Arquivo Descriptografado",
-                    data=decrypted_content,
-                    file_name="arquivo_descriptografado.txt",
-                    mime="text/plain"
-                )
             except Exception as e:
                 st.error(f"❌ Erro ao descriptografar: {str(e)}")
                 st.info("Verifique se a chave privada está correta.")
+    
+    # Mostrar o início do conteúdo enquanto o arquivo não for baixado
+    decrypted_path = st.session_state.get("decrypted_path")
+    if decrypted_path and os.path.exists(decrypted_path):
+        with open(decrypted_path, 'rb') as f:
+            preview = f.read(PREVIEW_SIZE).decode('utf-8', errors='replace')
+        size = os.path.getsize(decrypted_path)
+        st.subheader("📄 Conteúdo Descriptografado:")
+        if size > PREVIEW_SIZE:
+            st.caption(f"Exibindo os primeiros {PREVIEW_SIZE:,} de {size:,} bytes.")
+        # A chave muda com o arquivo, para que a prévia não mantenha o texto anterior
+        st.text_area("Texto:", preview, height=200, key=f"decrypted-{os.path.basename(decrypted_path)}")
+    
+    # Botão de download: o arquivo só é lido no clique (e então apagado)
+    show_download(
+        "decrypted_path",
+        label="📥 Baixar Arquivo Descriptografado",
+        file_name="arquivo_descriptografado.txt",
+        mime="text/plain"
+    )
 
 # Informações no rodapé
 st.sidebar.markdown("---")
@@ -0,0 +1,40 @@
+"""
+Testes do benchmark de criptografia: tamanhos, casos pequenos e detecção de regressões.
+"""
+import pytest
+
+from benchmarks.bench_crypto import MODES, THRESHOLDS, compare, format_size, parse_size, run_case, write_sample_file
+from crypto_utils import RSACrypto
+
+
+def test_sizes():
+    assert parse_size('64M') == 64 * 1024 ** 2 and parse_size(' 1k ') == 1024 and parse_size('1500') == 1500
+    assert parse_size('0.5K') == 512
+    assert [format_size(size) for size in (1024, 1024 ** 3, 1500)] == ['1K', '1G', '1500']
+
+
+@pytest.mark.parametrize('mode', list(MODES))
+def test_small_cases_run(tmp_path, mode):
+    private_pem, public_pem = RSACrypto.generate_keys('rsa-2048')
+    source_path = str(tmp_path / 'entrada.bin')
+    write_sample_file(source_path, 4096)
+    metrics = run_case(mode, private_pem, public_pem, 4096, source_path)
+    assert metrics['repeats'] >= 1 and metrics['encrypt_mb_s'] > 0 and metrics['decrypt_mb_s'] > 0
+    assert metrics['best_encrypt_ms'] <= metrics['encrypt_ms']
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['entrada.bin']
+
+
+def test_compare_reports_only_regressions_beyond_both_limits():
+    baseline = {'thresholds': THRESHOLDS,
+                'keygen': {'rsa-2048': {'keygen_ms': 50.0}},
+                'cases': {'streaming-aes-gcm/rsa-2048/1M': {'best_encrypt_ms': 10.0, 'best_decrypt_ms': 1.0,
+                                                            'peak_rss_mb': 40.0}}}
+    results = {'keygen': {'rsa-2048': {'keygen_ms': 90.0}, 'x25519': {'keygen_ms': 1.0}},
+               'cases': {'streaming-aes-gcm/rsa-2048/1M': {'best_encrypt_ms': 13.0, 'best_decrypt_ms': 1.4,
+                                                           'peak_rss_mb': 41.0}}}
+    regressions = compare(results, baseline)
+    # +30% no tempo de criptografia passa dos dois limites; +40% de 1 ms não passa do absoluto
+    assert len(regressions) == 1 and regressions[0].startswith('streaming-aes-gcm/rsa-2048/1M best_encrypt_ms')
+
+    baseline['thresholds'] = dict(THRESHOLDS, best_encrypt_ms=(0.50, 0.5))
+    assert compare(results, baseline) == []
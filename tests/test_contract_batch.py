@@ -0,0 +1,95 @@
+"""
+Testes do registro e da verificação em lote, a partir de ZIP e de diretório.
+"""
+import io
+import zipfile
+
+import pytest
+
+from contract_batch import batch_verify, batch_verify_files, bulk_register, verification_report_csv
+from contract_manager import ContractManager
+
+TEXTS = {f"contratos/{i:02d}.txt": f"Contrato {i}: locação do imóvel {i}. " * (i + 1) for i in range(6)}
+
+
+def _write_zip(path, members, compression=zipfile.ZIP_DEFLATED):
+    with zipfile.ZipFile(path, 'w', compression) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return str(path)
+
+
+def _mark_encrypted(path, name):
+    """Liga o bit de criptografia do membro (cabeçalho local e diretório central)."""
+    data = bytearray(open(path, 'rb').read())
+    with zipfile.ZipFile(path) as archive:
+        info = archive.getinfo(name)
+    data[info.header_offset + 6] |= 1
+    central = data.index(b'PK\x01\x02')
+    while data[central + 46:central + 46 + len(name)] != name.encode():
+        central = data.index(b'PK\x01\x02', central + 1)
+    data[central + 8] |= 1
+    open(path, 'wb').write(bytes(data))
+
+
+def _corrupt(path, name):
+    """Altera os bytes comprimidos do membro."""
+    data = bytearray(open(path, 'rb').read())
+    with zipfile.ZipFile(path) as archive:
+        info = archive.getinfo(name)
+    start = info.header_offset + 30 + len(name.encode())
+    for offset in range(start, start + info.compress_size):
+        data[offset] ^= 0x5A
+    open(path, 'wb').write(bytes(data))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_bulk_register_zip_and_directory(tmp_path, workers):
+    zip_path = _write_zip(tmp_path / 'lote.zip', {**TEXTS, 'leia-me.md': 'ignorado'})
+    manager = ContractManager()
+    report = bulk_register(manager, zip_path=zip_path, workers=workers, batch_size=4)
+
+    assert [item['number'] for item in report['registered']] == list(range(1, 7))
+    assert not report['errors'] and not report['duplicates']
+    for item in report['registered']:
+        assert manager.get_contract_by_index(item['number'])['text'] == TEXTS[item['file']]
+
+    directory = tmp_path / 'dir'
+    for name, text in TEXTS.items():
+        (directory / name).parent.mkdir(parents=True, exist_ok=True)
+        (directory / name).write_text(text, encoding='utf-8')
+    again = bulk_register(manager, directory=str(directory), workers=workers)
+    assert not again['registered'] and len(again['duplicates']) == len(TEXTS)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_bad_members_are_reported_per_file(tmp_path, workers):
+    members = {**TEXTS, 'cifrado.txt': 'segredo ' * 50, 'corrompido.txt': 'dados ' * 500,
+               'latin1.txt': 'ação'.encode('latin-1')}
+    zip_path = _write_zip(tmp_path / 'lote.zip', members)
+    _mark_encrypted(zip_path, 'cifrado.txt')
+    _corrupt(zip_path, 'corrompido.txt')
+
+    report = bulk_register(ContractManager(), zip_path=zip_path, workers=workers)
+    assert sorted(error['file'] for error in report['errors']) == ['cifrado.txt', 'corrompido.txt', 'latin1.txt']
+    assert len(report['registered']) == len(TEXTS)
+
+    verified = batch_verify(ContractManager(), zip_path=zip_path, workers=workers)
+    assert verified['errors'] == 3 and verified['not_found'] == len(TEXTS)
+
+
+def test_verify_reports_matches_and_csv(tmp_path):
+    manager = ContractManager()
+    names = sorted(TEXTS)
+    for name in names[:3]:
+        manager.add_contract(TEXTS[name])
+    files = [(name, io.BytesIO(TEXTS[name].encode('utf-8'))) for name in names]
+
+    report = batch_verify_files(manager, files, workers=2, batch_size=2)
+    assert (report['matched'], report['not_found'], report['errors']) == (3, 3, 0)
+    assert [row['number'] for row in report['results']] == [1, 2, 3, None, None, None]
+
+    lines = verification_report_csv(report).splitlines()
+    assert lines[0] == 'arquivo,status,contrato,hash,algoritmo,erro'
+    assert lines[1].startswith(f"{names[0]},confere,1,{ContractManager.hash_text(TEXTS[names[0]])}")
+    assert lines[-1].startswith(f"{names[-1]},nao_encontrado,,")
@@ -0,0 +1,58 @@
+"""
+Testes dos blocos definidos pelo conteúdo e da localização de regiões alteradas.
+"""
+import io
+import random
+
+from contract_chunking import (MAX_CHUNK_SIZE, MIN_CHUNK_SIZE, chunk_bytes, chunk_stream, compare_chunks,
+                               pack_chunks, unpack_chunks)
+from contract_manager import ContractManager
+
+
+def _data(seed, size=200_000):
+    return random.Random(seed).randbytes(size)
+
+
+def test_chunks_cover_the_data_with_bounded_sizes():
+    data = _data(0)
+    chunks = chunk_bytes(data)
+    assert sum(size for _, size, _ in chunks) == len(data)
+    assert all(offset == previous + size for (previous, size, _), (offset, _, _) in zip(chunks, chunks[1:]))
+    assert all(MIN_CHUNK_SIZE <= size <= MAX_CHUNK_SIZE for _, size, _ in chunks[:-1])
+
+    # Os blocos não dependem de como o fluxo foi dividido
+    parts = [data[start:start + 1000] for start in range(0, len(data), 1000)]
+    assert chunk_stream(parts) == chunks
+    assert unpack_chunks(pack_chunks(chunks)) == chunks
+    assert chunk_bytes(b'') == []
+
+
+def test_an_edit_only_changes_nearby_chunks():
+    original = _data(1)
+    edited = original[:100_000] + b'CLAUSULA ALTERADA' + original[100_010:]
+    reference, candidate = chunk_bytes(original), chunk_bytes(edited)
+
+    result = compare_chunks(reference, candidate)
+    assert len(result['changed']) == 1 and len(result['removed']) == 1
+    start, end = result['changed'][0]
+    assert start <= 100_000 and end >= 100_017 and end - start <= 3 * MAX_CHUNK_SIZE
+    assert result['matched_chunks'] >= len(candidate) - 3
+    assert compare_chunks(reference, reference)['changed'] == []
+
+
+def test_manager_locates_changes_against_the_closest_contract():
+    manager = ContractManager(similarity=True, chunking=True)
+    texts = [' '.join(f"cláusula {seed}-{i} do contrato de locação" for i in range(3000)) for seed in range(3)]
+    for text in texts:
+        manager.add_contract(text)
+
+    data = texts[1].encode('utf-8')
+    tampered = data[:50_000] + b'valor alterado' + data[50_000:]
+    result = manager.locate_changes(io.BytesIO(tampered))
+    assert result['reference'] == 2
+    assert len(result['changed']) == 1 and result['changed'][0][0] <= 50_000 < result['changed'][0][1]
+    assert result['changed_bytes'] < 3 * MAX_CHUNK_SIZE
+
+    assert manager.locate_changes(io.BytesIO(data), reference_number=2)['changed'] == []
+    assert manager.locate_changes(io.BytesIO(data), reference_number=9) is None
+    assert ContractManager().locate_changes(io.BytesIO(data)) is None
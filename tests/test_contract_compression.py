@@ -0,0 +1,57 @@
+"""
+Testes da compressão dos textos armazenados: métodos, streaming e dicionário compartilhado.
+"""
+import pytest
+
+from contract_compression import TextCompressor, train_dictionary
+from contract_manager import ContractManager
+from contract_store import DiskContractStore
+
+CLAUSES = [f"CLÁUSULA {i}ª - O LOCATÁRIO se obriga a cumprir o disposto no item {i}.".encode('utf-8')
+           for i in range(1, 30)]
+
+
+@pytest.mark.parametrize('method', ['none', 'zlib', 'lzma'])
+def test_roundtrip_and_bounded_streaming(method):
+    compressor = TextCompressor(method)
+    data = b'\n'.join(CLAUSES) * 200
+    blob = compressor.compress(data)
+    assert compressor.decompress(blob) == data
+    if method != 'none':
+        assert len(blob) < len(data) // 10
+
+    # Entregue em blocos pequenos, a saída nunca passa de `max_length` por bloco
+    chunks = [blob[start:start + 100] for start in range(0, len(blob), 100)]
+    parts = list(compressor.iter_decompress(chunks, max_length=4096))
+    assert b''.join(parts) == data
+    if method != 'none':
+        assert max(len(part) for part in parts) <= 4096
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        TextCompressor('brotli')
+    with pytest.raises(ValueError):
+        TextCompressor('lzma', dictionary=b'dicionario')
+    with pytest.raises(ValueError):
+        TextCompressor().restore({'compression': 'zlib', 'encryption': 'aes-gcm'}, None)
+
+
+def test_dictionary_is_kept_with_the_store(tmp_path):
+    samples = [b'\n'.join(CLAUSES[:20]) + f"\nPartes: {i}".encode() for i in range(10)]
+    dictionary = train_dictionary(samples, size=1024)
+    assert 0 < len(dictionary) <= 1024
+    # Só entram as linhas repetidas entre os contratos
+    assert set(dictionary.split(b'\n')) <= set(CLAUSES[:20])
+
+    plain = TextCompressor('zlib')
+    trained = TextCompressor('zlib', dictionary=dictionary)
+    sample = b'\n'.join(CLAUSES[:5])
+    assert len(trained.compress(sample)) < len(plain.compress(sample))
+
+    manager = ContractManager(DiskContractStore(str(tmp_path), trained))
+    manager.add_contract(sample.decode('utf-8'))
+    # Ao reabrir, vale a configuração gravada no diretório (com o dicionário)
+    reopened = DiskContractStore(str(tmp_path), TextCompressor('lzma'))
+    assert reopened.compressor.settings == trained.settings
+    assert reopened.read_text(1) == sample.decode('utf-8')
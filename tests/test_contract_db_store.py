@@ -0,0 +1,180 @@
+"""
+Testes dos armazenamentos em banco de dados: SQLite (arquivo temporário) e
+MongoDB (via mongomock, sem servidor).
+"""
+import sqlite3
+
+import pytest
+
+from contract_compression import TextCompressor
+from contract_db_store import MongoContractStore, SQLiteContractStore
+from contract_manager import ContractManager
+
+mongomock = pytest.importorskip("mongomock")
+BulkWriteError = pytest.importorskip("pymongo.errors").BulkWriteError
+AutoReconnect = pytest.importorskip("pymongo.errors").AutoReconnect
+
+
+class _FlakyCollection:
+    """Coleção que grava o primeiro `insert_many` mas perde a confirmação (como uma queda de conexão)."""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.failures = 1
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def insert_many(self, documents, ordered=True):
+        result = self._collection.insert_many(documents, ordered=ordered)
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("conexão perdida")
+        return result
+
+
+@pytest.fixture(params=['sqlite', 'mongo'])
+def open_store(request, tmp_path):
+    """Função que abre (ou reabre) o mesmo banco, com o compressor informado."""
+    if request.param == 'sqlite':
+        path = str(tmp_path / 'contratos.db')
+        stores = []
+
+        def open_sqlite(compressor=None, batch_size=1000):
+            stores.append(SQLiteContractStore(path, compressor, batch_size))
+            return stores[-1]
+        yield open_sqlite
+        for store in stores:
+            store._connection.close()
+    else:
+        collection = mongomock.MongoClient().db.contracts
+        yield lambda compressor=None, batch_size=1000: MongoContractStore(collection, compressor, batch_size)
+
+
+def _texts(count):
+    return [f"Contrato {i}: cláusula de multa e rescisão. " * (i + 1) for i in range(count)]
+
+
+def test_roundtrip_and_reopen(open_store):
+    manager = ContractManager(open_store())
+    texts = _texts(5)
+    numbers = [manager.add_contract(text) for text in texts]
+    assert numbers == [1, 2, 3, 4, 5]
+    assert manager.add_contract(texts[2]) == 3
+
+    reopened = open_store()
+    assert len(reopened) == 5
+    for number, text in enumerate(texts, start=1):
+        assert reopened.read_text(number) == text
+        assert b''.join(reopened.iter_bytes(number, 7)) == text.encode('utf-8')
+        assert reopened.hash_at(number) == ContractManager.hash_text(text)
+        assert reopened.size_at(number) == len(text.encode('utf-8'))
+        assert reopened.registered_at(number) > 0
+    assert reopened.stats()['original_bytes'] == sum(len(text.encode('utf-8')) for text in texts)
+
+
+def test_saved_compression_prevails(open_store):
+    store = open_store(TextCompressor('lzma'))
+    store.append('00' * 32, 'texto')
+    reopened = open_store(TextCompressor('none'))
+    assert reopened.compressor.method == 'lzma'
+    assert reopened.read_text(1) == 'texto'
+
+
+def test_batch_is_readable_before_flush(open_store):
+    store = open_store()
+    manager = ContractManager(store)
+    with store.batch():
+        number = manager.add_contract("pendente")
+        assert store.read_text(number) == "pendente"
+        assert len(open_store()) == 0
+    assert open_store().read_text(number) == "pendente"
+
+
+def test_failed_flush_keeps_only_unwritten_rows(open_store):
+    store = open_store()
+    manager = ContractManager(store)
+    texts = _texts(4)
+    conflicting = ContractManager.hash_text(texts[2])
+    # Outro gravador registrou o mesmo hash com outro número: a gravação do 3º contrato falha
+    if isinstance(store, SQLiteContractStore):
+        store._connection.execute('INSERT INTO contracts VALUES (99, ?, 0, 0, 0, 0, ?)',
+                                  (bytes.fromhex(conflicting), b''))
+        store._connection.commit()
+        expected_error = sqlite3.IntegrityError
+    else:
+        store.collection.insert_one({'_id': 99, 'hash': conflicting})
+        expected_error = BulkWriteError
+
+    with pytest.raises(expected_error):
+        with store.batch():
+            for text in texts:
+                manager.add_contract(text)
+    # Continuam legíveis, gravados ou não
+    assert [store.read_text(number) for number in range(1, 5)] == texts
+
+    if isinstance(store, SQLiteContractStore):
+        # A transação é desfeita: nada foi gravado
+        assert sorted(store._pending) == [1, 2, 3, 4]
+        store._connection.execute('DELETE FROM contracts WHERE number = 99')
+        store._connection.commit()
+    else:
+        # Em ordem: os dois primeiros foram gravados e saem dos pendentes
+        assert sorted(store._pending) == [3, 4]
+        store.collection.delete_one({'_id': 99})
+
+    store.flush()
+    assert not store._pending
+    reopened = open_store()
+    assert [reopened.read_text(number) for number in range(1, 5)] == texts
+
+
+def test_mongo_retry_after_lost_acknowledgement():
+    collection = _FlakyCollection(mongomock.MongoClient().db.contracts)
+    store = MongoContractStore(collection)
+    manager = ContractManager(store)
+    texts = _texts(3)
+
+    with pytest.raises(AutoReconnect):
+        with store.batch():
+            for text in texts:
+                manager.add_contract(text)
+    # Os documentos foram gravados, mas o store não sabe: o novo envio os reconhece
+    assert sorted(store._pending) == [1, 2, 3]
+    store.flush()
+    assert not store._pending
+    reopened = MongoContractStore(collection)
+    assert [reopened.read_text(number) for number in range(1, 4)] == texts
+
+
+def test_failed_flush_outside_batch_is_not_registered(open_store):
+    store = open_store()
+    manager = ContractManager(store)
+    texts = _texts(3)
+    manager.add_contract(texts[0])
+    conflicting = ContractManager.hash_text(texts[1])
+    if isinstance(store, SQLiteContractStore):
+        store._connection.execute('INSERT INTO contracts VALUES (99, ?, 0, 0, 0, 0, ?)',
+                                  (bytes.fromhex(conflicting), b''))
+        store._connection.commit()
+    else:
+        store.collection.insert_one({'_id': 99, 'hash': conflicting})
+
+    with pytest.raises(Exception):
+        manager.add_contract(texts[1])
+    # Nem o store nem o manager ficam com o contrato que falhou
+    assert len(store) == 1 and not store._pending
+    assert manager.find_number_by_hash(conflicting) is None
+    assert len(manager.merkle) == 1
+
+    # A numeração segue sem lacunas, e o mesmo texto pode ser registrado depois
+    assert manager.add_contract(texts[2]) == 2
+    if isinstance(store, SQLiteContractStore):
+        store._connection.execute('DELETE FROM contracts WHERE number = 99')
+        store._connection.commit()
+    else:
+        store.collection.delete_one({'_id': 99})
+    assert manager.add_contract(texts[1]) == 3
+    assert len(manager.merkle) == 3
+    reopened = open_store()
+    assert [reopened.read_text(number) for number in range(1, 4)] == [texts[0], texts[2], texts[1]]
@@ -0,0 +1,87 @@
+"""
+Testes da criptografia dos contratos armazenados (EnvelopeCompressor).
+"""
+import os
+
+import pytest
+from cryptography.exceptions import InvalidTag
+
+from contract_compression import TextCompressor
+from contract_encryption import DataKeyCache, EnvelopeCompressor
+from contract_manager import ContractManager
+from contract_store import DiskContractStore, open_contract_store
+from crypto_utils import RSACrypto
+
+TEXT = "Contrato confidencial: valor de R$ 1.000.000,00 pago em 12 parcelas. " * 3000
+
+
+@pytest.fixture(scope='module')
+def master_keys():
+    return {key_type: RSACrypto.generate_keys(key_type)[0] for key_type in ('rsa-2048', 'x25519', 'ed25519')}
+
+
+@pytest.mark.parametrize('method', ['none', 'zlib'])
+@pytest.mark.parametrize('key_type', ['rsa-2048', 'x25519'])
+def test_roundtrip_and_streaming(master_keys, method, key_type):
+    compressor = EnvelopeCompressor(master_keys[key_type], method)
+    blob = compressor.compress(TEXT.encode('utf-8'))
+    assert b'confidencial' not in blob
+    assert compressor.decompress(blob) == TEXT.encode('utf-8')
+
+    chunks = [blob[start:start + 1000] for start in range(0, len(blob), 1000)]
+    parts = list(compressor.iter_decompress(chunks, max_length=4096))
+    assert b''.join(parts) == TEXT.encode('utf-8') and max(len(part) for part in parts) <= 4096
+    # Cada texto tem a sua chave de dados
+    assert compressor.compress(b'x') != compressor.compress(b'x')
+
+
+def test_data_keys_are_opened_once(master_keys):
+    data_keys = DataKeyCache(max_keys=2)
+    compressor = EnvelopeCompressor(master_keys['rsa-2048'], data_keys=data_keys)
+    blobs = [compressor.compress(f"contrato {i}".encode()) for i in range(3)]
+    data_keys.clear()
+    for blob in blobs + blobs[2:]:
+        compressor.decompress(blob)
+    assert (data_keys.misses, data_keys.hits, len(data_keys)) == (3, 1, 2)
+
+
+@pytest.mark.parametrize('backend', ['disk', 'sqlite'])
+def test_encrypted_store_requires_the_master_key(tmp_path, master_keys, backend):
+    def open_store(compressor):
+        if backend == 'disk':
+            return open_contract_store(str(tmp_path / 'store'), compressor)
+        return open_contract_store(compressor=compressor, url=f"sqlite:///{tmp_path / 'contratos.db'}")
+
+    manager = ContractManager(open_store(EnvelopeCompressor(master_keys['rsa-2048'])))
+    manager.add_contract(TEXT)
+    manager.add_contract("Segundo contrato")
+    assert manager.store.stats()['stored_bytes'] < len(TEXT)
+
+    reopened = ContractManager(open_store(EnvelopeCompressor(master_keys['rsa-2048'], 'lzma')))
+    assert reopened.get_contract_by_index(1)['text'] == TEXT
+    assert b''.join(reopened.iter_contract_bytes(2)) == "Segundo contrato".encode('utf-8')
+    assert reopened.verify_text_and_find_contract("Segundo contrato")['number'] == 2
+
+    with pytest.raises(ValueError, match="chave mestra"):
+        open_store(TextCompressor())
+    with pytest.raises(ValueError, match="outra chave mestra"):
+        open_store(EnvelopeCompressor(master_keys['x25519']))
+
+
+def test_plain_store_and_tampered_objects(tmp_path, master_keys):
+    open_contract_store(str(tmp_path / 'plain'), TextCompressor())
+    with pytest.raises(ValueError, match="não é criptografado"):
+        open_contract_store(str(tmp_path / 'plain'), EnvelopeCompressor(master_keys['rsa-2048']))
+    with pytest.raises(ValueError):
+        EnvelopeCompressor(master_keys['ed25519'])
+
+    store = DiskContractStore(str(tmp_path / 'store'), EnvelopeCompressor(master_keys['x25519']))
+    ContractManager(store).add_contract(TEXT)
+    path = store.object_path(store.hash_at(1))
+    data = bytearray(open(path, 'rb').read())
+    data[-20] ^= 1
+    with open(path, 'wb') as f:
+        f.write(bytes(data))
+    assert os.path.getsize(path) < len(TEXT)
+    with pytest.raises(InvalidTag):
+        store.read_text(1)
@@ -0,0 +1,123 @@
+"""
+Testes do ContractManager: índice de hashes, registro em blocos, listagem e leitura.
+"""
+import hashlib
+import io
+import os
+
+import pytest
+
+import contract_store
+from contract_manager import ContractManager
+from contract_store import DiskContractStore, open_contract_store
+
+
+def _texts(count):
+    return [f"Contrato {i}: locação do imóvel {i}." for i in range(count)]
+
+
+def test_hash_index_and_prefix_search(tmp_path):
+    manager = ContractManager(DiskContractStore(str(tmp_path)))
+    texts = _texts(50)
+    numbers = [manager.add_contract(text) for text in texts]
+    assert numbers == list(range(1, 51))
+    # Texto repetido não gera novo registro
+    assert manager.add_contract(texts[7]) == 8 and manager.total_contracts == 50
+
+    contract_hash = hashlib.sha256(texts[7].encode('utf-8')).hexdigest()
+    assert manager.find_number_by_hash(contract_hash.upper()) == 8
+    assert manager.get_contract_by_hash(contract_hash)['text'] == texts[7]
+    assert manager.find_number_by_hash('0' * 64) is None
+    assert manager.verify_text_and_find_contract(texts[7])['number'] == 8
+    assert manager.verify_text_and_find_contract("outro texto") is None
+
+    hashes = sorted(manager.hash_text(text) for text in texts)
+    prefix = hashes[10][:1]
+    expected = [h for h in hashes if h.startswith(prefix)]
+    found = manager.find_contracts_by_prefix(f" {prefix.upper()} ", limit=100)
+    assert [contract['hash'] for contract in found] == expected
+    assert len(manager.find_contracts_by_prefix(prefix, limit=1)) == 1
+    assert manager.find_contracts_by_prefix(hashes[10])[0]['hash'] == hashes[10]
+    assert manager.find_contracts_by_prefix("") == [] and manager.find_contracts_by_prefix("xyz") == []
+
+    # Ao reabrir, os índices são reconstruídos a partir do store
+    reopened = ContractManager(DiskContractStore(str(tmp_path)))
+    assert reopened.find_number_by_hash(contract_hash) == 8
+    assert [c['hash'] for c in reopened.find_contracts_by_prefix(prefix, limit=100)] == expected
+
+
+def test_stream_registration_matches_text_hash(tmp_path):
+    store = DiskContractStore(str(tmp_path))
+    manager = ContractManager(store)
+    text = "Cláusula única: as obrigações são irrevogáveis. " * 5000
+    data = text.encode('utf-8')
+
+    # Blocos pequenos partem os caracteres acentuados entre leituras
+    assert ContractManager.hash_stream(io.BytesIO(data), chunk_size=7) == manager.hash_text(text)
+    assert manager.add_contract_stream(io.BytesIO(data), chunk_size=7) == 1
+    assert manager.add_contract_stream([data[:3], data[3:]]) == 1
+    assert manager.add_contract(text) == 1
+    assert manager.get_contract_by_index(1)['text'] == text
+
+    with pytest.raises(UnicodeDecodeError):
+        manager.add_contract_stream(io.BytesIO("texto".encode('utf-8') + b'\xff\xfe'), chunk_size=2)
+    with pytest.raises(UnicodeDecodeError):
+        manager.add_contract_stream([b'contrato ', 'ação'.encode('utf-8')[:-2]])
+    assert manager.total_contracts == 1 and os.listdir(store.tmp_dir) == []
+
+
+def _pages(manager, **filters):
+    """Percorre todas as páginas pelo cursor, como a listagem da página de contratos."""
+    numbers, cursor = [], None
+    while True:
+        page = manager.list_contracts(limit=7, after=cursor, **filters)
+        numbers += [item['number'] for item in page['items']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            return numbers, page['total']
+
+
+def test_paginated_listing(monkeypatch):
+    clock = iter(range(1000, 2000, 10))
+    monkeypatch.setattr(contract_store.time, 'time', lambda: float(next(clock)))
+    manager = ContractManager()
+    for text in _texts(40):
+        manager.add_contract(text)
+
+    page = manager.list_contracts(offset=35, limit=10)
+    assert [item['number'] for item in page['items']] == [36, 37, 38, 39, 40]
+    assert page['total'] == 40 and page['next_cursor'] is None
+    assert manager.list_contracts(limit=0) == {'items': [], 'total': 40, 'next_cursor': None}
+    assert _pages(manager) == (list(range(1, 41)), 40)
+    assert len(manager.contract_numbers) == 40 and manager.contract_numbers[-1] == 40
+
+    # Contrato N registrado no instante 1000 + 10 * (N - 1)
+    assert _pages(manager, registered_from=1100, registered_until=1200) == (list(range(11, 21)), 10)
+    assert manager.list_contracts(registered_from=5000)['total'] == 0
+
+    prefix = manager.store.hash_at(5)[0]
+    expected = sorted(number for number in range(1, 41) if manager.store.hash_at(number).startswith(prefix))
+    numbers, total = _pages(manager, hash_prefix=prefix.upper())
+    assert sorted(numbers) == expected and total == len(expected)
+    hashes = [manager.store.hash_at(number) for number in numbers]
+    assert hashes == sorted(hashes)
+
+    numbers, total = _pages(manager, hash_prefix=prefix, registered_from=1100, registered_until=1300)
+    assert sorted(numbers) == [number for number in expected if 11 <= number <= 30] and total == len(numbers)
+
+
+@pytest.mark.parametrize('backend', ['memory', 'chunked', 'disk', 'sqlite'])
+def test_contract_bytes_are_streamed_in_bounded_chunks(tmp_path, backend):
+    store = open_contract_store(storage_dir=str(tmp_path / 'store') if backend == 'disk' else None,
+                                chunked=backend == 'chunked',
+                                url=f"sqlite:///{tmp_path / 'contratos.db'}" if backend == 'sqlite' else None)
+    manager = ContractManager(store)
+    # Texto muito repetitivo: poucos bytes comprimidos se expandem muito
+    text = "Cláusula padrão repetida. " * 40_000
+    manager.add_contract(text)
+
+    chunks = list(manager.iter_contract_bytes(1, chunk_size=4096))
+    assert b''.join(chunks) == text.encode('utf-8')
+    assert max(len(chunk) for chunk in chunks) <= 4096
+    with pytest.raises(IndexError):
+        manager.iter_contract_bytes(2)
@@ -0,0 +1,84 @@
+"""
+Testes da árvore de Merkle do registro: raízes, provas de inclusão e âncoras na blockchain.
+"""
+import hashlib
+import json
+
+import pytest
+
+from blockchain import Blockchain
+from contract_manager import ContractManager
+from contract_merkle import MerkleTree, leaf_hash, node_hash, verify_inclusion
+from contract_store import DiskContractStore
+
+
+def _hashes(count):
+    return [hashlib.sha256(f"contrato {i}".encode()).hexdigest() for i in range(count)]
+
+
+def _reference_root(hashes):
+    """Raiz pela definição recursiva do RFC 6962 (divisão na maior potência de 2)."""
+    if len(hashes) == 1:
+        return leaf_hash(hashes[0])
+    split = 1
+    while split * 2 < len(hashes):
+        split *= 2
+    return node_hash(_reference_root(hashes[:split]), _reference_root(hashes[split:]))
+
+
+def test_roots_and_proofs_for_every_size():
+    hashes = _hashes(33)
+    tree = MerkleTree()
+    assert tree.root() is None
+    for contract_hash in hashes:
+        tree.append(contract_hash)
+
+    for size in range(1, len(hashes) + 1):
+        root = tree.root(size)
+        assert root == _reference_root(hashes[:size]).hex()
+        for index in range(size):
+            proof = tree.inclusion_proof(index, size)
+            assert verify_inclusion(hashes[index], proof, root)
+            assert not verify_inclusion(hashes[(index + 1) % len(hashes)], proof, root)
+
+    proof = tree.inclusion_proof(5)
+    proof[0]['side'] = 'left' if proof[0]['side'] == 'right' else 'right'
+    assert not verify_inclusion(hashes[5], proof, tree.root())
+    with pytest.raises(IndexError):
+        tree.inclusion_proof(33)
+    with pytest.raises(IndexError):
+        tree.inclusion_proof(3, 34)
+
+
+def test_anchors_are_recovered_from_the_persisted_chain(tmp_path):
+    chain_path = str(tmp_path / 'chain.jsonl')
+    manager = ContractManager(DiskContractStore(str(tmp_path / 'store')), Blockchain(path=chain_path),
+                              anchor_every=4)
+    for i in range(10):
+        manager.add_contract(f"Contrato {i}")
+    assert [anchor['tree_size'] for anchor in manager.anchors] == [4, 8]
+
+    # Linha final incompleta (gravação interrompida) é descartada na leitura
+    with open(chain_path, 'a', encoding='utf-8') as f:
+        f.write('{"index": 3, "dat')
+    blockchain = Blockchain(path=chain_path)
+    assert blockchain.is_valid() and len(blockchain.chain) == 3
+    reopened = ContractManager(DiskContractStore(str(tmp_path / 'store')), blockchain)
+    assert reopened.anchors == manager.anchors
+
+    anchor = reopened.latest_anchor_for(3)
+    assert anchor['tree_size'] == 8 and reopened.latest_anchor_for(9) is None
+    proof = reopened.get_inclusion_proof(3, anchor['tree_size'])
+    block = ContractManager.find_anchor_block(blockchain, proof['root'])
+    assert block.hash == anchor['block_hash'] and json.loads(block.data)['root'] == anchor['root']
+    assert verify_inclusion(proof['hash'], proof['proof'], anchor['root'])
+    assert reopened.get_inclusion_proof(9, 8) is None
+
+    anchor = reopened.anchor_root()
+    assert anchor['tree_size'] == 10 and len(Blockchain(path=chain_path).chain) == 4
+
+    # Uma âncora que não confere com o registro é ignorada
+    other = ContractManager(blockchain=Blockchain(path=chain_path))
+    for i in range(8):
+        other.add_contract(f"Outro contrato {i}")
+    assert other.anchors == []
@@ -0,0 +1,105 @@
+"""
+Testes do registro compartilhado: group commit entre threads e falhas no envio do lote.
+"""
+import threading
+
+import pytest
+
+from contract_manager import ContractManager
+from contract_registry import ReadWriteLock, SharedContractRegistry
+from contract_store import MemoryContractStore
+
+mongomock = pytest.importorskip("mongomock")
+AutoReconnect = pytest.importorskip("pymongo.errors").AutoReconnect
+
+
+class _FailingCollection:
+    """Coleção cujo primeiro `insert_many` falha sem gravar nada."""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.failures = 1
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def insert_many(self, documents, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("conexão perdida")
+        return self._collection.insert_many(documents, ordered=ordered)
+
+
+def _run_queued(registry, texts):
+    """
+    Enfileira um registro por thread enquanto a trava de escrita está ocupada,
+    para que todos entrem no mesmo lote. Retorna {texto: número ou exceção}.
+    """
+    results = {}
+
+    def register(text):
+        try:
+            results[text] = registry.add_contract(text)
+        except Exception as e:
+            results[text] = e
+
+    threads = [threading.Thread(target=register, args=(text,), daemon=True) for text in texts]
+    with registry.lock.write():
+        for thread in threads:
+            thread.start()
+        while len(registry._pending) < len(texts):
+            threading.Event().wait(0.001)
+    for thread in threads:
+        thread.join(timeout=10)
+    assert not any(thread.is_alive() for thread in threads), "threads presas aguardando o lote"
+    return results
+
+
+def test_concurrent_registrations_share_one_numbering():
+    registry = SharedContractRegistry(ContractManager(MemoryContractStore()))
+    texts = [f"Contrato {i}" for i in range(20)]
+    results = _run_queued(registry, texts + texts[:5])
+
+    assert sorted(results[text] for text in texts) == list(range(1, 21))
+    for text, number in results.items():
+        assert registry.get_contract_by_index(number)['text'] == text
+
+    # A árvore de Merkle segue a ordem de gravação, como em um manager sem threads
+    sequential = ContractManager(MemoryContractStore())
+    for text in sorted(texts, key=results.get):
+        sequential.add_contract(text)
+    assert registry.merkle_root() == sequential.merkle.root()
+
+
+def test_failed_batch_releases_every_waiting_thread():
+    from contract_db_store import MongoContractStore
+
+    collection = _FailingCollection(mongomock.MongoClient().db.contracts)
+    registry = SharedContractRegistry(ContractManager(MongoContractStore(collection)))
+    texts = [f"Contrato {i}" for i in range(5)]
+
+    results = _run_queued(registry, texts)
+    # O envio do lote falhou: todas as threads recebem o erro, nenhuma fica presa
+    assert all(isinstance(result, AutoReconnect) for result in results.values())
+
+    # Os contratos continuam pendentes e vão no próximo envio
+    assert registry.add_contract("Contrato 5") == 6
+    reopened = MongoContractStore(collection)
+    assert sorted(reopened.read_text(number) for number in range(1, 7)) == texts + ["Contrato 5"]
+
+
+def test_read_write_lock_excludes_writers():
+    lock = ReadWriteLock()
+    events = []
+
+    def writer():
+        with lock.write():
+            events.append('write')
+
+    with lock.read():
+        thread = threading.Thread(target=writer)
+        thread.start()
+        thread.join(timeout=0.05)
+        events.append('read')
+    thread.join(timeout=10)
+    assert events == ['read', 'write']
@@ -0,0 +1,126 @@
+"""
+Testes do índice invertido: tokenização, consultas booleanas e ranking BM25
+comparado com uma pontuação exaustiva.
+"""
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from contract_manager import ContractManager
+from contract_search import (BM25_B, BM25_K1, InvertedIndex, TermCounter, make_snippet, normalize_term,
+                             parse_query, tokenize)
+
+
+def _brute_force(documents, query):
+    """Pontua todos os contratos que atendem à consulta (referência)."""
+    groups, excluded = parse_query(query)
+    total_docs = len(documents)
+    avg_length = sum(sum(counts.values()) for counts in documents.values()) / total_docs
+    terms = {term for group in groups for term in group}
+    document_frequency = Counter(term for counts in documents.values() for term in counts)
+    scores = {}
+    for number, counts in documents.items():
+        if any(term in counts for term in excluded):
+            continue
+        if not any(all(term in counts for term in group) for group in groups):
+            continue
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * sum(counts.values()) / avg_length)
+        score = 0.0
+        for term in terms:
+            if term in counts:
+                df = document_frequency[term]
+                idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+                score += idf * counts[term] * (BM25_K1 + 1) / (counts[term] + norm)
+        scores[number] = score
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def test_tokenization_folds_accents_stopwords_and_plurals():
+    assert tokenize("As Cláusulas de RESCISÃO dos contratos") == ['clausula', 'rescisao', 'contrato']
+    assert normalize_term("obrigações") == 'obrigacao'
+    assert normalize_term("materiais") == 'material'
+    assert normalize_term("que") is None
+
+    counter = TermCounter()
+    for part in ("multa contra", "tual e multas", " finais"):
+        counter.update(part)
+    assert counter.finish() == Counter({'multa': 2, 'contratual': 1, 'final': 1})
+
+
+def test_parse_query_operators():
+    groups, excluded = parse_query("multa rescisão OU distrato -aditivo NÃO prazo")
+    assert groups == [['multa', 'rescisao'], ['distrato']]
+    assert excluded == {'aditivo', 'prazo'}
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_ranking_matches_exhaustive_bm25(seed):
+    rng = random.Random(seed)
+    vocabulary = [f"termo{i}" for i in range(40)]
+    weights = [1 / (i + 1) for i in range(len(vocabulary))]
+    index, documents = InvertedIndex(), {}
+    for number in range(1, 801):
+        documents[number] = Counter(rng.choices(vocabulary, weights, k=rng.randint(3, 120)))
+        index.add(number, documents[number])
+
+    queries = ["termo0", "termo25", "termo0 termo1", "termo3 termo30", "termo0 OU termo1 OU termo2",
+               "termo5 OU termo20 termo1 OU termo39", "termo0 -termo1", "termo2 OU inexistente termo0"]
+    queries += [" OU ".join(" ".join(rng.sample(vocabulary, rng.randint(1, 3))) for _ in range(rng.randint(1, 3)))
+                for _ in range(30)]
+    for query in queries:
+        ranked = _brute_force(documents, query)
+        for limit in (1, 3, 10, 1000):
+            results = index.search(query, limit)
+            assert [result['number'] for result in results] == [number for number, _ in ranked[:limit]], query
+            assert [result['score'] for result in results] == pytest.approx([score for _, score in ranked[:limit]])
+
+
+def test_ties_keep_registration_order():
+    index = InvertedIndex()
+    for number in range(1, 201):
+        index.add(number, Counter({'multa': 1, 'prazo': 1}))
+    assert [result['number'] for result in index.search("multa", 5)] == [1, 2, 3, 4, 5]
+    assert [result['number'] for result in index.search("multa OU prazo", 5)] == [1, 2, 3, 4, 5]
+    assert index.search("multa", 0) == [] and index.search("inexistente", 5) == []
+
+
+def test_manager_search_with_snippets():
+    manager = ContractManager(search=True)
+    manager.add_contract("Contrato de locação. A multa por rescisão antecipada é de três aluguéis.")
+    manager.add_contract("Contrato de prestação de serviços, sem multa.")
+    manager.add_contract("Termo aditivo ao contrato de locação.")
+
+    results = manager.search_contracts("multa rescisão")
+    assert [result['number'] for result in results] == [1]
+    assert ('rescisão', True) in results[0]['snippet']
+    assert [result['number'] for result in manager.search_contracts("locação -aditivo")] == [1]
+    assert {result['number'] for result in manager.search_contracts("multa OU aditivo")} == {1, 2, 3}
+
+    segments = make_snippet("x " * 200 + "cláusula de multa", "multa", width=40)
+    assert segments[0] == ('...', False) and ('multa', True) in segments
+
+
+class _CountingDict(dict):
+    """Conta os acessos: cada contrato pontuado consulta o seu tamanho uma vez."""
+    reads = 0
+
+    def __getitem__(self, key):
+        self.reads += 1
+        return super().__getitem__(key)
+
+
+def test_top_k_does_not_score_every_match():
+    index = InvertedIndex()
+    for number in range(1, 20001):
+        counts = Counter({'clausula': 1, 'prazo': 1})
+        if number in (100, 200, 300, 400, 500):
+            counts['multa'] = 5
+        index.add(number, counts)
+    index._doc_lengths = _CountingDict(index._doc_lengths)
+
+    results = index.search("multa OU clausula", 5)
+    assert [result['number'] for result in results] == [100, 200, 300, 400, 500]
+    # Com o heap cheio, "clausula" sozinha não alcança o limiar e deixa de ser percorrida
+    assert index._doc_lengths.reads < 1000
@@ -0,0 +1,72 @@
+"""
+Testes das assinaturas dos contratos: lote, verificação com cache e registro.
+"""
+import pytest
+
+from contract_manager import ContractManager
+from contract_signatures import (SignatureRegistry, VerificationCache, batch_sign, batch_verify, public_key_pem,
+                                 signing_message)
+from crypto_utils import RSACrypto
+
+HASHES = [(ContractManager.hash_text(f"Contrato {i}"), 'sha256') for i in range(10)]
+
+
+@pytest.fixture(scope='module')
+def signers():
+    return {key_type: RSACrypto.generate_keys(key_type) for key_type in ('rsa-2048', 'ed25519')}
+
+
+@pytest.mark.parametrize('key_type', ['rsa-2048', 'ed25519'])
+@pytest.mark.parametrize('workers', [1, 2])
+def test_batch_sign_and_verify(signers, key_type, workers):
+    private_pem, public_pem = signers[key_type]
+    assert public_key_pem(private_pem).strip() == public_pem.strip()
+    records = batch_sign(HASHES, private_pem, workers=workers, batch_size=3)
+    assert [record['hash'] for record in records] == [contract_hash for contract_hash, _ in HASHES]
+    assert records[0]['signature_algorithm'] == ('rsa-pss' if key_type == 'rsa-2048' else 'ed25519')
+    assert batch_verify(records, public_pem, workers=workers, batch_size=3) == [True] * len(HASHES)
+
+    # Assinatura de outro hash, de outro algoritmo de digest ou adulterada não confere
+    forged = [dict(records[0], hash=records[1]['hash']), dict(records[2], algorithm='blake2b'),
+              dict(records[3], signature=bytes(len(records[3]['signature'])))]
+    assert batch_verify(forged, public_pem) == [False, False, False]
+    other_public = signers['ed25519' if key_type == 'rsa-2048' else 'rsa-2048'][1]
+    assert batch_verify(records[:2], other_public) == [False, False]
+
+
+def test_cache_skips_repeated_verifications(signers):
+    private_pem, public_pem = signers['ed25519']
+    records = batch_sign(HASHES, private_pem)
+    cache = VerificationCache(max_entries=5)
+    assert batch_verify(records, public_pem, cache=cache) == [True] * 10
+    assert len(cache) == 5 and cache.hits == 0
+
+    assert batch_verify(records[5:], public_pem, cache=cache) == [True] * 5
+    assert cache.hits == 5
+    # Outra assinatura para o mesmo par (hash, chave) não é aceita pelo cache
+    bad = dict(records[9], signature=records[8]['signature'])
+    assert batch_verify([bad], public_pem, cache=cache) == [False]
+    assert batch_verify([records[9]], public_pem, cache=cache) == [True]
+
+
+def test_registry_verifies_by_signer(signers):
+    registry = SignatureRegistry()
+    fingerprints = {key_type: registry.add_signer(public_pem) for key_type, (_, public_pem) in signers.items()}
+    for private_pem, _ in signers.values():
+        registry.add_signatures(batch_sign(HASHES[:4], private_pem))
+    assert len(registry) == 8
+
+    contract_hash = HASHES[0][0]
+    assert registry.signed_by(contract_hash.upper(), fingerprints['ed25519'])
+    assert all(result['valid'] for result in registry.verify_contract(contract_hash))
+
+    report = registry.verify_all()
+    assert report['verified'] == 8 and report['invalid'] == [] and report['cache_hits'] == 2
+    assert registry.verify_all()['cache_hits'] == 8
+
+    unknown = batch_sign(HASHES[:1], RSACrypto.generate_keys('ed25519')[0])
+    with pytest.raises(KeyError):
+        registry.add_signatures(unknown)
+    with pytest.raises(ValueError):
+        registry.add_signer(RSACrypto.generate_keys('x25519')[1])
+    assert signing_message(contract_hash.upper()) == signing_message(contract_hash)
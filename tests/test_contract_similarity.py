@@ -0,0 +1,70 @@
+"""
+Testes da detecção de contratos parecidos (MinHash/LSH).
+"""
+import io
+import random
+
+from contract_manager import ContractManager
+from contract_similarity import MinHasher, SimilarityIndex, estimate_similarity, text_signature
+
+WORDS = ("locador locatário imóvel aluguel multa prazo rescisão cláusula garantia fiador reajuste índice "
+         "pagamento vencimento benfeitorias vistoria foro comarca partes objeto").split()
+
+
+def _contract(seed, length=400):
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(WORDS) + str(rng.randint(0, 50)) for _ in range(length))
+
+
+def _tamper(text, seed, fraction=0.05):
+    rng = random.Random(seed)
+    words = text.split()
+    for position in rng.sample(range(len(words)), int(len(words) * fraction)):
+        words[position] = 'adulterado'
+    return ' '.join(words)
+
+
+def test_signature_is_independent_of_chunking():
+    text = _contract(1)
+    hasher = MinHasher()
+    for start in range(0, len(text), 13):
+        hasher.update(text[start:start + 13])
+    assert hasher.signature() == text_signature(text)
+    assert text_signature(text.upper()) == text_signature(text)
+    assert text_signature("  ...  ") is None
+    assert text_signature("contrato curto") is not None
+
+
+def test_index_finds_the_source_of_a_tampered_text():
+    index = SimilarityIndex()
+    texts = {number: _contract(number) for number in range(1, 201)}
+    for number, text in texts.items():
+        index.add(number, text_signature(text))
+    index.add(201, None)
+    assert len(index) == 200
+
+    for number in (7, 120, 200):
+        signature = text_signature(_tamper(texts[number], number))
+        assert estimate_similarity(signature, text_signature(texts[number])) > 0.5
+        matches = index.query(signature, limit=3, min_similarity=0.3)
+        assert matches[0]['number'] == number
+        assert all(match['similarity'] >= 0.3 for match in matches)
+    assert index.query(text_signature(_contract(999)), min_similarity=0.3) == []
+    assert index.query(None) == []
+
+
+def test_manager_indexes_pending_contracts_on_query():
+    manager = ContractManager(similarity=True)
+    texts = [_contract(seed) for seed in range(20)]
+    for text in texts:
+        manager.add_contract(text)
+
+    tampered = _tamper(texts[11], 0).encode('utf-8')
+    matches = manager.find_similar_contracts(io.BytesIO(tampered))
+    assert matches[0]['number'] == 12 and matches[0]['hash'] == manager.hash_text(texts[11])
+    assert manager.content_pending == 0
+
+    # Arquivos maiores que o limite dos índices não são analisados
+    manager.index_max_bytes = 100
+    assert manager.find_similar_contracts(io.BytesIO(tampered)) == []
+    assert ContractManager().find_similar_contracts(io.BytesIO(tampered)) == []
@@ -0,0 +1,124 @@
+"""
+Testes dos armazenamentos em memória e em disco: textos, índice e estatísticas.
+"""
+import os
+
+import pytest
+
+from contract_compression import TextCompressor
+from contract_manager import ContractManager
+from contract_store import ChunkedContractStore, DiskContractStore, MemoryContractStore
+
+
+def _texts(count):
+    return [f"Contrato {i}: cláusula de multa e rescisão. " * (i + 1) for i in range(count)]
+
+
+def _object_bytes(store):
+    return sum(os.path.getsize(store.object_path(h)) for h in store.iter_hashes())
+
+
+def test_disk_stats_are_kept_without_reading_objects(tmp_path, monkeypatch):
+    manager = ContractManager(DiskContractStore(str(tmp_path)))
+    texts = _texts(8)
+    for text in texts:
+        manager.add_contract(text)
+    expected = _object_bytes(manager.store)
+
+    # Nem a reabertura nem as estatísticas consultam o tamanho dos objetos
+    getsize = os.path.getsize
+    monkeypatch.setattr(os.path, 'getsize', lambda path: pytest.fail(f"getsize({path})"))
+    reopened = DiskContractStore(str(tmp_path))
+    for store in (manager.store, reopened):
+        stats = store.stats()
+        assert stats['original_bytes'] == sum(len(text.encode('utf-8')) for text in texts)
+        assert stats['stored_bytes'] == expected < stats['original_bytes']
+
+    monkeypatch.setattr(os.path, 'getsize', getsize)
+    ContractManager(reopened).add_contract("Contrato extra.")
+    assert reopened.stats()['stored_bytes'] == _object_bytes(reopened)
+
+
+def test_disk_stats_measure_directories_without_stored_sizes(tmp_path):
+    store = DiskContractStore(str(tmp_path), TextCompressor('none'))
+    manager = ContractManager(store)
+    for text in _texts(4):
+        manager.add_contract(text)
+    # Diretório anterior ao `stored.bin`: os tamanhos são medidos e gravados na abertura
+    os.remove(store.stored_sizes_path)
+
+    reopened = DiskContractStore(str(tmp_path))
+    assert reopened.stats()['stored_bytes'] == _object_bytes(store)
+    assert os.path.getsize(store.stored_sizes_path) == 4 * DiskContractStore.STORED_SIZE.size
+
+    ContractManager(reopened).add_contract("Contrato extra.")
+    assert DiskContractStore(str(tmp_path)).stats()['stored_bytes'] == _object_bytes(reopened)
+
+
+@pytest.mark.parametrize('store_class', [MemoryContractStore, ChunkedContractStore])
+def test_memory_stats(store_class):
+    manager = ContractManager(store_class())
+    texts = _texts(6)
+    for text in texts:
+        manager.add_contract(text)
+    stats = manager.stats
+    assert stats['total_contracts'] == 6
+    assert stats['original_bytes'] == sum(len(text.encode('utf-8')) for text in texts)
+    assert 0 < stats['stored_bytes'] < stats['original_bytes']
+
+
+def test_disk_store_shards_dedupes_and_reopens(tmp_path):
+    store = DiskContractStore(str(tmp_path))
+    manager = ContractManager(store)
+    texts = _texts(5)
+    for text in texts:
+        manager.add_contract(text)
+
+    contract_hash = store.hash_at(3)
+    path = store.object_path(contract_hash)
+    assert path == os.path.join(str(tmp_path), 'objects', contract_hash[:2], contract_hash[2:4], contract_hash)
+    assert os.path.exists(path)
+
+    # Conteúdo já gravado: o objeto é reaproveitado e o spool descartado
+    spool = store.open_spool()
+    spool.write(texts[2].encode('utf-8'))
+    assert store.commit_spool(spool, contract_hash) == 6
+    discarded = store.open_spool()
+    store.discard_spool(discarded)
+    assert os.listdir(store.tmp_dir) == []
+    assert sum(len(files) for _, _, files in os.walk(store.objects_dir)) == 5
+
+    reopened = DiskContractStore(str(tmp_path))
+    assert len(reopened) == 6 and list(reopened.iter_hashes()) == list(store.iter_hashes())
+    assert [reopened.read_text(number) for number in range(1, 6)] == texts
+    assert b''.join(reopened.iter_bytes(4, chunk_size=7)) == texts[3].encode('utf-8')
+    assert reopened.size_at(2) == len(texts[1].encode('utf-8'))
+    assert reopened.algorithm_at(1) == 'sha256' and reopened.registered_at(1) > 0
+
+
+def test_disk_store_ignores_interrupted_record(tmp_path):
+    store = DiskContractStore(str(tmp_path))
+    manager = ContractManager(store)
+    for text in _texts(3):
+        manager.add_contract(text)
+    # Registro final incompleto (gravação interrompida no meio)
+    with open(store.index_path, 'ab') as f:
+        f.write(b'\x01' * (DiskContractStore.RECORD_SIZE // 2))
+
+    reopened = ContractManager(DiskContractStore(str(tmp_path)))
+    assert reopened.total_contracts == 3
+    assert reopened.add_contract("Contrato novo.") == 4
+    again = DiskContractStore(str(tmp_path))
+    assert len(again) == 4 and again.read_text(4) == "Contrato novo."
+    assert os.path.getsize(again.index_path) == 4 * DiskContractStore.RECORD_SIZE
+
+
+
+def test_disk_store_without_config_keeps_plain_objects(tmp_path):
+    store = DiskContractStore(str(tmp_path), TextCompressor('none'))
+    store.append(ContractManager.hash_text("texto antigo"), "texto antigo")
+    # Diretório anterior à compressão: sem config.json, os objetos são texto puro
+    os.remove(os.path.join(str(tmp_path), 'config.json'))
+    reopened = DiskContractStore(str(tmp_path), TextCompressor('zlib'))
+    assert reopened.compressor.method == 'none'
+    assert reopened.read_text(1) == "texto antigo"
@@ -0,0 +1,99 @@
+"""
+Testes do contêiner binário: cabeçalho, limites, segmentos e ASCII armor.
+"""
+import io
+import os
+
+import pytest
+
+from crypto_container import (ARMOR_BEGIN, ARMOR_END, HEADER_FIELDS, MAGIC, MAX_SEGMENT_SIZE, PREFIX, VERSION,
+                              ArmorReader, ArmorWriter, PrefixedReader, dearmor, new_symmetric_cipher,
+                              pack_header, parse_header, parse_segments, read_header, read_segments,
+                              write_segments)
+
+SLOTS = [(b'\x01' * 32, b'chave cifrada 1'), (b'\x02' * 32, b'chave cifrada 2 mais longa')]
+
+
+def _header(segment_size=100, cipher='aes-gcm'):
+    return pack_header(cipher, SLOTS, segment_size, os.urandom(7))
+
+
+def test_header_roundtrip():
+    header = _header()
+    assert header.raw.startswith(PREFIX.pack(MAGIC, VERSION))
+    assert read_header(io.BytesIO(header.raw + b'resto')) == header
+    assert parse_header(memoryview(header.raw + b'resto')) == (header, len(header.raw))
+    assert header.wrapped_key_for(b'\x02' * 32) == b'chave cifrada 2 mais longa'
+    with pytest.raises(ValueError, match="outra chave"):
+        header.wrapped_key_for(b'\x03' * 32)
+
+
+def test_invalid_headers():
+    header = _header()
+    fields_at = PREFIX.size
+    bad_version = header.raw[:4] + bytes([VERSION + 1]) + header.raw[5:]
+    bad_cipher = header.raw[:fields_at] + b'\x09' + header.raw[fields_at + 1:]
+    huge = header.raw[:fields_at] + HEADER_FIELDS.pack(1, MAX_SEGMENT_SIZE + 1, 2) + header.raw[fields_at + 7:]
+    for data in (b'XXXX' + header.raw[4:], bad_version, bad_cipher, huge, header.raw[:-1]):
+        with pytest.raises(ValueError):
+            read_header(io.BytesIO(data))
+        with pytest.raises(ValueError):
+            parse_header(memoryview(data))
+
+    for segment_size in (0, MAX_SEGMENT_SIZE + 1):
+        with pytest.raises(ValueError):
+            _header(segment_size)
+    with pytest.raises(ValueError):
+        pack_header('aes-gcm', [], 100, os.urandom(7))
+    with pytest.raises(ValueError):
+        _header(cipher='aes-cbc')
+
+
+@pytest.mark.parametrize('size', [0, 1, 99, 100, 101, 1000])
+def test_segments_roundtrip(size):
+    header = _header()
+    aead = new_symmetric_cipher('chacha20-poly1305', os.urandom(32))
+    content = os.urandom(size)
+    target = io.BytesIO()
+    assert write_segments(io.BytesIO(content), target, aead, header) == size
+    data = target.getvalue()
+
+    source = io.BytesIO(data)
+    assert read_header(source) == header
+    assert b''.join(read_segments(source, aead, header)) == content
+    assert b''.join(parse_segments(memoryview(data), len(header.raw), aead, header)) == content
+
+
+def test_oversized_segment_is_rejected_before_reading():
+    header = _header()
+    aead = new_symmetric_cipher('aes-gcm', os.urandom(32))
+    data = (200).to_bytes(4, 'big') + bytes(216)
+    with pytest.raises(ValueError):
+        list(read_segments(io.BytesIO(data), aead, header))
+    with pytest.raises(ValueError):
+        list(parse_segments(memoryview(data), 0, aead, header))
+
+
+def test_armor_roundtrip():
+    data = os.urandom(1000)
+    target = io.BytesIO()
+    writer = ArmorWriter(target)
+    for start in range(0, len(data), 7):
+        writer.write(data[start:start + 7])
+    writer.close()
+    armored = target.getvalue()
+    lines = armored.splitlines()
+    assert lines[0] == ARMOR_BEGIN and lines[-1] == ARMOR_END
+    assert all(len(line) <= 64 for line in lines[1:-1])
+
+    assert dearmor(armored) == data
+    assert ArmorReader(io.BytesIO(armored)).read() == data
+    # O início já lido para detectar o formato é devolvido antes do resto
+    assert ArmorReader(PrefixedReader(armored[:10], io.BytesIO(armored[10:]))).read() == data
+
+    with pytest.raises(ValueError):
+        ArmorReader(io.BytesIO(armored[:-len(ARMOR_END) - 1])).read()
+    with pytest.raises(ValueError):
+        dearmor(armored[:-len(ARMOR_END) - 1])
+    with pytest.raises(ValueError):
+        ArmorReader(io.BytesIO(b'texto qualquer\n'))
@@ -0,0 +1,41 @@
+"""
+Testes dos pares de chaves gerados em segundo plano.
+"""
+import time
+
+import pytest
+
+from crypto_keypool import KeyPool, KeySupply
+from crypto_utils import RSACrypto
+
+
+def _wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "pool não foi reposto"
+        time.sleep(0.01)
+
+
+def test_pool_is_refilled_in_the_background():
+    pool = KeyPool('x25519', size=3)
+    assert pool.available == 0
+    # Pool vazio: o par é gerado na hora
+    private_pem, public_pem = pool.get()
+    assert RSACrypto.decrypt_file(RSACrypto.encrypt_file(b'ok', public_pem), private_pem) == b'ok'
+
+    _wait_for(lambda: pool.available == 3)
+    pairs = {pool.get() for _ in range(3)}
+    assert len(pairs) == 3
+    _wait_for(lambda: pool.available == 3)
+    assert not pairs & {pool.get() for _ in range(3)}
+
+
+def test_supply_keeps_one_pool_per_key_type():
+    supply = KeySupply(size=1, prefill=('ed25519',))
+    assert supply.pool('ed25519') is supply.pool('ed25519')
+    _wait_for(lambda: supply.pool('ed25519').available == 1)
+    private_pem, public_pem = supply.get('ed25519')
+    assert 'PRIVATE KEY' in private_pem and 'PUBLIC KEY' in public_pem
+    assert supply.get('x25519') and supply.pool('x25519') is not supply.pool('ed25519')
+    with pytest.raises(ValueError):
+        KeyPool('rsa-1024')
@@ -0,0 +1,52 @@
+"""
+Testes do cache de chaves carregadas (KeyRing).
+"""
+import pytest
+
+from crypto_keyring import KeyRing, normalize_pem, pem_fingerprint, split_pem
+from crypto_utils import RSACrypto
+
+
+@pytest.fixture(scope='module')
+def pems():
+    return [RSACrypto.generate_keys('x25519') for _ in range(3)]
+
+
+def test_keys_are_loaded_once_per_pem(pems):
+    ring = KeyRing()
+    private_pem, public_pem = pems[0]
+    entry = ring.private_key(private_pem)
+    # Espaços nas pontas e '\r' (chave colada na página) não geram outra entrada
+    pasted = '\r\n'.join(f"  {line} " for line in private_pem.splitlines())
+    assert ring.private_key(pasted) is entry
+    assert (ring.hits, ring.misses) == (1, 1)
+    assert pem_fingerprint(pasted) == pem_fingerprint(private_pem)
+    assert normalize_pem(pasted) == private_pem.strip()
+
+    # A impressão digital da privada é a da pública correspondente
+    assert ring.public_key(public_pem).fingerprint == entry.fingerprint
+    assert len(ring) == 2
+    ring.clear()
+    assert len(ring) == 0 and ring.private_key(private_pem) is not entry
+
+
+def test_least_recently_used_keys_are_dropped(pems):
+    ring = KeyRing(max_keys=2)
+    first = ring.public_key(pems[0][1])
+    ring.public_key(pems[1][1])
+    ring.public_key(pems[0][1])
+    ring.public_key(pems[2][1])
+    assert len(ring) == 2
+    assert ring.public_key(pems[0][1]) is first
+    misses = ring.misses
+    ring.public_key(pems[1][1])
+    assert ring.misses == misses + 1
+
+
+def test_invalid_and_multiple_pems(pems):
+    ring = KeyRing()
+    with pytest.raises(ValueError):
+        ring.public_key("-----BEGIN PUBLIC KEY-----\nAAAA\n-----END PUBLIC KEY-----")
+    assert len(ring) == 0
+    text = f"Chave da Ana:\n{pems[0][1]}\nChave do Bruno:\n{pems[1][1]}"
+    assert [normalize_pem(pem) for pem in split_pem(text)] == [pems[0][1].strip(), pems[1][1].strip()]
@@ -0,0 +1,154 @@
+"""
+Testes da criptografia de arquivos: modo híbrido, streaming, formato legado e
+vários destinatários.
+"""
+import io
+
+import pytest
+from cryptography.exceptions import InvalidTag
+
+from crypto_utils import RSACrypto, decrypt_legacy_lines
+
+CONTENT = "Contrato sigiloso: cláusulas e valores. ".encode('utf-8') * 500
+
+
+@pytest.fixture(scope='module')
+def keys():
+    """Pares (privada, pública) por tipo de chave, gerados uma vez."""
+    return {key_type: RSACrypto.generate_keys(key_type) for key_type in ('rsa-2048', 'x25519', 'ed25519')}
+
+
+def _flip(data, position):
+    data = bytearray(data)
+    data[position] ^= 1
+    return bytes(data)
+
+
+@pytest.mark.parametrize('key_type', ['rsa-2048', 'x25519'])
+@pytest.mark.parametrize('cipher', ['aes-gcm', 'chacha20-poly1305'])
+def test_hybrid_roundtrip(keys, key_type, cipher):
+    private_pem, public_pem = keys[key_type]
+    armored = RSACrypto.encrypt_file(CONTENT, public_pem, cipher)
+    assert isinstance(armored, str) and armored.startswith('-----BEGIN EDUCABLOCK ENCRYPTED FILE-----')
+    assert RSACrypto.decrypt_file(armored, private_pem) == CONTENT
+
+    binary = RSACrypto.encrypt_bytes(CONTENT, public_pem, cipher)
+    assert len(binary) < len(CONTENT) + 1024
+    assert RSACrypto.decrypt_file(binary, private_pem) == CONTENT
+    # Cada arquivo usa uma chave simétrica nova
+    assert RSACrypto.encrypt_bytes(CONTENT, public_pem, cipher) != binary
+    assert RSACrypto.decrypt_file(RSACrypto.encrypt_bytes(b'', public_pem, cipher), private_pem) == b''
+
+
+def test_hybrid_failures(keys):
+    private_pem, public_pem = keys['rsa-2048']
+    binary = RSACrypto.encrypt_bytes(CONTENT, public_pem)
+    with pytest.raises(InvalidTag):
+        RSACrypto.decrypt_file(_flip(binary, len(binary) - 100), private_pem)
+    with pytest.raises(ValueError, match="outra chave"):
+        RSACrypto.decrypt_file(binary, keys['x25519'][0])
+    with pytest.raises(ValueError):
+        RSACrypto.encrypt_bytes(CONTENT, keys['ed25519'][1])
+    with pytest.raises(ValueError):
+        RSACrypto.encrypt_file(CONTENT, keys['x25519'][1], 'rsa')
+    with pytest.raises(ValueError):
+        RSACrypto.encrypt_bytes(CONTENT, public_pem, 'des')
+    with pytest.raises(ValueError):
+        RSACrypto.generate_keys('dsa-1024')
+
+
+def test_legacy_format_is_still_decrypted(keys):
+    private_pem, public_pem = keys['rsa-2048']
+    legacy = RSACrypto.encrypt_file(CONTENT[:1000], public_pem, 'rsa')
+    lines = legacy.split('\n')
+    assert len(lines) == 6 and all(len(line) == 344 for line in lines)
+    assert RSACrypto.decrypt_file(legacy, private_pem) == CONTENT[:1000]
+    assert RSACrypto.decrypt_stream(io.BytesIO(legacy.encode('ascii')), io.BytesIO(), private_pem) == 1000
+
+
+class _RecordingWriter(io.BytesIO):
+    """Destino que registra o tamanho de cada gravação."""
+
+    def __init__(self):
+        super().__init__()
+        self.sizes = []
+
+    def write(self, data):
+        self.sizes.append(len(data))
+        return super().write(data)
+
+
+@pytest.mark.parametrize('armor', [False, True])
+def test_stream_roundtrip_one_segment_at_a_time(tmp_path, keys, armor):
+    private_pem, public_pem = keys['x25519']
+    source_path, encrypted_path = tmp_path / 'contrato.txt', tmp_path / 'contrato.enc'
+    source_path.write_bytes(CONTENT)
+
+    with open(source_path, 'rb') as source, open(encrypted_path, 'wb') as target:
+        assert RSACrypto.encrypt_stream(source, target, public_pem, segment_size=1000, armor=armor) == len(CONTENT)
+    target = _RecordingWriter()
+    with open(encrypted_path, 'rb') as source:
+        assert RSACrypto.decrypt_stream(source, target, private_pem) == len(CONTENT)
+    assert target.getvalue() == CONTENT
+    assert len(target.sizes) == -(-len(CONTENT) // 1000) and max(target.sizes) == 1000
+
+
+def test_stream_detects_truncation_and_reordering(keys):
+    private_pem, public_pem = keys['rsa-2048']
+    # 20 segmentos completos, cada um com tamanho (4 bytes) e tag (16 bytes)
+    encrypted = RSACrypto.encrypt_bytes(CONTENT[:20_000], public_pem, segment_size=1000)
+    segment = 4 + 1000 + 16
+    header_size = len(encrypted) - 20 * segment
+
+    # Sem o último segmento, o penúltimo não está marcado como último
+    for data in (encrypted[:-segment], encrypted[:-10], encrypted[:header_size - 3]):
+        with pytest.raises((ValueError, InvalidTag)):
+            RSACrypto.decrypt_stream(io.BytesIO(data), io.BytesIO(), private_pem)
+        with pytest.raises((ValueError, InvalidTag)):
+            RSACrypto.decrypt_file(data, private_pem)
+
+    first, second = header_size, header_size + segment
+    swapped = (encrypted[:first] + encrypted[second:second + segment] + encrypted[first:second]
+               + encrypted[second + segment:])
+    with pytest.raises(InvalidTag):
+        RSACrypto.decrypt_stream(io.BytesIO(swapped), io.BytesIO(), private_pem)
+
+
+def test_legacy_parallel_decryption_keeps_order(keys):
+    private_pem, public_pem = keys['rsa-2048']
+    content = CONTENT[:190 * 40 + 7]
+    legacy = RSACrypto.encrypt_file(content, public_pem, 'rsa')
+    lines = legacy.split('\n')
+    assert len(lines) == 41
+
+    sequential = list(decrypt_legacy_lines(lines, private_pem, workers=1, batch_lines=4))
+    parallel = list(decrypt_legacy_lines(lines + ['', '  '], private_pem, workers=2, batch_lines=4))
+    assert len(parallel) == 11 and parallel == sequential and b''.join(parallel) == content
+
+    target = io.BytesIO()
+    assert RSACrypto.decrypt_stream(io.BytesIO(legacy.encode('ascii')), target, private_pem, workers=2) == len(content)
+    assert target.getvalue() == content
+    assert RSACrypto.decrypt_file(legacy, private_pem, workers=2) == content
+
+
+def test_multiple_recipients_share_one_encryption(keys):
+    rsa_private, rsa_public = keys['rsa-2048']
+    x_private, x_public = keys['x25519']
+    outsider_private, outsider_public = RSACrypto.generate_keys('x25519')
+
+    single = RSACrypto.encrypt_bytes(CONTENT, rsa_public)
+    # A chave repetida gera um único slot
+    shared = RSACrypto.encrypt_bytes(CONTENT, [rsa_public, x_public, rsa_public])
+    assert len(shared) - len(single) < 200
+    for private_pem in (rsa_private, x_private):
+        assert RSACrypto.decrypt_file(shared, private_pem) == CONTENT
+        target = io.BytesIO()
+        RSACrypto.decrypt_stream(io.BytesIO(shared), target, private_pem)
+        assert target.getvalue() == CONTENT
+    with pytest.raises(ValueError, match="outra chave"):
+        RSACrypto.decrypt_file(shared, outsider_private)
+
+    with pytest.raises(ValueError):
+        RSACrypto.encrypt_bytes(CONTENT, [])
+    with pytest.raises(ValueError):
+        RSACrypto.encrypt_file(CONTENT, [rsa_public, outsider_public], 'rsa')
@@ -0,0 +1,62 @@
+"""
+Testes dos algoritmos de digest e do registro com algoritmos misturados.
+"""
+import hashlib
+import io
+
+import pytest
+
+from blockchain import Blockchain
+from contract_manager import ContractManager
+from contract_store import DiskContractStore
+from digest_utils import MultiHasher, digest_bytes, new_hasher
+
+DATA = "Contrato de compra e venda. Preço: R$ 1.000,00.".encode('utf-8')
+
+
+def test_digests_match_hashlib():
+    expected = {'sha256': hashlib.sha256(DATA).hexdigest(),
+                'blake2b': hashlib.blake2b(DATA, digest_size=32).hexdigest(),
+                'sha3_256': hashlib.sha3_256(DATA).hexdigest()}
+    for algorithm, digest in expected.items():
+        assert digest_bytes(DATA, algorithm) == digest and len(digest) == 64
+
+    hasher = MultiHasher(expected)
+    for start in range(0, len(DATA), 5):
+        hasher.update(DATA[start:start + 5])
+    assert hasher.hexdigests() == expected
+    with pytest.raises(ValueError):
+        new_hasher('md5')
+
+
+def test_registry_with_mixed_algorithms(tmp_path):
+    manager = ContractManager(DiskContractStore(str(tmp_path)))
+    assert manager.add_contract("Contrato antigo") == 1
+
+    # Novos registros em BLAKE2b; os antigos continuam em SHA-256
+    reopened = ContractManager(DiskContractStore(str(tmp_path)), algorithm='blake2b')
+    assert reopened.add_contract("Contrato novo") == 2
+    assert reopened.add_contract("Contrato antigo") == 1
+    assert reopened.digest_algorithms == ['blake2b', 'sha256']
+
+    again = ContractManager(DiskContractStore(str(tmp_path)))
+    assert [again.get_contract_info(n)['algorithm'] for n in (1, 2)] == ['sha256', 'blake2b']
+    assert again.get_contract_info(2)['hash'] == digest_bytes(b"Contrato novo", 'blake2b')
+    digests = again.hash_stream_all(io.BytesIO(b"Contrato novo"))
+    assert again.find_number_by_digests(digests) == 2
+    assert again.verify_text_and_find_contract("Contrato novo")['number'] == 2
+    with pytest.raises(ValueError):
+        ContractManager(algorithm='md5')
+
+
+@pytest.mark.parametrize('algorithm', ['sha256', 'blake2b', 'sha3_256'])
+def test_blockchain_algorithms(tmp_path, algorithm):
+    path = str(tmp_path / 'chain.jsonl')
+    blockchain = Blockchain(difficulty=1, algorithm=algorithm, path=path)
+    blockchain.add_block("bloco 1", mine=True)
+    reopened = Blockchain(path=path)
+    assert reopened.is_valid() and reopened.chain[1].algorithm == algorithm
+    assert reopened.chain[1].hash.startswith('0')
+
+    reopened.chain[1].data = "bloco alterado"
+    assert not reopened.is_valid()